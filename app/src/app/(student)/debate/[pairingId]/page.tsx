@@ -2,7 +2,8 @@ import { auth } from "@/lib/auth";
 import { redirect } from "next/navigation";
 import { db } from "@/lib/db";
 import { pairings, assignments, memos, users } from "@/lib/db/schema";
-import { eq, and } from "drizzle-orm";
+import { eq, and, isNull } from "drizzle-orm";
+import { createRoom } from "@/lib/daily/client";
 import { DebateSession } from "@/components/debate/debate-session";
 
 export default async function DebatePage({
@@ -27,6 +28,31 @@ export default async function DebatePage({
   const isStudentB = pairing.studentBId === session.user.id;
   if (!isStudentA && !isStudentB) redirect("/dashboard");
 
+  // Late pairings from the pairing engine get their room on first visit
+  if (!pairing.debateRoomId && pairing.status !== "completed") {
+    const roomName = `debate-${pairing.assignmentId.slice(0, 8)}-${Date.now()}`;
+    let room: { url: string; id: string } = { url: "", id: roomName };
+    try {
+      room = await createRoom(roomName);
+    } catch {
+      room = {
+        url: `http://localhost:3000/debate/room/${roomName}`,
+        id: roomName,
+      };
+    }
+    // Only the first of two simultaneous visits stores its room
+    const [updated] = await db
+      .update(pairings)
+      .set({ debateRoomUrl: room.url, debateRoomId: roomName })
+      .where(and(eq(pairings.id, pairingId), isNull(pairings.debateRoomId)))
+      .returning();
+    const [current] = updated
+      ? [updated]
+      : await db.select().from(pairings).where(eq(pairings.id, pairingId)).limit(1);
+    pairing.debateRoomUrl = current.debateRoomUrl;
+    pairing.debateRoomId = current.debateRoomId;
+  }
+
   const [assignment] = await db
     .select()
     .from(assignments)
@@ -1,7 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import { auth } from "@/lib/auth";
 import { db } from "@/lib/db";
-import { memos, aiUsage, pairings } from "@/lib/db/schema";
+import { memos, memoJobs, aiUsage, pairings } from "@/lib/db/schema";
 import { eq, and, or } from "drizzle-orm";
 import { isPrivilegedRole } from "@/lib/auth/roles";
 
@@ -98,6 +98,7 @@ export async function DELETE(
   }
 
   await db.update(aiUsage).set({ memoId: null }).where(eq(aiUsage.memoId, id));
+  await db.delete(memoJobs).where(eq(memoJobs.memoId, id));
   await db.delete(memos).where(eq(memos.id, id));
 
   return NextResponse.json({ ok: true });
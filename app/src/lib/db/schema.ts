@@ -5,11 +5,24 @@ import {
   timestamp,
   jsonb,
   integer,
+  boolean,
   numeric,
   pgEnum,
   vector,
+  halfvec,
+  bit,
   index,
+  uniqueIndex,
+  primaryKey,
+  customType,
 } from "drizzle-orm/pg-core";
+import { sql, type SQL } from "drizzle-orm";
+
+const tsvector = customType<{ data: string }>({
+  dataType() {
+    return "tsvector";
+  },
+});
 
 // Enums
 export const userRoleEnum = pgEnum("user_role", ["student", "professor", "super_admin"]);
@@ -39,6 +52,20 @@ export const debateSessionStatusEnum = pgEnum("debate_session_status", [
   "terminated",
 ]);
 export const passfailEnum = pgEnum("pass_fail", ["pass", "fail", "review"]);
+export const memoJobStatusEnum = pgEnum("memo_job_status", [
+  "queued",
+  "running",
+  // Extracted, waiting on a Message Batches API analysis
+  "batched",
+  "done",
+  "failed",
+]);
+export const indexVersionStatusEnum = pgEnum("index_version_status", [
+  "building",
+  "active",
+  "retired",
+  "failed",
+]);
 
 // Users
 export const users = pgTable("users", {
@@ -118,13 +145,79 @@ export const memos = pgTable("memos", {
     stance_strength: string;
     reasoning: string;
   }>(),
+  // Reading passages for the thesis and each key claim, precomputed after analysis
+  claimPassages: jsonb("claim_passages").$type<
+    {
+      kind: "thesis" | "claim";
+      claim: string;
+      passages: {
+        source_title: string;
+        synopsis: string;
+        key_facts: string[];
+        matching_sentences: string[];
+      }[];
+    }[]
+  >(),
+  // Embedding of each non-empty key claim, in analysis.key_claims order, for pairing diversity
+  claimEmbeddings: jsonb("claim_embeddings").$type<number[][]>(),
   positionBinary: positionEnum("position_binary").default("unclassified"),
   studentConfirmed: integer("student_confirmed").default(0),
   status: memoStatusEnum("status").default("uploaded").notNull(),
   uploadedAt: timestamp("uploaded_at").defaultNow().notNull(),
   analyzedAt: timestamp("analyzed_at"),
+  // sha256 of the assignment prompt the analysis was made against
+  analysisPromptHash: text("analysis_prompt_hash"),
+  // Token-budget decision for the text sent to analysis (memo_processor/condenser.py)
+  condensation: jsonb("condensation").$type<{
+    condensed: boolean;
+    original_tokens: number;
+    tokens: number;
+    repeated_lines_removed: number;
+    dropped_sections: string[];
+  }>(),
 });
 
+// Memo processing jobs (durable queue consumed by memo_processor workers)
+export const memoJobs = pgTable(
+  "memo_jobs",
+  {
+    id: uuid("id").defaultRandom().primaryKey(),
+    memoId: uuid("memo_id")
+      .references(() => memos.id)
+      .notNull(),
+    status: memoJobStatusEnum("status").default("queued").notNull(),
+    // Set on jobs queued together by /process_assignment
+    batchId: uuid("batch_id"),
+    // Re-analyze even if an analysis of the same text and prompt is cached
+    skipCache: boolean("skip_cache").default(false).notNull(),
+    // "sync" (Messages API) or "batch" (Message Batches API)
+    analysisMode: text("analysis_mode").default("sync").notNull(),
+    analysisBatchId: text("analysis_batch_id"),
+    // Lower runs first; bulk re-analysis yields to fresh uploads
+    priority: integer("priority").default(0).notNull(),
+    attempts: integer("attempts").default(0).notNull(),
+    maxAttempts: integer("max_attempts").default(4).notNull(),
+    runAfter: timestamp("run_after").defaultNow().notNull(),
+    lockedAt: timestamp("locked_at"),
+    lastError: text("last_error"),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+    finishedAt: timestamp("finished_at"),
+  },
+  (table) => [
+    index("memo_jobs_due_idx")
+      .on(table.priority, table.runAfter)
+      .where(sql`${table.status} = 'queued'`),
+    index("memo_jobs_batch_idx").on(table.batchId),
+    index("memo_jobs_analysis_batch_idx")
+      .on(table.analysisBatchId)
+      .where(sql`${table.status} = 'batched'`),
+    // At most one pending job per memo, so repeated /process calls are idempotent
+    uniqueIndex("memo_jobs_pending_idx")
+      .on(table.memoId)
+      .where(sql`${table.status} IN ('queued', 'running', 'batched')`),
+  ]
+);
+
 // Pairings
 export const pairings = pgTable("pairings", {
   id: uuid("id").defaultRandom().primaryKey(),
@@ -199,6 +292,28 @@ export const evaluations = pgTable("evaluations", {
   updatedAt: timestamp("updated_at").defaultNow().notNull(),
 });
 
+// Reading index versions: searches see only the active version of an assignment
+export const readingIndexVersions = pgTable(
+  "reading_index_versions",
+  {
+    id: uuid("id").defaultRandom().primaryKey(),
+    assignmentId: uuid("assignment_id")
+      .references(() => assignments.id)
+      .notNull(),
+    version: integer("version").notNull(),
+    status: indexVersionStatusEnum("status").default("building").notNull(),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+    activatedAt: timestamp("activated_at"),
+  },
+  (table) => [
+    uniqueIndex("reading_index_versions_version_idx").on(table.assignmentId, table.version),
+    // At most one active version per assignment
+    uniqueIndex("reading_index_versions_active_idx")
+      .on(table.assignmentId)
+      .where(sql`${table.status} = 'active'`),
+  ]
+);
+
 // Reading Chunks (for RAG)
 export const readingChunks = pgTable(
   "reading_chunks",
@@ -207,9 +322,28 @@ export const readingChunks = pgTable(
     assignmentId: uuid("assignment_id")
       .references(() => assignments.id)
       .notNull(),
+    // Index version this chunk belongs to; null for chunks indexed before versions
+    versionId: uuid("version_id").references(() => readingIndexVersions.id),
     sourceTitle: text("source_title").notNull(),
     chunkText: text("chunk_text").notNull(),
+    contentHash: text("content_hash"),
     embedding: vector("embedding", { dimensions: 384 }),
+    // Compressed first-pass vectors (EMBEDDING_STORAGE=half|binary); embedding is then null
+    embeddingHalf: halfvec("embedding_half", { dimensions: 384 }),
+    embeddingBits: bit("embedding_bits", { dimensions: 384 }),
+    // Extractive synopsis and key facts, computed at index time for compact prompts
+    synopsis: text("synopsis"),
+    keyFacts: jsonb("key_facts").$type<string[]>(),
+    // Where the chunk came from: PDF page range, character offsets, model tokens
+    pageStart: integer("page_start"),
+    pageEnd: integer("page_end"),
+    charStart: integer("char_start"),
+    charEnd: integer("char_end"),
+    tokenCount: integer("token_count"),
+    // Full-text index for hybrid lexical + vector retrieval
+    chunkTsv: tsvector("chunk_tsv").generatedAlwaysAs(
+      (): SQL => sql`to_tsvector('english', ${readingChunks.chunkText})`
+    ),
     createdAt: timestamp("created_at").defaultNow().notNull(),
   },
   (table) => [
@@ -217,9 +351,48 @@ export const readingChunks = pgTable(
       "hnsw",
       table.embedding.op("vector_cosine_ops")
     ),
+    // Rows indexed before content hashing have no hash and are left out
+    uniqueIndex("reading_chunks_content_idx")
+      .on(table.assignmentId, table.versionId, table.sourceTitle, table.contentHash)
+      .nullsNotDistinct()
+      .where(sql`${table.contentHash} IS NOT NULL`),
+    index("reading_chunks_version_idx").on(table.versionId),
+    index("reading_chunks_tsv_idx").using("gin", table.chunkTsv),
   ]
 );
 
+// Chunk embeddings shared across assignments, keyed by chunk content hash
+export const chunkEmbeddings = pgTable(
+  "chunk_embeddings",
+  {
+    contentHash: text("content_hash").notNull(),
+    model: text("model").notNull(),
+    embedding: vector("embedding", { dimensions: 384 }).notNull(),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+  },
+  (table) => [primaryKey({ columns: [table.contentHash, table.model] })]
+);
+
+// Memo processing caches: extracted text by file bytes, analyses by
+// (extracted text, assignment prompt, model). Keys are sha256 hex digests.
+export const memoExtractionCache = pgTable("memo_extraction_cache", {
+  fileHash: text("file_hash").primaryKey(),
+  extractedText: text("extracted_text").notNull(),
+  createdAt: timestamp("created_at").defaultNow().notNull(),
+});
+
+export const memoAnalysisCache = pgTable(
+  "memo_analysis_cache",
+  {
+    textHash: text("text_hash").notNull(),
+    promptHash: text("prompt_hash").notNull(),
+    model: text("model").notNull(),
+    analysis: jsonb("analysis").notNull(),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+  },
+  (table) => [primaryKey({ columns: [table.textHash, table.promptHash, table.model] })]
+);
+
 // Assignment Enrollments (student signup)
 export const assignmentEnrollments = pgTable("assignment_enrollments", {
   id: uuid("id").defaultRandom().primaryKey(),
@@ -260,6 +433,8 @@ export const loginCodes = pgTable("login_codes", {
 export const aiUsageServiceEnum = pgEnum("ai_usage_service", [
   "claude",
   "deepgram",
+  // Memo extraction cache hits and misses (no API call, no cost)
+  "memo_cache",
 ]);
 
 export const aiUsage = pgTable("ai_usage", {
@@ -271,6 +446,9 @@ export const aiUsage = pgTable("ai_usage", {
   model: text("model"),
   inputTokens: integer("input_tokens"),
   outputTokens: integer("output_tokens"),
+  // Prompt cache tokens, billed separately from (and not included in) inputTokens
+  cacheReadTokens: integer("cache_read_tokens"),
+  cacheCreationTokens: integer("cache_creation_tokens"),
   durationSeconds: numeric("duration_seconds"),
   estimatedCost: numeric("estimated_cost"),
   callType: text("call_type").notNull(),
@@ -284,11 +462,16 @@ export type Assignment = typeof assignments.$inferSelect;
 export type NewAssignment = typeof assignments.$inferInsert;
 export type Memo = typeof memos.$inferSelect;
 export type NewMemo = typeof memos.$inferInsert;
+export type MemoJob = typeof memoJobs.$inferSelect;
 export type Pairing = typeof pairings.$inferSelect;
 export type NewPairing = typeof pairings.$inferInsert;
 export type DebateSession = typeof debateSessions.$inferSelect;
 export type Evaluation = typeof evaluations.$inferSelect;
 export type ReadingChunk = typeof readingChunks.$inferSelect;
+export type ChunkEmbedding = typeof chunkEmbeddings.$inferSelect;
+export type MemoExtractionCache = typeof memoExtractionCache.$inferSelect;
+export type MemoAnalysisCache = typeof memoAnalysisCache.$inferSelect;
+export type ReadingIndexVersion = typeof readingIndexVersions.$inferSelect;
 export type AssignmentEnrollment = typeof assignmentEnrollments.$inferSelect;
 export type EmailVerification = typeof emailVerifications.$inferSelect;
 export type AiUsage = typeof aiUsage.$inferSelect;
@@ -60,13 +60,15 @@ def get_session_context(session_id: str) -> dict:
 
         # Get memos for both students
         cur.execute(
-            "SELECT student_id, analysis FROM memos WHERE assignment_id = %s AND student_id IN (%s, %s)",
+            "SELECT student_id, analysis, claim_passages FROM memos WHERE assignment_id = %s AND student_id IN (%s, %s)",
             (assignment_id, student_a_id, student_b_id),
         )
         memos = {}
+        claim_passages = []
         for memo_row in cur.fetchall():
-            sid, analysis = memo_row
+            sid, analysis, passages = memo_row
             memos[sid] = analysis if isinstance(analysis, dict) else json.loads(analysis) if analysis else {}
+            claim_passages.extend(passages or [])
 
         return {
             "assignment_title": assignment[0] if assignment else "",
@@ -76,6 +78,7 @@ def get_session_context(session_id: str) -> dict:
             "student_b_thesis": memos.get(student_b_id, {}).get("thesis", ""),
             "student_a_name": names.get(student_a_id, "Student A"),
             "student_b_name": names.get(student_b_id, "Student B"),
+            "claim_passages": claim_passages,
         }
     finally:
         cur.close()
@@ -172,6 +175,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             student_b_name=context.get("student_b_name", "Student B"),
             assignment_id=context["assignment_id"],
             reading_indexer_url=READING_INDEXER_URL,
+            claim_passages=context.get("claim_passages"),
         )
 
         sessions[session_id] = {
@@ -473,6 +477,11 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             # Auto-complete session if it had meaningful activity
             if len(session["transcript"]) > 0 and duration > 30:
                 complete_session(session_id, round(duration))
+            moderator = session["moderator"]
+            print(
+                f"[{session_id}] Reading context: {moderator.preloaded_hits} preloaded, "
+                f"{moderator.indexer_queries} indexer queries"
+            )
             del sessions[session_id]
 
 
@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 import json
 from anthropic import Anthropic
@@ -65,6 +66,20 @@ Use the students' first names, not "Student A" or "Student B".
 Return ONLY the instruction text, no JSON, no quotes."""
 
 
+# An utterance reuses a memo claim's preloaded passages when it contains at
+# least this share of the claim's content words
+CLAIM_MATCH_THRESHOLD = 0.5
+_STOPWORDS = frozenset(
+    "the and for that this with from are was were have has had not but they their them its into "
+    "than then there these those what which when where who will would could should about also more "
+    "most such very just our your you his her she him".split()
+)
+
+
+def _content_words(text: str) -> set[str]:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
 class Moderator:
     def __init__(
         self,
@@ -75,6 +90,7 @@ class Moderator:
         reading_indexer_url: str,
         student_a_name: str = "Student A",
         student_b_name: str = "Student B",
+        claim_passages: list[dict] | None = None,
     ):
         self.assignment_title = assignment_title
         self.student_a_thesis = student_a_thesis
@@ -84,9 +100,35 @@ class Moderator:
         self.assignment_id = assignment_id
         self.reading_indexer_url = reading_indexer_url
         self.http_client = httpx.AsyncClient()
+        # Passages precomputed for both memos' theses and key claims
+        self.claim_passages = [
+            {**c, "words": _content_words(c["claim"])}
+            for c in claim_passages or []
+            if c.get("passages")
+        ]
+        self.preloaded_hits = 0
+        self.indexer_queries = 0
+
+    def match_preloaded_claim(self, utterance: str) -> dict | None:
+        """The preloaded claim the utterance restates most closely, if any."""
+        words = _content_words(utterance)
+        best, best_score = None, 0.0
+        for claim in self.claim_passages:
+            if not claim["words"]:
+                continue
+            score = len(claim["words"] & words) / len(claim["words"])
+            if score > best_score:
+                best, best_score = claim, score
+        return best if best_score >= CLAIM_MATCH_THRESHOLD else None
 
     async def get_reading_context(self, claim: str) -> str:
-        """Query the reading indexer for relevant passages."""
+        """Relevant passages: preloaded for a known memo claim, else from the reading indexer."""
+        preloaded = self.match_preloaded_claim(claim)
+        if preloaded:
+            self.preloaded_hits += 1
+            return "\n".join(self._format_passage(p) for p in preloaded["passages"])
+
+        self.indexer_queries += 1
         try:
             response = await self.http_client.post(
                 f"{self.reading_indexer_url}/query",
@@ -94,19 +136,30 @@ class Moderator:
                     "assignment_id": self.assignment_id,
                     "query": claim,
                     "top_k": 3,
+                    # Catches author names and statistics that embeddings miss
+                    "mode": "hybrid",
+                    # Synopses and exact matching sentences instead of full chunks
+                    "view": "synopsis",
+                    "matching_sentences": 2,
                 },
                 timeout=5.0,
             )
             if response.status_code == 200:
                 results = response.json().get("results", [])
-                return "\n".join(
-                    f"[{r['source_title']}]: {r['chunk_text']}"
-                    for r in results
-                )
+                return "\n".join(self._format_passage(r) for r in results)
         except Exception:
             pass
         return "No reading passages available."
 
+    @staticmethod
+    def _format_passage(result: dict) -> str:
+        lines = [f"[{result['source_title']}]: {result['synopsis']}"]
+        if result.get("key_facts"):
+            lines.append(f"  Key facts: {' '.join(result['key_facts'])}")
+        for sentence in result.get("matching_sentences", []):
+            lines.append(f'  Quote: "{sentence}"')
+        return "\n".join(lines)
+
     def _get_phase_instructions(self, phase: str) -> str:
         """Return phase-specific moderation instructions."""
         for key, instructions in PHASE_BEHAVIOR.items():
@@ -0,0 +1,65 @@
+"""Tests for preloaded claim-to-passage lookups in the moderator."""
+
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+CLAIM_PASSAGES = [
+    {
+        "kind": "claim",
+        "claim": "Import competition from China explains a fifth of manufacturing job losses",
+        "passages": [
+            {
+                "source_title": "Autor, Dorn & Hanson (2013)",
+                "synopsis": "Rising Chinese import competition reduced US manufacturing employment.",
+                "key_facts": ["Import exposure explains 21% of the decline in manufacturing employment."],
+                "matching_sentences": [],
+            }
+        ],
+    },
+    {"kind": "thesis", "claim": "Free trade is beneficial", "passages": []},
+]
+
+
+@pytest.fixture
+def moderator():
+    with patch("moderator.client"), patch("moderator.log_usage"):
+        from moderator import Moderator
+        mod = Moderator(
+            assignment_title="Trade Policy Debate",
+            student_a_thesis="Free trade is beneficial",
+            student_b_thesis="Protectionism is needed",
+            assignment_id="test-assignment-id",
+            reading_indexer_url="http://localhost:8002",
+            claim_passages=CLAIM_PASSAGES,
+        )
+        mod.http_client = MagicMock(post=AsyncMock())
+        yield mod
+
+
+@pytest.mark.asyncio
+async def test_restated_claim_uses_preloaded_passages(moderator):
+    context = await moderator.get_reading_context(
+        "As I wrote, competition from Chinese imports explains a fifth of the manufacturing job losses."
+    )
+
+    assert "Autor, Dorn & Hanson (2013)" in context
+    assert "21%" in context
+    moderator.http_client.post.assert_not_called()
+    assert moderator.preloaded_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_unrelated_utterance_queries_the_indexer(moderator):
+    moderator.http_client.post.return_value = MagicMock(status_code=200, json=lambda: {"results": []})
+
+    await moderator.get_reading_context("What about agricultural subsidies in Europe?")
+
+    moderator.http_client.post.assert_awaited_once()
+    assert moderator.indexer_queries == 1
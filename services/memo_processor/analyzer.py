@@ -1,3 +1,4 @@
+import functools
 import os
 import sys
 import json
@@ -9,23 +10,36 @@ from shared.usage_logger import log_usage
 
 client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-ANALYSIS_PROMPT = """You are analyzing a student memo for a university assignment.
+ANALYSIS_MODEL = "claude-sonnet-4-5-20250929"
+# Batch request errors worth retrying (the rest fail the memo)
+TRANSIENT_BATCH_ERRORS = {"overloaded_error", "api_error", "rate_limit_error", "expired", "canceled"}
 
-ASSIGNMENT PROMPT:
-{assignment_prompt}
 
-STUDENT MEMO:
-{memo_text}
+class BatchRequestFailed(Exception):
+    def __init__(self, message: str, error_type: str):
+        super().__init__(message)
+        self.transient = error_type in TRANSIENT_BATCH_ERRORS
+
+
+# The analysis prompt is split so everything shared by an assignment's memos
+# (instructions, then the assignment prompt) forms a cached system prefix and
+# only the memo varies. Prefixes shorter than the model's minimum cacheable
+# length are not cached at all, so the instructions carry the full field guide
+# (static, and long enough that with a typical assignment prompt the prefix
+# clears the minimum); check_cacheable_prefix measures it per assignment.
+MIN_CACHEABLE_TOKENS = 1024
+
+ANALYSIS_INSTRUCTIONS = """You are analyzing student memos for a university assignment. Each user message is one student memo.
 
 Extract the following as JSON:
-{{
+{
   "position": "net_positive" | "net_negative",
   "thesis": "one sentence summary of their main argument",
   "key_claims": ["claim 1", "claim 2", ...],
-  "citations": [{{"reading": "author/title", "how_used": "summary of usage"}}],
+  "citations": [{"reading": "author/title", "how_used": "summary of usage"}],
   "stance_strength": "strong" | "moderate" | "weak",
   "reasoning": "brief explanation of your classification"
-}}
+}
 
 Classification rules:
 - Read the assignment prompt carefully to understand the debate topic and the two sides
@@ -34,33 +48,101 @@ Classification rules:
 - For nuanced/mixed positions, determine which way the overall argument leans and classify accordingly
 - Only use "net_positive" or "net_negative" — no middle ground for pairing purposes
 
-Return ONLY valid JSON, no other text."""
-
-
-def analyze_memo(memo_text: str, assignment_prompt: str, assignment_id: str | None = None, memo_id: str | None = None) -> dict:
-    """Analyze a student memo using Claude."""
-    prompt = ANALYSIS_PROMPT.format(
-        assignment_prompt=assignment_prompt,
-        memo_text=memo_text,
-    )
-
-    response = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=1024,
-        messages=[{"role": "user", "content": prompt}],
-    )
+Field guide:
+
+thesis
+- One sentence, in your words, stating what the student concludes and why
+- Take it from the memo's conclusion when the introduction and conclusion disagree; students often refine their view while writing
+- Do not copy a rhetorical question or a quotation as the thesis
+
+key_claims
+- The 2-6 distinct claims the student relies on to reach the thesis, most important first
+- Each claim is one self-contained sentence that a classmate could agree or disagree with, e.g. "Walmart's entry lowered grocery prices in rural counties" rather than "prices"
+- Keep the student's specific mechanism, group, place or magnitude when they give one; these details are what debates turn on
+- Merge claims that say the same thing in different words; split a sentence that makes two separate claims
+- Include counterarguments only when the student adopts them; a concession the student rebuts is not a key claim
+- Leave out background facts, definitions and summaries of a reading that the student does not use to argue
+
+citations
+- One entry per reading or source the student draws on, including readings mentioned by author or title without a formal citation
+- "reading" is the author and/or title as the student gives it, e.g. "Basker (2005)" or "Walmart and the Economy"
+- "how_used" says in one sentence what the student takes from the source and for which claim
+- An empty list is valid when the memo cites nothing
+
+stance_strength
+- "strong": the student commits to one side throughout, answers the obvious objections and does not hedge the conclusion
+- "moderate": the student clearly favors one side but grants real weight to the other or qualifies the conclusion
+- "weak": the student leans one way only slightly, mostly describes both sides, or concludes that "it depends"
+- Judge the argument as written, not its quality or correctness
+
+reasoning
+- Two or three sentences explaining the position and stance strength, pointing to the parts of the memo that decided them
+
+General
+- Base every field on the memo alone; do not add claims or citations the student did not make
+- A memo that is off topic, unfinished or mostly quotation still gets a position: classify the way its argument leans and say so in "reasoning"
+- Write all fields in English, even if the memo quotes other languages
 
-    log_usage(
-        service="claude",
-        model=response.model,
-        call_type="memo_analysis",
-        input_tokens=response.usage.input_tokens,
-        output_tokens=response.usage.output_tokens,
-        assignment_id=assignment_id,
-        memo_id=memo_id,
-    )
+Return ONLY valid JSON, no other text."""
 
-    text = response.content[0].text.strip()
+ASSIGNMENT_BLOCK = """ASSIGNMENT PROMPT:
+{assignment_prompt}"""
+
+MEMO_MESSAGE = """STUDENT MEMO:
+{memo_text}"""
+
+
+def analysis_params(memo_text: str, assignment_prompt: str) -> dict:
+    """Messages API parameters for one memo analysis, shared by the sync and batch paths."""
+    return {
+        "model": ANALYSIS_MODEL,
+        "max_tokens": 1024,
+        "system": [
+            {"type": "text", "text": ANALYSIS_INSTRUCTIONS},
+            {
+                "type": "text",
+                "text": ASSIGNMENT_BLOCK.format(assignment_prompt=assignment_prompt),
+                "cache_control": {"type": "ephemeral"},
+            },
+        ],
+        "messages": [{"role": "user", "content": MEMO_MESSAGE.format(memo_text=memo_text)}],
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def check_cacheable_prefix(assignment_prompt: str) -> int | None:
+    """Count the cached prefix's tokens for this assignment prompt, once per process.
+
+    Logs when the prefix is under MIN_CACHEABLE_TOKENS, as those analyses
+    are billed in full. Returns the count, or None if it could not be counted.
+    """
+    params = analysis_params("", assignment_prompt)
+    try:
+        count = client.messages.count_tokens(
+            model=params["model"], system=params["system"], messages=[{"role": "user", "content": "."}]
+        )
+    except Exception as e:
+        print(f"[analysis] Could not count the cached prefix's tokens: {e}")
+        return None
+    if count.input_tokens < MIN_CACHEABLE_TOKENS:
+        print(
+            f"[analysis] Cached prefix is {count.input_tokens} tokens, under the {MIN_CACHEABLE_TOKENS}-token "
+            "minimum; this assignment's analyses will not use the prompt cache"
+        )
+    return count.input_tokens
+
+
+def cache_usage(usage) -> dict:
+    """Prompt-cache token counts of a response's usage, for log_usage."""
+    return {
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        "cache_creation_tokens": getattr(usage, "cache_creation_input_tokens", None) or 0,
+    }
+
+
+def parse_analysis(text: str) -> dict:
+    """Parse and validate the model's JSON reply."""
+    text = text.strip()
 
     # Extract JSON from response (handle potential markdown wrapping)
     if text.startswith("```"):
@@ -79,3 +161,78 @@ def analyze_memo(memo_text: str, assignment_prompt: str, assignment_id: str | No
         raise ValueError(f"Invalid position: {analysis['position']}")
 
     return analysis
+
+
+def analyze_memo(memo_text: str, assignment_prompt: str, assignment_id: str | None = None, memo_id: str | None = None) -> dict:
+    """Analyze a student memo using Claude."""
+    check_cacheable_prefix(assignment_prompt)
+    response = client.messages.create(**analysis_params(memo_text, assignment_prompt))
+
+    log_usage(
+        service="claude",
+        model=response.model,
+        call_type="memo_analysis",
+        input_tokens=response.usage.input_tokens,
+        output_tokens=response.usage.output_tokens,
+        **cache_usage(response.usage),
+        assignment_id=assignment_id,
+        memo_id=memo_id,
+    )
+
+    return parse_analysis(response.content[0].text)
+
+
+def submit_analysis_batch(requests: dict[str, tuple[str, str]]) -> str:
+    """Submit analyses as one message batch; ``requests`` maps custom_id -> (memo_text, assignment_prompt).
+
+    Batches run asynchronously at half price and outside the synchronous
+    rate limit, so deadline-day bursts do not compete with live debates.
+    Returns the batch id.
+    """
+    for prompt in {prompt for _, prompt in requests.values()}:
+        check_cacheable_prefix(prompt)
+    batch = client.messages.batches.create(
+        requests=[
+            {"custom_id": custom_id, "params": analysis_params(memo_text, prompt)}
+            for custom_id, (memo_text, prompt) in requests.items()
+        ]
+    )
+    return batch.id
+
+
+def analysis_batch_ended(batch_id: str) -> bool:
+    return client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+
+def analysis_batch_results(batch_id: str, context: dict[str, dict]) -> dict[str, dict | Exception]:
+    """Validated analyses of an ended batch, keyed by custom_id.
+
+    A request that errored, expired or returned invalid JSON maps to an
+    exception instead. ``context`` maps custom_id to the assignment_id and
+    memo_id its usage is logged under.
+    """
+    results = {}
+    for entry in client.messages.batches.results(batch_id):
+        result = entry.result
+        if result.type != "succeeded":
+            error = getattr(result, "error", None)
+            detail = error.error.type if error is not None else result.type
+            results[entry.custom_id] = BatchRequestFailed(f"Batch request {result.type}: {detail}", detail)
+            continue
+
+        message = result.message
+        log_usage(
+            service="claude",
+            model=message.model,
+            call_type="memo_analysis_batch",
+            input_tokens=message.usage.input_tokens,
+            output_tokens=message.usage.output_tokens,
+            **cache_usage(message.usage),
+            batch=True,
+            **context.get(entry.custom_id, {}),
+        )
+        try:
+            results[entry.custom_id] = parse_analysis(message.content[0].text)
+        except (ValueError, IndexError) as e:
+            results[entry.custom_id] = e
+    return results
@@ -0,0 +1,133 @@
+"""Memo analysis through the Message Batches API.
+
+Analysis is not latency-critical the way live moderation is. Jobs queued
+with ``analysis_mode`` ``batch`` are extracted by the job workers as usual,
+then parked as ``batched``. A single submitter thread per instance sends
+every parked job as one message batch each ``ANALYSIS_BATCH_POLL_SECONDS``.
+It then polls the open batches and writes results back with the same
+validation as the synchronous path. Batches are billed at half price and do
+not count against the rate limit that live debates share.
+
+A request that errored or expired is retried like any transient failure:
+the job is re-queued, its extraction comes from the cache, and it is batched
+again. Invalid JSON fails the memo, as it does for synchronous analysis.
+Memo text is condensed to the token budget exactly as the job worker did.
+"""
+import os
+
+from analyzer import BatchRequestFailed, analysis_batch_ended, analysis_batch_results, submit_analysis_batch
+from cache import store_analysis
+from condenser import condense_memo
+from jobs import complete_job, fail_job, is_transient
+from pipeline import save_analysis
+
+ANALYSIS_BATCH_POLL_SECONDS = float(os.getenv("ANALYSIS_BATCH_POLL_SECONDS", "30"))
+MAX_BATCH_REQUESTS = 5000
+
+JOB_CONTEXT = """SELECT j.id::text, j.memo_id::text, m.assignment_id::text, m.extracted_text, a.prompt_text
+    FROM memo_jobs j
+    JOIN memos m ON m.id = j.memo_id
+    JOIN assignments a ON a.id = m.assignment_id"""
+
+
+def _with_analysis_text(rows: list[tuple]) -> list[tuple]:
+    """JOB_CONTEXT rows with the extracted text replaced by the text sent for analysis."""
+    return [(job_id, memo_id, a_id, condense_memo(text)["text"], prompt) for job_id, memo_id, a_id, text, prompt in rows]
+
+
+def submit_waiting_jobs(conn, limit: int = MAX_BATCH_REQUESTS) -> str | None:
+    """Send every parked job's analysis as one message batch; returns its id."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""{JOB_CONTEXT}
+            WHERE j.status = 'batched' AND j.analysis_batch_id IS NULL
+            ORDER BY j.created_at
+            LIMIT %s
+            FOR UPDATE OF j SKIP LOCKED""",
+            (limit,),
+        )
+        jobs = _with_analysis_text(cur.fetchall())
+        if not jobs:
+            conn.rollback()
+            return None
+
+        batch_id = submit_analysis_batch({job_id: (text, prompt or "") for job_id, _, _, text, prompt in jobs})
+        cur.execute(
+            "UPDATE memo_jobs SET analysis_batch_id = %s WHERE id = ANY(%s::uuid[])",
+            (batch_id, [job[0] for job in jobs]),
+        )
+        conn.commit()
+        print(f"[batch] Submitted {len(jobs)} memo analyses as {batch_id}")
+        return batch_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _claim_batch(conn, batch_id: str) -> list[tuple]:
+    """Take the batch's jobs for this instance, so results are applied once."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""WITH claimed AS (
+                UPDATE memo_jobs SET status = 'running', locked_at = NOW()
+                WHERE analysis_batch_id = %s AND status = 'batched'
+                RETURNING id
+            )
+            {JOB_CONTEXT}
+            WHERE j.id IN (SELECT id FROM claimed)""",
+            (batch_id,),
+        )
+        jobs = _with_analysis_text(cur.fetchall())
+        conn.commit()
+        return jobs
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def finish_ended_batches(conn) -> list[tuple[str, str, dict]]:
+    """Apply the results of every open batch that has ended.
+
+    Returns (memo_id, assignment_id, analysis) for each memo analyzed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT DISTINCT analysis_batch_id FROM memo_jobs
+            WHERE status = 'batched' AND analysis_batch_id IS NOT NULL"""
+        )
+        open_batches = [row[0] for row in cur.fetchall()]
+        conn.rollback()
+    finally:
+        cur.close()
+
+    analyzed = []
+    for batch_id in open_batches:
+        if not analysis_batch_ended(batch_id):
+            continue
+        jobs = _claim_batch(conn, batch_id)
+        if not jobs:
+            continue
+        results = analysis_batch_results(
+            batch_id, {job_id: {"assignment_id": a_id, "memo_id": memo_id} for job_id, memo_id, a_id, _, _ in jobs}
+        )
+        failed = 0
+        for job_id, memo_id, assignment_id, text, prompt in jobs:
+            result = results.get(job_id, BatchRequestFailed("Missing from batch results", "expired"))
+            if isinstance(result, Exception):
+                failed += 1
+                status = fail_job(conn, job_id, f"{type(result).__name__}: {result}", retry=is_transient(result))
+                print(f"[batch] Memo {memo_id} failed ({status}): {result}")
+                continue
+            store_analysis(conn, text, prompt or "", result)
+            save_analysis(conn, memo_id, prompt or "", result)
+            complete_job(conn, job_id)
+            analyzed.append((memo_id, assignment_id, result))
+        print(f"[batch] {batch_id} ended: {len(jobs) - failed} analyzed, {failed} failed")
+    return analyzed
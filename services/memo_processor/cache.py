@@ -0,0 +1,129 @@
+"""Content-addressed caches for memo extraction and analysis.
+
+Students often re-upload the same file, and a retried job would otherwise
+repeat the whole pipeline. Extracted text is cached by the sha256 of the
+file bytes, and analyses by (text hash, assignment prompt hash, model), so
+a re-upload or retry skips straight to the stored result. Analysis cache
+hits are logged to ai_usage as ``memo_analysis_cache_hit`` (at no cost)
+next to the ``memo_analysis`` calls that missed. Extraction has no API call
+to log, so both its hits and misses are logged, as
+``memo_extraction_cache_hit`` and ``memo_extraction_cache_miss`` under the
+``memo_cache`` service, keeping them out of the Claude call counts.
+"""
+import hashlib
+import json
+import os
+import sys
+
+from analyzer import ANALYSIS_MODEL, analyze_memo
+from extractor import extract_text
+from storage import MemoBuffer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from shared.usage_logger import log_usage
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def prompt_hash(prompt_text: str) -> str:
+    return content_hash(prompt_text)
+
+
+# ai_usage service of extraction cache events; analysis cache hits stay "claude"
+EXTRACTION_CACHE_SERVICE = "memo_cache"
+
+
+def log_cache_event(
+    call_type: str, model: str | None, assignment_id: str | None, memo_id: str | None, service: str = "claude"
+):
+    log_usage(
+        service=service,
+        model=model,
+        call_type=call_type,
+        input_tokens=0,
+        output_tokens=0,
+        assignment_id=assignment_id,
+        memo_id=memo_id,
+    )
+
+
+def extract_cached(conn, memo: MemoBuffer, assignment_id: str | None = None, memo_id: str | None = None) -> str:
+    """Extracted text for the file, from the cache when these bytes were seen before."""
+    key = memo.sha256
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT extracted_text FROM memo_extraction_cache WHERE file_hash = %s", (key,))
+        row = cur.fetchone()
+        if row:
+            log_cache_event("memo_extraction_cache_hit", None, assignment_id, memo_id, EXTRACTION_CACHE_SERVICE)
+            return row[0]
+
+        log_cache_event("memo_extraction_cache_miss", None, assignment_id, memo_id, EXTRACTION_CACHE_SERVICE)
+        text = extract_text(memo.source(), memo.ext)
+        cur.execute(
+            """INSERT INTO memo_extraction_cache (file_hash, extracted_text) VALUES (%s, %s)
+            ON CONFLICT (file_hash) DO NOTHING""",
+            (key, text),
+        )
+        conn.commit()
+        return text
+    finally:
+        cur.close()
+
+
+def analysis_key(memo_text: str, assignment_prompt: str) -> tuple[str, str, str]:
+    return content_hash(memo_text), prompt_hash(assignment_prompt), ANALYSIS_MODEL
+
+
+def lookup_analysis(conn, memo_text: str, assignment_prompt: str, assignment_id: str | None = None, memo_id: str | None = None) -> dict | None:
+    """The cached analysis for this text and prompt, logging the hit; None on a miss."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT analysis FROM memo_analysis_cache
+            WHERE text_hash = %s AND prompt_hash = %s AND model = %s""",
+            analysis_key(memo_text, assignment_prompt),
+        )
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    if row is None:
+        return None
+    log_cache_event("memo_analysis_cache_hit", ANALYSIS_MODEL, assignment_id, memo_id)
+    return row[0]
+
+
+def store_analysis(conn, memo_text: str, assignment_prompt: str, analysis: dict):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """INSERT INTO memo_analysis_cache (text_hash, prompt_hash, model, analysis)
+            VALUES (%s, %s, %s, %s::jsonb)
+            ON CONFLICT (text_hash, prompt_hash, model)
+            DO UPDATE SET analysis = EXCLUDED.analysis, created_at = NOW()""",
+            (*analysis_key(memo_text, assignment_prompt), json.dumps(analysis)),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def analyze_cached(
+    conn,
+    memo_text: str,
+    assignment_prompt: str,
+    assignment_id: str | None = None,
+    memo_id: str | None = None,
+    use_cache: bool = True,
+) -> dict:
+    """Analysis of the memo text against the prompt; ``use_cache=False`` always re-analyzes."""
+    if use_cache:
+        analysis = lookup_analysis(conn, memo_text, assignment_prompt, assignment_id, memo_id)
+        if analysis is not None:
+            return analysis
+
+    analysis = analyze_memo(memo_text, assignment_prompt, assignment_id=assignment_id, memo_id=memo_id)
+    store_analysis(conn, memo_text, assignment_prompt, analysis)
+    return analysis
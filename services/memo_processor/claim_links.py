@@ -0,0 +1,95 @@
+"""Link a memo's thesis and key claims to reading passages ahead of the debate.
+
+Runs after analysis succeeds. Every claim is sent to the reading indexer in
+one batch query and the top passages (synopsis, key facts and the sentences
+that best match the claim) are stored on ``memos.claim_passages``. The debate
+moderator preloads them at session start, so most live fact-checks become a
+local lookup instead of an embedding plus a vector search.
+
+Separately, each key claim is embedded with the indexer's model
+(``POST /embed``) and stored on ``memos.claim_embeddings`` for the pairing
+engine's semantic diversity. Embedding does not depend on the assignment's
+readings being indexed, and a failed passage lookup does not lose it.
+"""
+import json
+import os
+
+import httpx
+
+READING_INDEXER_URL = os.getenv("READING_INDEXER_URL", "http://localhost:8002")
+PASSAGES_PER_CLAIM = 3
+# Decimal places kept on stored embeddings; plenty for cosine distances
+EMBEDDING_DECIMALS = 5
+
+
+def memo_claims(analysis: dict) -> list[dict]:
+    claims = []
+    if (analysis.get("thesis") or "").strip():
+        claims.append({"kind": "thesis", "claim": analysis["thesis"]})
+    # Blank claims would add meaningless vectors to a student's centroid
+    claims.extend({"kind": "claim", "claim": c} for c in analysis.get("key_claims", []) if c and c.strip())
+    return claims
+
+
+def fetch_claim_passages(assignment_id: str, claims: list[dict]) -> list[dict]:
+    """Query the reading indexer for every claim in one request."""
+    response = httpx.post(
+        f"{READING_INDEXER_URL}/query/batch",
+        json={
+            "assignment_id": assignment_id,
+            "queries": [c["claim"] for c in claims],
+            "top_k": PASSAGES_PER_CLAIM,
+            "mode": "hybrid",
+            "view": "synopsis",
+            "matching_sentences": 2,
+        },
+        # Batch embedding of a dozen claims on a cold indexer can take a while
+        timeout=60.0,
+    )
+    response.raise_for_status()
+    results = response.json()["results"]
+    return [{**claim, "passages": r["results"]} for claim, r in zip(claims, results)]
+
+
+def fetch_embeddings(texts: list[str]) -> list[list[float]]:
+    response = httpx.post(f"{READING_INDEXER_URL}/embed", json={"texts": texts}, timeout=60.0)
+    response.raise_for_status()
+    return [[round(x, EMBEDDING_DECIMALS) for x in e] for e in response.json()["embeddings"]]
+
+
+def link_claims(conn, memo_id: str, assignment_id: str, analysis: dict) -> int:
+    """Store passages for the memo's claims; returns the number of claims linked."""
+    claims = memo_claims(analysis)
+    if not claims:
+        return 0
+    linked = fetch_claim_passages(assignment_id, claims)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE memos SET claim_passages = %s::jsonb WHERE id = %s",
+            (json.dumps(linked), memo_id),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+    return len(linked)
+
+
+def embed_claims(conn, memo_id: str, analysis: dict) -> int:
+    """Store embeddings of the memo's key claims; returns the number embedded."""
+    claims = [c["claim"] for c in memo_claims(analysis) if c["kind"] == "claim"]
+    if not claims:
+        return 0
+    embeddings = fetch_embeddings(claims)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE memos SET claim_embeddings = %s::jsonb WHERE id = %s",
+            (json.dumps(embeddings), memo_id),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+    return len(embeddings)
@@ -0,0 +1,193 @@
+"""Token-budget condensation of extracted memo text before analysis.
+
+A memo is analyzed whole, so a 40-page upload full of appendices makes a
+slow, expensive call that can overrun the context window. Memos estimated
+above ``MEMO_TOKEN_BUDGET`` are condensed locally first:
+
+1. lines repeated on every page (running headers, footers, page numbers
+   from pymupdf4llm's page-by-page output) are removed; headings are kept,
+   since a memo may repeat a "**Evidence**" heading in every section;
+2. back matter (references, bibliography, appendices, ...) is dropped,
+   along with any sub-sections under it. "Notes" and "Sources" are also
+   ordinary section names, so they count only near the end of the memo;
+3. if still over budget, the opening section is kept, and the remaining
+   sections are kept in order of how many claim-like sentences they hold
+   until the budget is spent. Kept sections stay in document order.
+
+The decision (token counts and what was dropped) is recorded on
+``memos.condensation``. Extraction caches and ``memos.extracted_text`` keep
+the full text; the analysis cache is keyed by the condensed text sent.
+"""
+import os
+import re
+
+MEMO_TOKEN_BUDGET = int(os.getenv("MEMO_TOKEN_BUDGET", "12000"))
+# Rough English-prose average; the budget has headroom for the error
+CHARS_PER_TOKEN = 4
+# A short line seen at least this often is a running header or footer
+REPEATED_LINE_MIN = 3
+REPEATED_LINE_MAX_CHARS = 80
+
+BACK_MATTER = re.compile(
+    r"^((references?|bibliography|works cited|sources( cited)?|endnotes|notes)[:.]?"
+    r"|(appendi(x|ces)|annex(es)?|exhibits?)\b.*)$",
+    re.IGNORECASE,
+)
+# Titles that only mean back matter when they start in the memo's last part
+TRAILER_HEADING = re.compile(r"^(sources|notes)[:.]?$", re.IGNORECASE)
+TRAILER_TAIL = 0.3
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*$")
+BOLD_LINE = re.compile(r"^\*\*(.+?)\*\*$")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+CLAIM_MARKERS = re.compile(
+    r"\b(because|therefore|thus|hence|consequently|evidence|shows?|suggests?|argues?|demonstrates?|"
+    r"indicates?|proves?|leads? to|results? in|causes?|should|must|however|although)\b"
+    r"|\d+(\.\d+)?\s*%|\([A-Z][A-Za-z&.\s]+,?\s+\d{4}\)",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _line_key(line: str) -> str:
+    # "Page 3 of 40" and "Page 4 of 40" are the same footer
+    return re.sub(r"\d+", "#", line.strip().lower())
+
+
+def drop_repeated_lines(text: str) -> tuple[str, int]:
+    """Remove short lines that recur across pages; returns (text, lines removed)."""
+    lines = text.split("\n")
+    counts: dict[str, int] = {}
+    for line in lines:
+        if line.strip() and len(line.strip()) <= REPEATED_LINE_MAX_CHARS:
+            key = _line_key(line)
+            counts[key] = counts.get(key, 0) + 1
+
+    def repeated(line: str) -> bool:
+        stripped = line.strip()
+        if not stripped or _heading(line) or stripped.startswith("|"):
+            # Headings and table rows repeat legitimately
+            return False
+        return stripped.isdigit() or counts.get(_line_key(line), 0) >= REPEATED_LINE_MIN
+
+    kept = [line for line in lines if not repeated(line)]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)), len(lines) - len(kept)
+
+
+def _heading(line: str) -> tuple[int, str] | None:
+    """(level, title) for a markdown or bold-only heading, or a bare back-matter title line."""
+    stripped = line.strip()
+    match = MARKDOWN_HEADING.match(stripped)
+    if match:
+        return len(match.group(1)), match.group(2).strip("* ")
+    match = BOLD_LINE.match(stripped)
+    if match and len(stripped) <= REPEATED_LINE_MAX_CHARS:
+        return 6, match.group(1).strip()
+    if len(stripped) <= 40 and BACK_MATTER.match(stripped):
+        # python-docx output has no heading markup
+        return 1, stripped.rstrip(":")
+    return None
+
+
+def split_sections(text: str) -> list[dict]:
+    """Split on headings into {"level", "title", "text"}; text before the first heading is level 0."""
+    sections = [{"level": 0, "title": "", "lines": []}]
+    for line in text.split("\n"):
+        heading = _heading(line)
+        if heading:
+            sections.append({"level": heading[0], "title": heading[1], "lines": []})
+        sections[-1]["lines"].append(line)
+    return [
+        {"level": s["level"], "title": s["title"], "text": "\n".join(s["lines"]).strip()}
+        for s in sections
+        if "\n".join(s["lines"]).strip()
+    ]
+
+
+def _is_back_matter(title: str, start: int, total: int) -> bool:
+    if TRAILER_HEADING.match(title):
+        return start >= total * (1 - TRAILER_TAIL)
+    return bool(BACK_MATTER.match(title))
+
+
+def drop_back_matter(sections: list[dict]) -> tuple[list[dict], list[str]]:
+    """Drop back-matter sections and the sub-sections nested under them.
+
+    A "Notes" or "Sources" section is back matter only if it starts in the
+    last ``TRAILER_TAIL`` of the memo.
+    """
+    kept, dropped = [], []
+    dropping_below = None
+    total = sum(len(s["text"]) for s in sections)
+    offset = 0
+    for section in sections:
+        start, offset = offset, offset + len(section["text"])
+        if dropping_below is not None and section["level"] > dropping_below:
+            dropped.append(section["title"])
+            continue
+        dropping_below = None
+        if section["level"] and _is_back_matter(section["title"], start, total):
+            dropping_below = section["level"]
+            dropped.append(section["title"])
+            continue
+        kept.append(section)
+    return kept, dropped
+
+
+def claim_count(text: str) -> int:
+    return sum(1 for sentence in SENTENCE_END.split(text) if CLAIM_MARKERS.search(sentence))
+
+
+def _join(sections: list[dict]) -> str:
+    return "\n\n".join(s["text"] for s in sections)
+
+
+def condense_memo(text: str, budget: int = MEMO_TOKEN_BUDGET) -> dict:
+    """Fit the memo text into ``budget`` tokens.
+
+    Returns {"text", "condensed", "original_tokens", "tokens",
+    "repeated_lines_removed", "dropped_sections"}; ``text`` is unchanged
+    when the memo is already within budget.
+    """
+    original_tokens = estimate_tokens(text)
+    decision = {
+        "text": text,
+        "condensed": False,
+        "original_tokens": original_tokens,
+        "tokens": original_tokens,
+        "repeated_lines_removed": 0,
+        "dropped_sections": [],
+    }
+    if original_tokens <= budget:
+        return decision
+
+    text, decision["repeated_lines_removed"] = drop_repeated_lines(text)
+    sections, dropped = drop_back_matter(split_sections(text))
+
+    if estimate_tokens(_join(sections)) > budget and len(sections) > 1:
+        # The opening section carries the thesis; rank the rest by claims
+        ranked = sorted(range(1, len(sections)), key=lambda i: claim_count(sections[i]["text"]), reverse=True)
+        keep = {0}
+        spent = estimate_tokens(sections[0]["text"])
+        for i in ranked:
+            cost = estimate_tokens(sections[i]["text"])
+            if spent + cost <= budget:
+                keep.add(i)
+                spent += cost
+        dropped += [s["title"] or "(untitled)" for i, s in enumerate(sections) if i not in keep]
+        sections = [s for i, s in enumerate(sections) if i in keep]
+
+    condensed = _join(sections)
+    if estimate_tokens(condensed) > budget:
+        # One section alone is over budget
+        condensed = condensed[: budget * CHARS_PER_TOKEN].rsplit("\n", 1)[0]
+
+    decision.update(
+        text=condensed,
+        condensed=True,
+        tokens=estimate_tokens(condensed),
+        dropped_sections=dropped,
+    )
+    return decision
@@ -1,23 +1,198 @@
+"""Text extraction from memo uploads, in a pool of worker processes.
+
+pymupdf4llm and python-docx are CPU-bound and hold the GIL, so extracting on
+the job worker threads would serialize every upload on one core, and one
+pathological file would stall the rest. Extraction runs in separate
+processes instead, each with an address-space cap (``EXTRACT_MEMORY_MB``).
+Long PDFs are split into page ranges converted in parallel.
+
+A running task cannot be cancelled, and killing any one process breaks the
+whole ProcessPoolExecutor. So a document that overruns
+``EXTRACT_TIMEOUT_SECONDS`` retires its pool instead: new documents go to a
+fresh pool, the other documents in flight on the old one finish (or reach
+their own deadlines), and only then are the old pool's processes killed.
+
+Documents are passed to the workers as bytes, or as a file path for memos
+that storage.MemoBuffer spilled to disk, so large memos are not read back
+into memory and pickled to every worker. A PDF held as bytes is written to a
+temp file once before it is split, so page-range tasks share that file
+instead of each receiving a copy.
+"""
+import io
+import multiprocessing
 import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
 
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "120"))
+EXTRACT_MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "1024"))
+# PDFs longer than this are converted in page ranges of this size, in parallel
+PAGES_PER_TASK = 16
 
-def extract_text(file_path: str) -> str:
-    """Extract text from PDF or DOCX files."""
-    ext = os.path.splitext(file_path)[1].lower()
 
-    if ext == ".pdf":
-        return extract_pdf(file_path)
-    elif ext == ".docx":
-        return extract_docx(file_path)
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+class ExtractionTimeout(Exception):
+    pass
+
+
+def _init_worker(memory_mb: int):
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _open_pdf(source: bytes | str):
+    import pymupdf
+
+    if isinstance(source, str):
+        return pymupdf.open(source, filetype="pdf")
+    return pymupdf.open(stream=source, filetype="pdf")
+
 
+def _pdf_page_count(source: bytes | str) -> int:
+    with _open_pdf(source) as doc:
+        return doc.page_count
 
-def extract_pdf(file_path: str) -> str:
-    """Extract text from PDF using pymupdf4llm."""
+
+def _pdf_markdown(source: bytes | str, pages: list[int] | None = None) -> str:
     import pymupdf4llm
 
-    text = pymupdf4llm.to_markdown(file_path)
+    with _open_pdf(source) as doc:
+        return pymupdf4llm.to_markdown(doc, pages=pages, show_progress=False)
+
+
+def _docx_text(source: bytes | str) -> str:
+    from docx import Document
+
+    doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+    return "\n\n".join(p.text for p in doc.paragraphs if p.text.strip())
+
+
+class ExtractionPool:
+    """A process pool that is replaced, then killed, when one of its documents hangs."""
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, memory_mb: int = EXTRACT_MEMORY_MB):
+        self.workers = workers
+        self.memory_mb = memory_mb
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Unfinished tasks per executor, so a retired pool can wait for them
+        self._in_flight: dict[ProcessPoolExecutor, set[Future]] = {}
+
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent is a threaded server
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.memory_mb,),
+                )
+            return self._executor
+
+    def _track(self, executor: ProcessPoolExecutor, futures: list[Future]):
+        with self._lock:
+            self._in_flight.setdefault(executor, set()).update(futures)
+        for future in futures:
+            future.add_done_callback(lambda f: self._untrack(executor, f))
+
+    def _untrack(self, executor: ProcessPoolExecutor, future: Future):
+        with self._lock:
+            self._in_flight.get(executor, set()).discard(future)
+
+    def retire(self, executor: ProcessPoolExecutor, hung: list[Future]):
+        """Give ``executor`` no more work; kill it once its other tasks are done."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            others = self._in_flight.get(executor, set()) - set(hung)
+        threading.Thread(target=self._reset_when_drained, args=(executor, others), daemon=True).start()
+
+    def _reset_when_drained(self, executor: ProcessPoolExecutor, others: set[Future]):
+        # Every other task started less than a timeout ago and fails at its own deadline
+        wait(others, timeout=EXTRACT_TIMEOUT_SECONDS)
+        self.reset(executor)
+
+    def reset(self, executor: ProcessPoolExecutor):
+        """Kill the pool's processes now; the next task starts a fresh pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            self._in_flight.pop(executor, None)
+        # ProcessPoolExecutor cannot cancel a running task, only its process
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def map(self, fn, arg_lists: list[tuple], deadline: float) -> list:
+        """Run ``fn`` over every argument tuple, failing the lot at ``deadline``."""
+        executor = self.executor()
+        futures = []
+        try:
+            futures = [executor.submit(fn, *args) for args in arg_lists]
+            self._track(executor, futures)
+            return [f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures]
+        except FuturesTimeout:
+            self.retire(executor, futures)
+            raise ExtractionTimeout(f"Extraction took longer than {EXTRACT_TIMEOUT_SECONDS:.0f}s")
+        except BrokenProcessPool:
+            # A worker died (memory cap or crash) or a retired pool was killed; the pool is gone
+            self.reset(executor)
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = ExtractionPool()
+
+
+def extract_text(source: bytes | str, ext: str, timeout: float = EXTRACT_TIMEOUT_SECONDS) -> str:
+    """Extract text from PDF or DOCX bytes or file path; ``ext`` is the file extension, e.g. ".pdf"."""
+    deadline = time.monotonic() + timeout
+
+    try:
+        if ext == ".pdf":
+            return extract_pdf(source, deadline)
+        elif ext == ".docx":
+            return extract_docx(source, deadline)
+        else:
+            raise ValueError(f"Unsupported file type: {ext}")
+    except MemoryError:
+        raise ValueError(f"Document needs more than {EXTRACT_MEMORY_MB} MB to extract")
+
+
+def page_ranges(page_count: int, pages_per_task: int = PAGES_PER_TASK) -> list[list[int]]:
+    return [list(range(start, min(start + pages_per_task, page_count))) for start in range(0, page_count, pages_per_task)]
+
+
+def _ranged_pdf_markdown(source: bytes | str, page_count: int, deadline: float) -> str:
+    if isinstance(source, bytes):
+        # One copy on disk rather than one pickled copy per page range
+        with tempfile.NamedTemporaryFile(prefix="memo-", suffix=".pdf") as tmp:
+            tmp.write(source)
+            tmp.flush()
+            return _ranged_pdf_markdown(tmp.name, page_count, deadline)
+    parts = pool.map(_pdf_markdown, [(source, pages) for pages in page_ranges(page_count)], deadline)
+    return "".join(parts)
+
+
+def extract_pdf(source: bytes | str, deadline: float) -> str:
+    """Extract text from PDF using pymupdf4llm, page ranges in parallel."""
+    [page_count] = pool.map(_pdf_page_count, [(source,)], deadline)
+    if page_count > PAGES_PER_TASK:
+        text = _ranged_pdf_markdown(source, page_count, deadline)
+    else:
+        [text] = pool.map(_pdf_markdown, [(source,)], deadline)
 
     # Check if text is mostly empty (scanned image PDF)
     stripped = text.strip()
@@ -29,13 +204,9 @@ def extract_pdf(file_path: str) -> str:
     return stripped
 
 
-def extract_docx(file_path: str) -> str:
+def extract_docx(source: bytes | str, deadline: float) -> str:
     """Extract text from DOCX using python-docx."""
-    from docx import Document
-
-    doc = Document(file_path)
-    paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
-    text = "\n\n".join(paragraphs)
+    [text] = pool.map(_docx_text, [(source,)], deadline)
 
     if len(text.strip()) < 50:
         raise ValueError("Document appears to be empty or unreadable.")
@@ -0,0 +1,161 @@
+"""A local stand-in for the Anthropic Message Batches API.
+
+Implements create, retrieve and results for ``/v1/messages/batches`` so batch
+analysis can be tested without network access or cost. Each batch reports
+``in_progress`` for ``polls_until_ended`` retrievals, then ``ended``.
+``respond`` maps a request's params to the reply text, or to
+``{"error": "<type>"}`` for an errored result. Usage reports a prompt-cache
+write for the first request with a given system prompt and reads after that.
+
+Run it standalone and point the processor at it with ANTHROPIC_BASE_URL:
+
+    python fake_batch_server.py --port 8090
+"""
+import argparse
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+CANNED_ANALYSIS = {
+    "position": "net_positive",
+    "thesis": "Trade liberalization raised aggregate welfare.",
+    "key_claims": ["Consumer prices fell after tariff cuts."],
+    "citations": [],
+    "stance_strength": "moderate",
+    "reasoning": "Canned reply from the fake batch server.",
+}
+
+
+def canned_response(params: dict) -> str:
+    return json.dumps(CANNED_ANALYSIS)
+
+
+class FakeBatchServer:
+    def __init__(self, respond: Callable[[dict], str | dict] = canned_response, polls_until_ended: int = 1, port: int = 0):
+        self.respond = respond
+        self.polls_until_ended = polls_until_ended
+        self.batches: dict[str, dict] = {}
+        self._cached_prefixes: set[str] = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeBatchServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _batch_object(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        ended = batch["polls"] > self.polls_until_ended
+        count = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": batch["created_at"],
+            "expires_at": batch["expires_at"],
+            "ended_at": batch["created_at"] if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def _usage(self, params: dict, reply: str) -> dict:
+        prefix = json.dumps(params.get("system", ""))
+        prefix_tokens = len(prefix) // 4
+        cached = prefix in self._cached_prefixes
+        self._cached_prefixes.add(prefix)
+        return {
+            "input_tokens": len(json.dumps(params["messages"])) // 4,
+            "output_tokens": len(reply) // 4,
+            "cache_creation_input_tokens": 0 if cached else prefix_tokens,
+            "cache_read_input_tokens": prefix_tokens if cached else 0,
+        }
+
+    def _result(self, request: dict) -> dict:
+        reply = self.respond(request["params"])
+        if isinstance(reply, dict) and "error" in reply:
+            result = {
+                "type": "errored",
+                "error": {"type": "error", "error": {"type": reply["error"], "message": reply["error"]}},
+            }
+        else:
+            result = {
+                "type": "succeeded",
+                "message": {
+                    "id": f"msg_{uuid.uuid4().hex[:24]}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": request["params"]["model"],
+                    "content": [{"type": "text", "text": reply}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": self._usage(request["params"], reply),
+                },
+            }
+        return {"custom_id": request["custom_id"], "result": result}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: str, content_type: str = "application/json"):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/messages/batches":
+                    return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                now = datetime.now(timezone.utc)
+                batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+                server.batches[batch_id] = {
+                    "requests": body["requests"],
+                    "polls": 0,
+                    "created_at": now.isoformat(),
+                    "expires_at": (now + timedelta(hours=24)).isoformat(),
+                }
+                self._send(200, json.dumps(server._batch_object(batch_id)))
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[:3] != ["v1", "messages", "batches"] or len(parts) < 4 or parts[3] not in server.batches:
+                    return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}))
+                batch_id = parts[3]
+                if len(parts) == 5 and parts[4] == "results":
+                    lines = [json.dumps(server._result(r)) for r in server.batches[batch_id]["requests"]]
+                    return self._send(200, "\n".join(lines) + "\n", "application/x-jsonl")
+                server.batches[batch_id]["polls"] += 1
+                self._send(200, json.dumps(server._batch_object(batch_id)))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--polls", type=int, default=1, help="retrievals before a batch ends")
+    args = parser.parse_args()
+    fake = FakeBatchServer(polls_until_ended=args.polls, port=args.port)
+    print(f"Fake batch server on {fake.url}")
+    fake._server.serve_forever()
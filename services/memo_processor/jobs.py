@@ -0,0 +1,324 @@
+"""Durable job queue for memo processing.
+
+``POST /process`` only records a row in ``memo_jobs``; worker threads claim
+due jobs with ``FOR UPDATE SKIP LOCKED``, so any number of workers (and
+processor instances) share the queue without running a memo twice, and
+queued work survives a restart. Progress is reported through the existing
+``memos.status`` transitions.
+
+A job that fails with a transient error (rate limit, overloaded API,
+network or database hiccup) is re-queued with exponential backoff until it
+runs out of attempts; any other failure fails the job and marks the memo
+``error``.
+
+Jobs whose analysis goes through the Message Batches API (``analysis_mode``
+``batch``) are ``batched`` between extraction and the batch's results; see
+batch_analysis.py.
+"""
+import os
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+
+import anthropic
+import httpx
+import psycopg2
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+from analyzer import BatchRequestFailed
+from cache import prompt_hash
+
+MAX_ATTEMPTS = int(os.getenv("MEMO_JOB_ATTEMPTS", "4"))
+RETRY_BASE_SECONDS = 15
+# Jobs queued by /process_assignment run after any single upload that is due
+BULK_PRIORITY = 1
+# A job still running after this long lost its worker (crash or restart)
+STALE_JOB_SECONDS = 600
+
+# Statuses of a job that has not finished; a memo has at most one such job
+PENDING = "('queued', 'running', 'batched')"
+ANALYSIS_MODES = ("sync", "batch")
+DEFAULT_ANALYSIS_MODE = os.getenv("MEMO_ANALYSIS_MODE", "sync")
+
+JOB_COLUMNS = "id::text, memo_id::text, batch_id::text, skip_cache, analysis_mode, status, attempts, max_attempts, run_after, last_error, created_at, finished_at"
+RETRYABLE_S3_CODES = {"SlowDown", "Throttling", "RequestTimeout", "InternalError", "ServiceUnavailable"}
+
+
+def _row(cur) -> dict | None:
+    row = cur.fetchone()
+    return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+
+def is_transient(exc: Exception) -> bool:
+    """Whether retrying the job later could succeed."""
+    if isinstance(exc, BatchRequestFailed):
+        return exc.transient
+    if isinstance(exc, (anthropic.APIConnectionError, anthropic.RateLimitError)):
+        return True
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code >= 500
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code") in RETRYABLE_S3_CODES
+    return isinstance(
+        exc,
+        (
+            BotoConnectionError,
+            BrokenProcessPool,
+            HTTPClientError,
+            httpx.TransportError,
+            psycopg2.OperationalError,
+            ConnectionError,
+            TimeoutError,
+        ),
+    )
+
+
+def enqueue_job(conn, memo_id: str, analysis_mode: str = DEFAULT_ANALYSIS_MODE) -> dict:
+    """Queue a memo for processing; returns its pending job if it already has one."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""INSERT INTO memo_jobs (memo_id, max_attempts, analysis_mode) VALUES (%s, %s, %s)
+            ON CONFLICT (memo_id) WHERE status IN {PENDING} DO NOTHING
+            RETURNING {JOB_COLUMNS}""",
+            (memo_id, MAX_ATTEMPTS, analysis_mode),
+        )
+        job = _row(cur)
+        if job is None:
+            cur.execute(
+                f"SELECT {JOB_COLUMNS} FROM memo_jobs WHERE memo_id = %s AND status IN {PENDING}",
+                (memo_id,),
+            )
+            job = _row(cur)
+        else:
+            cur.execute("UPDATE memos SET status = 'uploaded' WHERE id = %s", (memo_id,))
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def enqueue_assignment(
+    conn, assignment_id: str, force: bool = False, analysis_mode: str = DEFAULT_ANALYSIS_MODE
+) -> dict:
+    """Queue every memo of an assignment that needs (re)analysis as one batch.
+
+    That is memos never analyzed successfully, and analyzed memos whose
+    analysis was made against a different assignment prompt; ``force``
+    queues all of them. Memos that already have a pending job are left to
+    it; forced jobs also bypass the analysis cache. Returns the batch id and
+    counts.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT prompt_text FROM assignments WHERE id = %s", (assignment_id,))
+        assignment = cur.fetchone()
+        if assignment is None:
+            raise ValueError("Assignment not found")
+
+        params = {
+            "assignment_id": assignment_id,
+            "prompt_hash": prompt_hash(assignment[0] or ""),
+            "force": force,
+            "batch_id": str(uuid.uuid4()),
+            "priority": BULK_PRIORITY,
+            "max_attempts": MAX_ATTEMPTS,
+            "analysis_mode": analysis_mode,
+        }
+        selected = """SELECT m.id FROM memos m
+            WHERE m.assignment_id = %(assignment_id)s AND m.file_path IS NOT NULL
+            AND (
+                %(force)s OR m.status <> 'analyzed'
+                -- Memos analyzed before prompt hashes were stored have none
+                OR m.analysis_prompt_hash IS DISTINCT FROM %(prompt_hash)s
+            )"""
+        cur.execute(
+            f"""WITH queued AS (
+                INSERT INTO memo_jobs (memo_id, batch_id, priority, max_attempts, skip_cache, analysis_mode)
+                SELECT id, %(batch_id)s, %(priority)s, %(max_attempts)s, %(force)s, %(analysis_mode)s
+                FROM ({selected}) s
+                ON CONFLICT (memo_id) WHERE status IN {PENDING} DO NOTHING
+                RETURNING memo_id
+            ),
+            waiting AS (
+                UPDATE memos SET status = 'uploaded' WHERE id IN (SELECT memo_id FROM queued)
+            )
+            SELECT (SELECT count(*) FROM queued), (SELECT count(*) FROM ({selected}) s)""",
+            params,
+        )
+        queued, selected_count = cur.fetchone()
+        conn.commit()
+        return {
+            "batch_id": params["batch_id"] if queued else None,
+            "queued": queued,
+            "already_pending": selected_count - queued,
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def batch_progress(conn, batch_id: str) -> dict | None:
+    """Aggregate status, throughput and ETA of a /process_assignment batch."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT count(*) AS total,
+                count(*) FILTER (WHERE status = 'queued') AS queued,
+                count(*) FILTER (WHERE status = 'running') AS running,
+                count(*) FILTER (WHERE status = 'batched') AS batched,
+                count(*) FILTER (WHERE status = 'done') AS done,
+                count(*) FILTER (WHERE status = 'failed') AS failed,
+                sum(greatest(attempts - 1, 0)) AS retries,
+                min(created_at) AS started_at,
+                extract(epoch FROM (
+                    CASE WHEN bool_and(status IN ('done', 'failed')) THEN max(finished_at) ELSE NOW() END
+                    - min(created_at)
+                )) AS elapsed_seconds
+            FROM memo_jobs WHERE batch_id = %s""",
+            (batch_id,),
+        )
+        progress = _row(cur)
+    finally:
+        cur.close()
+    if not progress or not progress["total"]:
+        return None
+
+    finished = progress["done"] + progress["failed"]
+    elapsed = float(progress["elapsed_seconds"] or 0)
+    rate = finished / elapsed if elapsed > 0 else 0.0
+    progress["elapsed_seconds"] = round(elapsed, 1)
+    progress["memos_per_minute"] = round(rate * 60, 1)
+    progress["eta_seconds"] = round((progress["total"] - finished) / rate) if rate else None
+    progress["complete"] = finished == progress["total"]
+    return {"batch_id": batch_id, **progress}
+
+
+def claim_job(conn) -> dict | None:
+    """Take the oldest due job, or None if the queue is empty."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""UPDATE memo_jobs
+            SET status = 'running', attempts = attempts + 1, locked_at = NOW()
+            WHERE id = (
+                SELECT id FROM memo_jobs
+                WHERE status = 'queued' AND run_after <= NOW()
+                ORDER BY priority, run_after
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {JOB_COLUMNS}"""
+        )
+        job = _row(cur)
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def defer_job(conn, job_id: str):
+    """Park an extracted job until the batch submitter sends its analysis."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """UPDATE memo_jobs SET status = 'batched', locked_at = NULL, analysis_batch_id = NULL
+            WHERE id = %s""",
+            (job_id,),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def complete_job(conn, job_id: str):
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE memo_jobs SET status = 'done', last_error = NULL, finished_at = NOW() WHERE id = %s",
+            (job_id,),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def fail_job(conn, job_id: str, error: str, retry: bool) -> str:
+    """Re-queue the job with backoff, or fail it and its memo.
+
+    Returns the job's new status (``queued`` or ``failed``).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """UPDATE memo_jobs
+            SET status = CASE WHEN %(retry)s AND attempts < max_attempts
+                    THEN 'queued' ELSE 'failed' END::memo_job_status,
+                run_after = NOW() + make_interval(secs => %(base)s * power(2, attempts - 1)),
+                locked_at = NULL,
+                last_error = %(error)s,
+                finished_at = CASE WHEN %(retry)s AND attempts < max_attempts THEN NULL ELSE NOW() END
+            WHERE id = %(job_id)s
+            RETURNING memo_id, status""",
+            {"job_id": job_id, "error": error[:2000], "retry": retry, "base": RETRY_BASE_SECONDS},
+        )
+        memo_id, status = cur.fetchone()
+        cur.execute(
+            "UPDATE memos SET status = %s WHERE id = %s",
+            ("uploaded" if status == "queued" else "error", memo_id),
+        )
+        conn.commit()
+        return status
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def requeue_stale_jobs(conn, stale_seconds: int = STALE_JOB_SECONDS) -> int:
+    """Return jobs abandoned by a dead worker to the queue (or fail them if out of attempts)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """WITH stale AS (
+                UPDATE memo_jobs
+                SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END::memo_job_status,
+                    locked_at = NULL,
+                    last_error = 'Worker stopped before the job finished',
+                    finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END
+                WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => %s)
+                RETURNING memo_id, status
+            )
+            UPDATE memos m
+            SET status = CASE WHEN stale.status = 'queued' THEN 'uploaded' ELSE 'error' END::memo_status
+            FROM stale WHERE m.id = stale.memo_id""",
+            (stale_seconds,),
+        )
+        requeued = cur.rowcount
+        conn.commit()
+        return requeued
+    finally:
+        cur.close()
+
+
+def get_job(conn, job_id: str) -> dict | None:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT j.id::text, j.memo_id::text, j.status, j.attempts, j.max_attempts, j.run_after,
+                j.last_error, j.created_at, j.finished_at, m.status AS memo_status
+            FROM memo_jobs j JOIN memos m ON m.id = j.memo_id
+            WHERE j.id = %s""",
+            (job_id,),
+        )
+        return _row(cur)
+    finally:
+        cur.close()
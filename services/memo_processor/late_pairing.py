@@ -0,0 +1,37 @@
+"""Pair late submissions as soon as their memos are analyzed.
+
+On by default (``AUTO_PAIR_LATE_MEMOS``). A memo's first successful
+analysis asks the pairing engine to pair the students who are in no
+pairing yet (late submitters and students whose pairing was deleted)
+against each other; the engine does nothing until the assignment has
+been paired once. Re-analyses, e.g. bulk or forced re-runs, never
+pair. Existing pairings are left alone. Runs after claim linking, so the
+new memo's claim embeddings are already stored for the diversity score.
+"""
+import os
+
+import httpx
+
+PAIRING_ENGINE_URL = os.getenv("PAIRING_ENGINE_URL", "http://localhost:8003")
+AUTO_PAIR_LATE_MEMOS = os.getenv("AUTO_PAIR_LATE_MEMOS", "true").lower() == "true"
+
+
+def first_analysis(conn, memo_id: str) -> bool:
+    """Whether the memo's job that just completed is its first completed job."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM memo_jobs WHERE memo_id = %s AND status = 'done'", (memo_id,))
+        return cur.fetchone()[0] == 1
+    finally:
+        cur.close()
+
+
+def pair_late_students(assignment_id: str) -> int:
+    """Returns the number of new pairings."""
+    response = httpx.post(
+        f"{PAIRING_ENGINE_URL}/pair/incremental",
+        json={"assignment_id": assignment_id},
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return len(response.json()["pairs"])
@@ -0,0 +1,104 @@
+"""The per-memo pipeline run by the job workers: fetch, extract, analyze, save."""
+import json
+
+from cache import analyze_cached, extract_cached, lookup_analysis, prompt_hash
+from condenser import condense_memo
+from storage import open_memo
+
+
+def save_analysis(conn, memo_id: str, prompt_text: str, analysis: dict):
+    position_binary = analysis.get("position", "unclassified")
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """UPDATE memos
+            SET status = 'analyzed',
+                analysis = %s::jsonb,
+                position_binary = %s,
+                analyzed_at = NOW(),
+                analysis_prompt_hash = %s
+            WHERE id = %s""",
+            (json.dumps(analysis), position_binary, prompt_hash(prompt_text), memo_id),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def process_memo_file(
+    conn, memo_id: str, use_cache: bool = True, analysis_mode: str = "sync"
+) -> tuple[str, dict | None]:
+    """Extract and analyze one memo, advancing memos.status as it goes.
+
+    Text over the token budget is condensed before analysis (see condenser),
+    and the decision is recorded on ``memos.condensation``.
+    Extraction and analysis results are reused from the content-hash caches;
+    ``use_cache=False`` still reuses extracted text but re-runs the analysis.
+    In ``batch`` mode a cache miss is not analyzed here: the memo is left
+    ``analyzing`` and None is returned, for the batch submitter to pick up.
+
+    Returns (assignment_id, analysis). Failures propagate to the job worker,
+    which decides between a retry and marking the memo ``error``.
+    """
+    cur = conn.cursor()
+    try:
+        # Get memo record
+        cur.execute(
+            "SELECT id, file_path, assignment_id FROM memos WHERE id = %s",
+            (memo_id,),
+        )
+        memo = cur.fetchone()
+        if not memo:
+            raise ValueError("Memo not found")
+
+        _, file_path, assignment_id = memo
+
+        # Update status to extracting
+        cur.execute(
+            "UPDATE memos SET status = 'extracting' WHERE id = %s", (memo_id,)
+        )
+        conn.commit()
+
+        # Stream the file into memory and extract text
+        with open_memo(file_path) as memo_file:
+            extracted_text = extract_cached(conn, memo_file, str(assignment_id), memo_id)
+
+        # Fit the text sent for analysis into the token budget
+        condensation = condense_memo(extracted_text)
+        analysis_text = condensation.pop("text")
+        if condensation["condensed"]:
+            print(
+                f"[condense] Memo {memo_id}: {condensation['original_tokens']} -> {condensation['tokens']} tokens, "
+                f"dropped {len(condensation['dropped_sections'])} sections"
+            )
+
+        # Update status and text
+        cur.execute(
+            """UPDATE memos SET status = 'analyzing', extracted_text = %s, condensation = %s::jsonb
+            WHERE id = %s""",
+            (extracted_text, json.dumps(condensation), memo_id),
+        )
+        conn.commit()
+
+        # Get assignment prompt for analysis
+        cur.execute(
+            "SELECT prompt_text FROM assignments WHERE id = %s", (assignment_id,)
+        )
+        assignment = cur.fetchone()
+        prompt_text = assignment[0] if assignment else ""
+    finally:
+        cur.close()
+
+    # Analyze with Claude
+    assignment_id = str(assignment_id)
+    if analysis_mode == "batch":
+        analysis = lookup_analysis(conn, analysis_text, prompt_text, assignment_id, memo_id) if use_cache else None
+        if analysis is None:
+            return assignment_id, None
+    else:
+        analysis = analyze_cached(
+            conn, analysis_text, prompt_text, assignment_id=assignment_id, memo_id=memo_id, use_cache=use_cache
+        )
+
+    save_analysis(conn, memo_id, prompt_text, analysis)
+    return assignment_id, analysis
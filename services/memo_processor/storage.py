@@ -0,0 +1,120 @@
+"""Memo file access for the processor, for S3 and local uploads alike.
+
+Objects are streamed into a MemoBuffer. The buffer keeps up to
+``MEMO_BUFFER_MB`` in memory and spills anything larger to a temporary
+file, removed when the buffer is closed. Extraction workers get small memos
+as bytes and spilled ones as the temp file's path (``MemoBuffer.source``),
+so a large memo is never held in memory by the processor. Files over
+``MAX_MEMO_MB`` are refused before extraction. The sha256 of the bytes is
+computed while streaming, for the extraction cache.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+import boto3
+
+S3_ENDPOINT = os.getenv("S3_ENDPOINT", "http://localhost:9000")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "minioadmin")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "minioadmin")
+S3_BUCKET = os.getenv("S3_BUCKET", "debates")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "app", "uploads"))
+USE_FS = "localhost" in S3_ENDPOINT or os.getenv("STORAGE_MODE") == "fs"
+
+MEMO_BUFFER_BYTES = int(os.getenv("MEMO_BUFFER_MB", "8")) * 1024 * 1024
+MAX_MEMO_BYTES = int(os.getenv("MAX_MEMO_MB", "25")) * 1024 * 1024
+STREAM_CHUNK_SIZE = 1 << 20
+
+s3 = None if USE_FS else boto3.client(
+    "s3",
+    endpoint_url=S3_ENDPOINT,
+    aws_access_key_id=S3_ACCESS_KEY,
+    aws_secret_access_key=S3_SECRET_KEY,
+)
+
+
+class MemoTooLarge(ValueError):
+    pass
+
+
+class MemoBuffer:
+    """A memo file's bytes, in memory up to a threshold and on disk beyond it."""
+
+    def __init__(self, file_path: str, max_bytes: int = MAX_MEMO_BYTES, memory_bytes: int = MEMO_BUFFER_BYTES):
+        self.ext = os.path.splitext(file_path)[1].lower()
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = io.BytesIO()
+        self.spilled = False
+
+    def reserve(self, size: int):
+        """Refuse a file whose size is over the cap, before or while reading it."""
+        if size > self.max_bytes:
+            raise MemoTooLarge(f"Memo is larger than {self.max_bytes // (1024 * 1024)} MB")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        self.reserve(self.size)
+        self._digest.update(chunk)
+        if not self.spilled and self.size > self.memory_bytes:
+            # Named, so extraction workers can open it themselves
+            spill = tempfile.NamedTemporaryFile(prefix="memo-", suffix=self.ext)
+            spill.write(self._file.getvalue())
+            self._file, self.spilled = spill, True
+        self._file.write(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def getvalue(self) -> bytes:
+        self._file.seek(0)
+        return self._file.read()
+
+    def source(self) -> bytes | str:
+        """What to hand to extraction: the bytes, or the path of the spilled file."""
+        if self.spilled:
+            self._file.flush()
+            return self._file.name
+        return self._file.getvalue()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _stream_into(buf: MemoBuffer, stream):
+    while chunk := stream.read(STREAM_CHUNK_SIZE):
+        buf.write(chunk)
+
+
+def open_memo(file_path: str) -> MemoBuffer:
+    """Stream a stored memo (S3 key or path under UPLOAD_DIR) into a MemoBuffer."""
+    buf = MemoBuffer(file_path)
+    try:
+        if USE_FS:
+            local_path = os.path.join(UPLOAD_DIR, file_path)
+            if not os.path.exists(local_path):
+                raise FileNotFoundError(f"File not found: {local_path}")
+            buf.reserve(os.path.getsize(local_path))
+            with open(local_path, "rb") as f:
+                _stream_into(buf, f)
+        else:
+            obj = s3.get_object(Bucket=S3_BUCKET, Key=file_path)
+            try:
+                buf.reserve(obj["ContentLength"])
+                _stream_into(buf, obj["Body"])
+            finally:
+                obj["Body"].close()
+        return buf
+    except Exception:
+        buf.close()
+        raise
@@ -0,0 +1,52 @@
+"""Tests for the analysis prompt's cached prefix."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analyzer
+from analyzer import MIN_CACHEABLE_TOKENS, check_cacheable_prefix
+
+
+@pytest.fixture(autouse=True)
+def fresh_counts():
+    check_cacheable_prefix.cache_clear()
+    yield
+    check_cacheable_prefix.cache_clear()
+
+
+def test_short_prefix_is_reported_once_per_assignment_prompt(capsys):
+    client = MagicMock()
+    client.messages.count_tokens.return_value = MagicMock(input_tokens=600)
+    with patch.object(analyzer, "client", client):
+        assert check_cacheable_prefix("Is free trade net positive?") == 600
+        assert check_cacheable_prefix("Is free trade net positive?") == 600
+
+    client.messages.count_tokens.assert_called_once()
+    system = client.messages.count_tokens.call_args.kwargs["system"]
+    assert system[-1]["cache_control"] == {"type": "ephemeral"}
+    assert f"under the {MIN_CACHEABLE_TOKENS}-token minimum" in capsys.readouterr().out
+
+
+def test_long_enough_prefix_is_not_reported(capsys):
+    client = MagicMock()
+    client.messages.count_tokens.return_value = MagicMock(input_tokens=MIN_CACHEABLE_TOKENS + 50)
+    with patch.object(analyzer, "client", client):
+        check_cacheable_prefix("Is free trade net positive?")
+    assert capsys.readouterr().out == ""
+
+
+def test_counting_failure_does_not_block_analysis():
+    client = MagicMock()
+    client.messages.count_tokens.side_effect = RuntimeError("offline")
+    client.messages.create.return_value = MagicMock(
+        content=[MagicMock(text='{"position": "net_positive", "thesis": "t", "key_claims": [], '
+                                '"citations": [], "stance_strength": "weak"}')],
+    )
+    with patch.object(analyzer, "client", client), patch("analyzer.log_usage"):
+        assert analyzer.analyze_memo("memo", "prompt")["position"] == "net_positive"
+    assert check_cacheable_prefix("prompt") is None
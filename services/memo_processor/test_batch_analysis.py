@@ -0,0 +1,112 @@
+"""Tests for message-batch memo analysis against the fake batch server."""
+
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from anthropic import Anthropic
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analyzer
+from analyzer import BatchRequestFailed, analysis_batch_ended, analysis_batch_results, submit_analysis_batch
+from batch_analysis import finish_ended_batches
+from fake_batch_server import CANNED_ANALYSIS, FakeBatchServer
+
+
+def _respond(params):
+    memo = params["messages"][0]["content"]
+    if "OVERLOADED" in memo:
+        return {"error": "overloaded_error"}
+    if "GARBLED" in memo:
+        return "Sure! Here is my analysis."
+    return json.dumps(CANNED_ANALYSIS)
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeBatchServer(_respond, polls_until_ended=2).start()
+    with patch.object(analyzer, "client", Anthropic(base_url=server.url, api_key="test")), \
+            patch("analyzer.log_usage") as log:
+        yield server, log
+    server.stop()
+
+
+def test_batch_round_trip_validates_like_sync_analysis(fake_api):
+    server, log = fake_api
+    batch_id = submit_analysis_batch({
+        "job-1": ("Free trade lowers prices.", "Is free trade net positive?"),
+        "job-2": ("OVERLOADED memo", "Is free trade net positive?"),
+        "job-3": ("GARBLED memo", "Is free trade net positive?"),
+    })
+    assert len(server.batches[batch_id]["requests"]) == 3
+
+    assert analysis_batch_ended(batch_id) is False
+    assert analysis_batch_ended(batch_id) is False
+    assert analysis_batch_ended(batch_id) is True
+
+    results = analysis_batch_results(batch_id, {"job-1": {"assignment_id": "a1", "memo_id": "m1"}})
+    assert results["job-1"] == CANNED_ANALYSIS
+    assert isinstance(results["job-2"], BatchRequestFailed) and results["job-2"].transient
+    assert isinstance(results["job-3"], ValueError)
+
+    usage = [c.kwargs for c in log.call_args_list]
+    assert {u["call_type"] for u in usage} == {"memo_analysis_batch"}
+    assert all(u["batch"] for u in usage)
+    assert usage[0]["memo_id"] == "m1"
+
+
+def test_ended_batch_results_are_written_back():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = [("msgbatch_1",)]
+    jobs = [
+        ("j1", "m1", "a1", "memo one", "prompt"),
+        ("j2", "m2", "a1", "memo two", "prompt"),
+    ]
+    results = {"j1": CANNED_ANALYSIS, "j2": BatchRequestFailed("Batch request errored: overloaded_error", "overloaded_error")}
+    with patch("batch_analysis.analysis_batch_ended", return_value=True), \
+            patch("batch_analysis._claim_batch", return_value=jobs), \
+            patch("batch_analysis.analysis_batch_results", return_value=results), \
+            patch("batch_analysis.store_analysis") as store, \
+            patch("batch_analysis.save_analysis") as save, \
+            patch("batch_analysis.complete_job") as complete, \
+            patch("batch_analysis.fail_job", return_value="queued") as fail:
+        analyzed = finish_ended_batches(conn)
+
+    assert analyzed == [("m1", "a1", CANNED_ANALYSIS)]
+    store.assert_called_once_with(conn, "memo one", "prompt", CANNED_ANALYSIS)
+    save.assert_called_once_with(conn, "m1", "prompt", CANNED_ANALYSIS)
+    complete.assert_called_once_with(conn, "j1")
+    assert fail.call_args.args[1] == "j2" and fail.call_args.kwargs["retry"] is True
+
+
+def test_open_batch_is_left_alone():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = [("msgbatch_1",)]
+    with patch("batch_analysis.analysis_batch_ended", return_value=False), \
+            patch("batch_analysis._claim_batch") as claim:
+        assert finish_ended_batches(conn) == []
+    claim.assert_not_called()
+
+
+def test_assignment_prefix_is_cached_and_memo_is_the_suffix(fake_api):
+    server, log = fake_api
+    batch_id = submit_analysis_batch({
+        "job-1": ("Free trade lowers prices.", "Is free trade net positive?"),
+        "job-2": ("Tariffs protect jobs.", "Is free trade net positive?"),
+    })
+    params = [r["params"] for r in server.batches[batch_id]["requests"]]
+    assert params[0]["system"] == params[1]["system"]
+    assert params[0]["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "Is free trade net positive?" in params[0]["system"][-1]["text"]
+    assert "Free trade lowers prices." in params[0]["messages"][0]["content"]
+    assert "Free trade lowers prices." not in json.dumps(params[0]["system"])
+
+    while not analysis_batch_ended(batch_id):
+        pass
+    analysis_batch_results(batch_id, {})
+    usage = [c.kwargs for c in log.call_args_list]
+    assert usage[0]["cache_creation_tokens"] > 0 and usage[0]["cache_read_tokens"] == 0
+    assert usage[1]["cache_read_tokens"] == usage[0]["cache_creation_tokens"]
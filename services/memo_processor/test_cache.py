@@ -0,0 +1,76 @@
+"""Tests for the extraction and analysis caches."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from cache import analyze_cached, extract_cached
+from storage import MemoBuffer
+
+ANALYSIS = {"position": "net_positive", "thesis": "Trade helps", "key_claims": [], "citations": [], "stance_strength": "strong"}
+
+
+@pytest.fixture
+def conn():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = None
+    return conn
+
+
+def _memo(data=b"%PDF memo"):
+    buf = MemoBuffer("memos/a1/s1/1.pdf")
+    buf.write(data)
+    return buf
+
+
+def test_reupload_skips_extraction(conn):
+    conn.cursor.return_value.fetchone.return_value = ("Cached memo text",)
+    with patch("cache.extract_text") as extract, patch("cache.log_usage") as log:
+        assert extract_cached(conn, _memo(), assignment_id="a1", memo_id="m1") == "Cached memo text"
+    extract.assert_not_called()
+    assert conn.cursor.return_value.execute.call_args.args[1] == (_memo().sha256,)
+    log.assert_called_once()
+    assert log.call_args.kwargs["call_type"] == "memo_extraction_cache_hit"
+    assert log.call_args.kwargs["service"] == "memo_cache" and log.call_args.kwargs["model"] is None
+    assert log.call_args.kwargs["memo_id"] == "m1" and log.call_args.kwargs["assignment_id"] == "a1"
+
+
+def test_extraction_miss_is_stored(conn):
+    with patch("cache.extract_text", return_value="Fresh text") as extract, patch("cache.log_usage") as log:
+        assert extract_cached(conn, _memo(), assignment_id="a1", memo_id="m1") == "Fresh text"
+    extract.assert_called_once_with(b"%PDF memo", ".pdf")
+    insert = conn.cursor.return_value.execute.call_args
+    assert "INSERT INTO memo_extraction_cache" in insert.args[0]
+    assert insert.args[1][1] == "Fresh text"
+    assert log.call_args.kwargs["call_type"] == "memo_extraction_cache_miss"
+    assert log.call_args.kwargs["service"] == "memo_cache"
+    assert log.call_args.kwargs["input_tokens"] == log.call_args.kwargs["output_tokens"] == 0
+
+
+def test_analysis_hit_is_logged_without_calling_claude(conn):
+    conn.cursor.return_value.fetchone.return_value = (ANALYSIS,)
+    with patch("cache.analyze_memo") as analyze, patch("cache.log_usage") as log:
+        assert analyze_cached(conn, "memo text", "prompt", assignment_id="a1", memo_id="m1") == ANALYSIS
+    analyze.assert_not_called()
+    assert log.call_args.kwargs["call_type"] == "memo_analysis_cache_hit"
+    assert log.call_args.kwargs["service"] == "claude"
+
+
+def test_changed_prompt_misses_the_cache(conn):
+    with patch("cache.analyze_memo", return_value=ANALYSIS):
+        analyze_cached(conn, "memo text", "prompt v1")
+        analyze_cached(conn, "memo text", "prompt v2")
+    inserts = [c.args[1] for c in conn.cursor.return_value.execute.call_args_list if "INSERT" in c.args[0]]
+    assert inserts[0][0] == inserts[1][0] and inserts[0][1] != inserts[1][1]
+
+
+def test_bypass_reanalyzes_and_overwrites(conn):
+    conn.cursor.return_value.fetchone.return_value = ({"stale": True},)
+    with patch("cache.analyze_memo", return_value=ANALYSIS) as analyze:
+        assert analyze_cached(conn, "memo text", "prompt", use_cache=False) == ANALYSIS
+    analyze.assert_called_once()
+    assert "DO UPDATE" in conn.cursor.return_value.execute.call_args.args[0]
@@ -0,0 +1,76 @@
+"""Tests for linking memo claims to reading passages."""
+
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+from claim_links import embed_claims, link_claims
+
+ANALYSIS = {"thesis": "Trade helps", "key_claims": ["Prices fell", "", "Jobs grew", "  "]}
+
+
+def _response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+
+def test_claim_embeddings_are_stored_for_key_claims_only():
+    conn = MagicMock()
+    payload = {"model": "m", "embeddings": [[1.123456789, 0.0], [2.123456789, 0.0]]}
+    with patch("claim_links.httpx.post", return_value=_response(payload)) as post:
+        assert embed_claims(conn, "m1", ANALYSIS) == 2
+
+    assert post.call_args.args[0].endswith("/embed")
+    assert post.call_args.kwargs["json"] == {"texts": ["Prices fell", "Jobs grew"]}
+    embeddings, memo_id = conn.cursor.return_value.execute.call_args.args[1]
+    assert memo_id == "m1"
+    assert json.loads(embeddings) == [[1.12346, 0.0], [2.12346, 0.0]]
+
+
+def test_passages_are_linked_for_the_thesis_and_claims():
+    conn = MagicMock()
+    payload = {"results": [{"query": q, "results": [{"synopsis": q}]} for q in ("Trade helps", "Prices fell", "Jobs grew")]}
+    with patch("claim_links.httpx.post", return_value=_response(payload)) as post:
+        assert link_claims(conn, "m1", "a1", ANALYSIS) == 3
+
+    assert post.call_args.args[0].endswith("/query/batch")
+    sql, (passages, memo_id) = conn.cursor.return_value.execute.call_args.args
+    assert "claim_embeddings" not in sql
+    assert [c["kind"] for c in json.loads(passages)] == ["thesis", "claim", "claim"]
+
+
+def test_embeddings_are_stored_when_passage_linking_fails():
+    conn = MagicMock()
+    embed = _response({"model": "m", "embeddings": [[0.5], [0.25]]})
+
+    def post(url, **kwargs):
+        if url.endswith("/query/batch"):
+            raise httpx.ConnectError("indexer down")
+        return embed
+
+    with patch("main.worker_db") as worker_db, patch("claim_links.httpx.post", side_effect=post):
+        worker_db.return_value.__enter__.return_value = conn
+        main.link_memo_claims("m1", "a1", ANALYSIS)
+
+    [call] = conn.cursor.return_value.execute.call_args_list
+    assert "claim_embeddings" in call.args[0]
+
+
+def test_memos_without_embeddings_are_backfilled_on_request():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = [("m1", ANALYSIS)]
+    with patch("main.get_db", return_value=conn), patch("main.embed_memo_claims") as embed:
+        response = TestClient(main.app).post("/embed_claims", json={"assignment_id": "a1"})
+
+    assert response.json() == {"queued": 1}
+    sql, params = conn.cursor.return_value.execute.call_args.args
+    assert "claim_embeddings IS NULL" in sql and params == ("a1",)
+    embed.assert_called_once_with("m1", ANALYSIS)
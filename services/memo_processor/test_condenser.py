@@ -0,0 +1,88 @@
+"""Tests for token-budget memo condensation."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from condenser import condense_memo, drop_repeated_lines, estimate_tokens
+
+FILLER = "Trade volumes rose steadily over the period. " * 40
+
+
+def _memo(pages: int = 6) -> str:
+    body = []
+    for page in range(1, pages + 1):
+        body.append(f"ECON 101 Memo — Student A\n\n{FILLER}\n\nPage {page} of {pages}\n")
+    return "\n".join(
+        [
+            "# Free trade is net positive",
+            "Tariff cuts raised welfare because consumer prices fell 12% (Autor, 2013).",
+            "## Background",
+            *body,
+            "## Argument",
+            "The evidence shows that exporters gained. Therefore wages rose. This suggests gains were broad.",
+            "## References",
+            "Autor, D. (2013). The China Syndrome. " * 30,
+            "## Appendix A",
+            "### Table 1",
+            "| year | imports |\n| 2001 | 10 |\n" * 50,
+        ]
+    )
+
+
+def test_memo_within_budget_is_untouched():
+    decision = condense_memo("A short memo.", budget=100)
+    assert decision["text"] == "A short memo."
+    assert decision["condensed"] is False
+
+
+def test_repeated_headers_footers_and_page_numbers_are_removed():
+    text, removed = drop_repeated_lines(_memo())
+    assert "ECON 101 Memo" not in text and "Page 3 of 6" not in text
+    assert removed == 12
+    assert "# Free trade is net positive" in text
+
+
+def test_repeated_headings_are_kept():
+    memo = "\n\n".join(f"## Claim {n}\n\n**Evidence**\n\n{FILLER}" for n in range(4))
+    text, removed = drop_repeated_lines(memo)
+    assert removed == 0
+    assert text.count("**Evidence**") == 4
+
+
+def test_back_matter_is_dropped_with_its_subsections():
+    memo = _memo(pages=1)
+    decision = condense_memo(memo, budget=estimate_tokens(memo) - 1)
+    assert decision["condensed"] is True
+    assert decision["dropped_sections"] == ["References", "Appendix A", "Table 1"]
+    assert "China Syndrome" not in decision["text"] and "| 2001 |" not in decision["text"]
+    assert "## Argument" in decision["text"]
+
+
+def test_sections_with_most_claims_are_kept_under_budget():
+    decision = condense_memo(_memo(), budget=200)
+    assert decision["tokens"] <= 200
+    assert "Tariff cuts raised welfare" in decision["text"]
+    assert "The evidence shows that exporters gained" in decision["text"]
+    assert "Background" in decision["dropped_sections"]
+    # Kept sections stay in document order
+    assert decision["text"].index("Free trade") < decision["text"].index("## Argument")
+
+
+def test_docx_back_matter_without_heading_markup():
+    memo = "Intro because reasons.\n\n" + FILLER + "\n\nWorks Cited\n\n" + "Smith (2020). A book. " * 40
+    decision = condense_memo(memo, budget=estimate_tokens(FILLER) + 50)
+    assert decision["dropped_sections"] == ["Works Cited"]
+    assert "Smith (2020)" not in decision["text"]
+
+
+def test_notes_section_is_kept_unless_it_trails_the_memo():
+    argument = "The evidence shows that exporters gained. " * 40
+    memo = "\n".join(["# Free trade", argument, "## Notes", "Tariffs cause price rises. " * 10,
+                      "## Argument", argument, "## Conclusion", argument, "## Sources",
+                      "Autor, D. (2013). The China Syndrome. " * 10])
+    decision = condense_memo(memo, budget=estimate_tokens(memo) - 1)
+    assert decision["dropped_sections"] == ["Sources"]
+    assert "Tariffs cause price rises" in decision["text"]
+    assert "China Syndrome" not in decision["text"]
@@ -0,0 +1,106 @@
+"""Tests for process-pool text extraction."""
+
+import io
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pymupdf
+import pytest
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import extractor
+from extractor import ExtractionPool, ExtractionTimeout, extract_text, page_ranges
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture(scope="module", autouse=True)
+def small_pool():
+    extractor.pool = ExtractionPool(workers=2)
+    yield
+    extractor.pool.shutdown()
+
+
+def _pdf(pages):
+    doc = pymupdf.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {n + 1}: tariffs raised consumer prices in the sampled industries.")
+    return doc.tobytes()
+
+
+def test_page_ranges_cover_every_page_once():
+    ranges = page_ranges(40, 16)
+    assert [len(r) for r in ranges] == [16, 16, 8]
+    assert sum(ranges, []) == list(range(40))
+
+
+def test_long_pdf_is_extracted_in_page_order():
+    text = extract_text(_pdf(40), ".pdf")
+    positions = [text.index(f"Page {n}:") for n in range(1, 41)]
+    assert positions == sorted(positions)
+
+
+def test_long_pdf_bytes_are_shared_with_page_ranges_through_one_file():
+    pool = extractor.pool
+    with patch.object(pool, "map", wraps=pool.map) as mapped:
+        extract_text(_pdf(40), ".pdf")
+    range_args = mapped.call_args_list[1].args[1]
+    assert len(range_args) == 3
+    assert {type(source) for source, _ in range_args} == {str}
+    assert len({source for source, _ in range_args}) == 1
+    assert not os.path.exists(range_args[0][0])
+
+
+def test_spilled_memo_is_extracted_from_its_path(tmp_path):
+    path = tmp_path / "memo.pdf"
+    path.write_bytes(_pdf(20))
+    text = extract_text(str(path), ".pdf")
+    assert "Page 1:" in text and "Page 20:" in text
+
+
+def test_docx_paragraphs_are_extracted():
+    doc = Document()
+    doc.add_paragraph("Free trade raises aggregate welfare but concentrates losses in exposed regions.")
+    doc.add_paragraph("")
+    doc.add_paragraph("Adjustment assistance should be expanded.")
+    data = io.BytesIO()
+    doc.save(data)
+
+    text = extract_text(data.getvalue(), ".docx")
+    assert text.split("\n\n")[1] == "Adjustment assistance should be expanded."
+
+
+def test_scanned_pdf_is_rejected():
+    doc = pymupdf.open()
+    doc.new_page()
+    with pytest.raises(ValueError, match="scanned image"):
+        extract_text(doc.tobytes(), ".pdf")
+
+
+def test_hung_document_resets_the_pool():
+    pool = extractor.pool
+    with pytest.raises(ExtractionTimeout):
+        pool.map(_sleep, [(30,)], time.monotonic() + 0.5)
+    # A fresh pool serves the next document
+    assert pool.map(_sleep, [(0,)], time.monotonic() + 30) == [0]
+
+
+def test_hung_document_does_not_abort_other_documents_in_flight():
+    pool = extractor.pool
+    results = []
+    other = threading.Thread(target=lambda: results.append(pool.map(_sleep, [(2,)], time.monotonic() + 30)))
+    other.start()
+    time.sleep(0.5)
+    with pytest.raises(ExtractionTimeout):
+        pool.map(_sleep, [(30,)], time.monotonic() + 0.5)
+    other.join()
+    assert results == [[2]]
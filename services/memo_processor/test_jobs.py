@@ -0,0 +1,154 @@
+"""Tests for the memo processing job queue."""
+
+import importlib
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import anthropic
+import httpx
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import late_pairing
+import main
+from cache import prompt_hash
+from jobs import batch_progress, enqueue_assignment, fail_job, is_transient
+
+JOB = {"id": "j1", "memo_id": "m1", "skip_cache": False, "analysis_mode": "sync", "attempts": 1, "max_attempts": 4}
+
+
+def _status_error(cls, status):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        (_status_error(anthropic.RateLimitError, 429), True),
+        (_status_error(anthropic.InternalServerError, 529), True),
+        (_status_error(anthropic.BadRequestError, 400), False),
+        (psycopg2.OperationalError("server closed the connection"), True),
+        (httpx.ConnectTimeout("timed out"), True),
+        (ValueError("PDF appears to be a scanned image."), False),
+        (FileNotFoundError("File not found"), False),
+    ],
+)
+def test_only_transient_failures_are_retried(exc, transient):
+    assert is_transient(exc) is transient
+
+
+@pytest.mark.parametrize("status, memo_status", [("queued", "uploaded"), ("failed", "error")])
+def test_failed_job_updates_memo_status(status, memo_status):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = ("m1", status)
+
+    assert fail_job(conn, "j1", "RateLimitError: slow down", retry=True) == status
+
+    assert cur.execute.call_args_list[0].args[1]["retry"] is True
+    assert cur.execute.call_args_list[1].args[1] == (memo_status, "m1")
+    conn.commit.assert_called_once()
+
+
+def test_worker_retries_transient_failure():
+    with patch("main.worker_db"), patch("main.claim_job", return_value=JOB), \
+            patch("main.process_memo_file", side_effect=_status_error(anthropic.RateLimitError, 429)), \
+            patch("main.fail_job", return_value="queued") as fail, \
+            patch("main.complete_job") as complete:
+        assert main.run_next_job("worker-0") is True
+
+    assert fail.call_args.kwargs["retry"] is True
+    complete.assert_not_called()
+
+
+def _run_analyzed_job(done_jobs: int, auto_pair: bool = True):
+    analysis = {"position": "net_positive", "thesis": "Trade helps", "key_claims": []}
+    with patch("main.worker_db") as worker_db, patch("main.claim_job", return_value=JOB), \
+            patch("main.process_memo_file", return_value=("a1", analysis)), \
+            patch("main.complete_job") as complete, \
+            patch("main.link_memo_claims") as link, \
+            patch("main.pair_late_submissions") as pair_late, \
+            patch("main.AUTO_PAIR_LATE_MEMOS", auto_pair):
+        conn = worker_db.return_value.__enter__.return_value
+        conn.cursor.return_value.fetchone.return_value = (done_jobs,)
+        assert main.run_next_job("worker-0") is True
+
+    complete.assert_called_once_with(conn, "j1")
+    link.assert_called_once_with("m1", "a1", analysis)
+    return pair_late
+
+
+def test_worker_completes_job_links_claims_and_pairs_late_students():
+    _run_analyzed_job(done_jobs=1).assert_called_once_with("a1")
+
+
+def test_reanalyzed_memos_do_not_trigger_late_pairing():
+    # A bulk or forced re-run completes a second job for the memo
+    _run_analyzed_job(done_jobs=2).assert_not_called()
+
+
+def test_late_pairing_is_on_by_default_and_can_be_turned_off():
+    with patch.dict(os.environ):
+        os.environ.pop("AUTO_PAIR_LATE_MEMOS", None)
+        assert importlib.reload(late_pairing).AUTO_PAIR_LATE_MEMOS is True
+    _run_analyzed_job(done_jobs=1, auto_pair=False).assert_not_called()
+
+
+def test_idle_worker_reports_empty_queue():
+    with patch("main.worker_db"), patch("main.claim_job", return_value=None), \
+            patch("main.process_memo_file") as process:
+        assert main.run_next_job("worker-0") is False
+    process.assert_not_called()
+
+
+def test_assignment_batch_reports_new_and_already_pending_memos():
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.side_effect = [("Is free trade net positive?",), (280, 300)]
+
+    batch = enqueue_assignment(conn, "a1")
+
+    assert batch["queued"] == 280 and batch["already_pending"] == 20
+    params = cur.execute.call_args.args[1]
+    assert params["force"] is False and params["batch_id"] == batch["batch_id"]
+    conn.commit.assert_called_once()
+
+
+def test_memos_analyzed_without_a_prompt_hash_are_requeued():
+    # A legacy analyzed memo has a NULL hash; "<>" would be NULL for it and skip it
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.side_effect = [("Is free trade net positive?",), (1, 1)]
+
+    enqueue_assignment(conn, "a1")
+
+    sql, params = cur.execute.call_args.args
+    assert "m.analysis_prompt_hash IS DISTINCT FROM %(prompt_hash)s" in sql
+    assert "analysis_prompt_hash <>" not in sql
+    assert params["prompt_hash"] == prompt_hash("Is free trade net positive?")
+
+
+def test_unknown_assignment_is_rejected():
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = None
+    with pytest.raises(ValueError, match="Assignment not found"):
+        enqueue_assignment(conn, "missing")
+
+
+def test_batch_progress_reports_throughput_and_eta():
+    cur = MagicMock(description=[(c,) for c in (
+        "total", "queued", "running", "done", "failed", "retries", "started_at", "elapsed_seconds",
+    )])
+    cur.fetchone.return_value = (300, 140, 10, 145, 5, 3, None, 120.0)
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+
+    progress = batch_progress(conn, "b1")
+
+    assert progress["memos_per_minute"] == 75.0
+    assert progress["eta_seconds"] == 120
+    assert progress["complete"] is False
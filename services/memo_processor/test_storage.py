@@ -0,0 +1,63 @@
+"""Tests for streaming memo files into memory buffers."""
+
+import hashlib
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import storage
+from storage import MemoBuffer, MemoTooLarge, open_memo
+
+
+def test_buffer_spills_to_disk_past_memory_threshold():
+    with MemoBuffer("memo.PDF", max_bytes=1000, memory_bytes=10) as buf:
+        buf.write(b"a" * 8)
+        assert not buf.spilled
+        assert buf.source() == b"a" * 8
+        buf.write(b"b" * 8)
+        assert buf.spilled
+        assert buf.getvalue() == b"a" * 8 + b"b" * 8
+        # Extraction workers get the spilled file's path, not its bytes
+        path = buf.source()
+        assert path.endswith(".pdf")
+        with open(path, "rb") as f:
+            assert f.read() == b"a" * 8 + b"b" * 8
+        assert buf.sha256 == hashlib.sha256(b"a" * 8 + b"b" * 8).hexdigest()
+        assert buf.ext == ".pdf"
+    assert not os.path.exists(path)
+
+
+def test_buffer_refuses_oversized_memo():
+    buf = MemoBuffer("memo.pdf", max_bytes=10)
+    with pytest.raises(MemoTooLarge):
+        buf.write(b"x" * 11)
+
+
+def test_local_upload_is_streamed(tmp_path):
+    (tmp_path / "memos").mkdir()
+    (tmp_path / "memos" / "1.docx").write_bytes(b"PK docx bytes")
+    with patch.object(storage, "USE_FS", True), patch.object(storage, "UPLOAD_DIR", str(tmp_path)):
+        with open_memo("memos/1.docx") as memo:
+            assert memo.getvalue() == b"PK docx bytes"
+            assert memo.ext == ".docx"
+
+
+def test_missing_local_upload_raises(tmp_path):
+    with patch.object(storage, "USE_FS", True), patch.object(storage, "UPLOAD_DIR", str(tmp_path)):
+        with pytest.raises(FileNotFoundError):
+            open_memo("memos/missing.pdf")
+
+
+def test_oversized_s3_object_is_refused_before_download():
+    body = MagicMock()
+    s3 = MagicMock()
+    s3.get_object.return_value = {"ContentLength": storage.MAX_MEMO_BYTES + 1, "Body": body}
+    with patch.object(storage, "USE_FS", False), patch.object(storage, "s3", s3):
+        with pytest.raises(MemoTooLarge):
+            open_memo("memos/huge.pdf")
+    body.read.assert_not_called()
+    body.close.assert_called_once()
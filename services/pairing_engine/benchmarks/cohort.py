@@ -0,0 +1,71 @@
+"""Synthetic cohorts for pairing engine benchmarks.
+
+``generate_cohort`` returns memo rows shaped like the pairing engine's
+``COHORT_QUERY`` rows, so benchmarks and tests go through the same
+``cohort_entries`` parsing as a real assignment:
+
+- positions: ``positive_share`` of the students argue ``net_positive``;
+- stance strengths: weak, moderate or strong, mostly moderate;
+- key claims: 2-5 per student, drawn from a pool of topics shared by both
+  sides. A student's claim embedding is its topic vector plus noise, and
+  every topic shares a course-wide component, so diversity varies between
+  pairs the way differently worded claims do;
+- availability: 1-6 signup slots, weighted towards weekday afternoons and
+  evenings. Some students give none (they can meet any time), and some
+  memos have no claim embeddings yet (their pairs score neutral).
+"""
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from pairing import SLOTS
+
+EMBEDDING_DIM = 384
+STANCES = ("weak", "moderate", "strong")
+STANCE_WEIGHTS = (1, 2, 1)
+
+
+def slot_weight(day: str, block: str) -> int:
+    weekday = day not in ("sat", "sun")
+    return 4 if weekday and block != "morning" else 2 if weekday else 1
+
+
+def generate_cohort(
+    students: int,
+    positive_share: float = 0.5,
+    claim_pool: int = 8,
+    seed: int = 0,
+    no_availability_share: float = 0.1,
+    no_embeddings_share: float = 0.0,
+    embedding_dim: int = EMBEDDING_DIM,
+) -> list[tuple]:
+    """(student_id, position_binary, analysis, claim_embeddings, availability) rows."""
+    rng = random.Random(seed)
+    vectors = np.random.default_rng(seed)
+    # Every claim is about the same course topic, so claims share a component
+    topics = vectors.standard_normal(embedding_dim) + 0.8 * vectors.standard_normal((claim_pool, embedding_dim))
+    weights = [slot_weight(day, block) for day, block in SLOTS]
+    positives = round(students * positive_share)
+
+    rows = []
+    for i in range(students):
+        claims = rng.sample(range(claim_pool), min(claim_pool, rng.randint(2, 5)))
+        analysis = {
+            "stance_strength": rng.choices(STANCES, STANCE_WEIGHTS)[0],
+            "key_claims": [f"claim {c}" for c in claims],
+        }
+        embeddings = None
+        if rng.random() >= no_embeddings_share:
+            noise = 0.5 * vectors.standard_normal((len(claims), embedding_dim))
+            embeddings = (topics[claims] + noise).tolist()
+        availability = None
+        if rng.random() >= no_availability_share:
+            availability = {}
+            for day, block in sorted({rng.choices(SLOTS, weights)[0] for _ in range(rng.randint(1, 6))}):
+                availability.setdefault(day, []).append(block)
+        position = "net_positive" if i < positives else "net_negative"
+        rows.append((f"s{i}", position, analysis, embeddings, availability))
+    return rows
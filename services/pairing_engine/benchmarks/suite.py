@@ -0,0 +1,103 @@
+"""Pairing benchmark suite: every solver across cohort sizes and side imbalances.
+
+For each cohort size and share of net-positive students this generates a
+synthetic cohort (see cohort.py), parses it the way ``/pair`` does and
+runs ``pair_entries`` with each solver. Reports runtime (best of
+``--repeat``), peak memory allocated during pairing (tracemalloc, in a
+separate run so tracing does not slow the timed ones), pairs, unpaired
+students, and total and mean diversity. ``avoidable`` counts unpaired
+students beyond the side imbalance: students left out although the other
+side still had someone, i.e. by availability or the solver. Needs no
+database.
+
+Run from services/pairing_engine:
+    python benchmarks/suite.py --sizes 50,500,5000 --positive-shares 0.5,0.6,0.75
+    python benchmarks/suite.py --sizes 2000 --no-embeddings-share 0.3 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from cohort import generate_cohort
+from pairing import SOLVERS, pair_entries
+from store import cohort_entries
+
+
+def run(positives, negatives, solver, use_availability, repeat) -> dict:
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = pair_entries(positives, negatives, solver, use_availability)
+        elapsed.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    pair_entries(positives, negatives, solver, use_availability)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pairs = len(result["pairs"])
+    return {
+        "solver": result["solver"],
+        "ms": min(elapsed) * 1000,
+        "peak_mb": peak / 2**20,
+        "pairs": pairs,
+        "unpaired": len(result["unpaired"]),
+        "avoidable": len(result["unpaired"]) - abs(len(positives) - len(negatives)),
+        "total_diversity": result["total_diversity"],
+        "mean_diversity": result["total_diversity"] / pairs if pairs else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500,5000", help="students per cohort")
+    parser.add_argument("--positive-shares", default="0.5,0.6,0.75", help="share of students arguing net_positive")
+    parser.add_argument("--solvers", default=",".join(SOLVERS))
+    parser.add_argument("--claim-pool", type=int, default=8, help="distinct claims students draw from")
+    parser.add_argument("--no-availability-share", type=float, default=0.1, help="students who gave no availability")
+    parser.add_argument("--no-embeddings-share", type=float, default=0.0, help="memos without claim embeddings")
+    parser.add_argument("--ignore-availability", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for share in [float(s) for s in args.positive_shares.split(",")]:
+            rows = generate_cohort(
+                size, share, args.claim_pool, seed=size,
+                no_availability_share=args.no_availability_share,
+                no_embeddings_share=args.no_embeddings_share,
+            )
+            positives, negatives = cohort_entries(rows)
+            diversity = {}
+            for solver in args.solvers.split(","):
+                row = {
+                    "students": size,
+                    "positive_share": share,
+                    "requested_solver": solver,
+                    **run(positives, negatives, solver, not args.ignore_availability, args.repeat),
+                }
+                results.append(row)
+                diversity[solver] = row["total_diversity"]
+                print(
+                    f"{size:>6} students {len(positives):>5}/{len(negatives):<5} {row['solver']:<18} "
+                    f"{row['ms']:9.1f}ms {row['peak_mb']:8.1f}MB  "
+                    f"pairs={row['pairs']:<5} unpaired={row['unpaired']:<5} avoidable={row['avoidable']:<4} "
+                    f"total_diversity={row['total_diversity']:.2f} mean={row['mean_diversity']:.3f}"
+                )
+            if "assignment" in diversity and "greedy" in diversity:
+                gain = diversity["assignment"] - diversity["greedy"]
+                print(f"{'':>43}assignment - greedy = {gain:+.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
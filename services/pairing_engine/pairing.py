@@ -0,0 +1,355 @@
+"""Opposing-side pairing: the diversity matrix and the matching solvers.
+
+Every positive/negative diversity score is computed once into an
+(n_positive, n_negative) matrix. Diversity is semantic: the cosine distance
+between the centroids of the two students' claim embeddings (stored on
+``memos.claim_embeddings`` by the memo processor, or embedded at pairing
+time), one matrix product for the whole cohort. Pairs where either memo
+still has no embeddings get the median semantic score, so the solver
+neither seeks nor avoids them; Jaccard distances of the claim strings run
+near 1.0, far above typical centroid distances, and would be preferred
+over every scored pair. Only a cohort without any embeddings is scored by
+Jaccard distance alone.
+
+Students can only be paired if their availability (day/block slots from
+signup) overlaps. Each student's slots are a row of a boolean slot matrix,
+so the overlap of every pair is one more matrix product. Students who gave
+no availability can meet any time. Pairs without a common slot are scored
+below any feasible pair, so solvers use them only when nothing else is
+left, and such matches are then dropped (those students stay unpaired).
+
+The ``assignment`` solver then finds the matching with maximum total
+diversity (scipy's shortest augmenting path solver). Above
+``ASSIGNMENT_BLOCK_SIDE`` students per side the cohort is split into random
+blocks solved separately, which keeps thousands of students under a
+second at ~1% below the optimum; students the blocks leave unpaired are
+matched against each other in a final pass. Diversity is only computed
+for the blocks and that pass. The result is no longer guaranteed optimal,
+so it is reported as ``assignment-blocked``. The ``greedy`` solver is the
+original algorithm: weakest stance first, each taking the most diverse
+remaining opponent. It is used as the fallback for cohorts with more than
+``ASSIGNMENT_MAX_SIDE`` students on the smaller side.
+"""
+import itertools
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+
+STRENGTH_ORDER = {"weak": 0, "moderate": 1, "strong": 2}
+SOLVERS = ("assignment", "greedy")
+# Reported instead of "assignment" when the cohort was solved in blocks
+BLOCKED_SOLVER = "assignment-blocked"
+# Pairs sampled to estimate the neutral score in large cohorts
+NEUTRAL_SAMPLE = 65536
+ASSIGNMENT_MAX_SIDE = int(os.getenv("PAIRING_ASSIGNMENT_MAX_SIDE", "3000"))
+ASSIGNMENT_BLOCK_SIDE = int(os.getenv("PAIRING_ASSIGNMENT_BLOCK_SIDE", "800"))
+
+# Availability slots, as the signup page offers them
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+BLOCKS = ("morning", "afternoon", "evening")
+SLOTS = [(day, block) for day in DAYS for block in BLOCKS]
+SLOT_INDEX = {slot: i for i, slot in enumerate(SLOTS)}
+
+
+def compute_argument_diversity(claims_a: list[str], claims_b: list[str]) -> float:
+    """Higher score = more diverse arguments between the two students."""
+    if not claims_a or not claims_b:
+        return 0.0
+    set_a = set(c.lower() for c in claims_a)
+    set_b = set(c.lower() for c in claims_b)
+    if not set_a or not set_b:
+        return 0.0
+    # Jaccard distance: 1 - intersection/union
+    intersection = len(set_a & set_b)
+    union = len(set_a | set_b)
+    return 1.0 - (intersection / union) if union > 0 else 0.0
+
+
+def memo_entry(student_id, analysis, claim_embeddings=None, availability=None) -> dict:
+    analysis_data = analysis if isinstance(analysis, dict) else json.loads(analysis) if analysis else {}
+    if isinstance(claim_embeddings, str):
+        claim_embeddings = json.loads(claim_embeddings)
+    if isinstance(availability, str):
+        availability = json.loads(availability)
+    return {
+        "student_id": student_id,
+        "stance_strength": STRENGTH_ORDER.get(analysis_data.get("stance_strength", "moderate"), 1),
+        "key_claims": analysis_data.get("key_claims", []),
+        "claim_embeddings": claim_embeddings or [],
+        "availability": availability or {},
+    }
+
+
+def slot_matrix(entries: list[dict]) -> np.ndarray:
+    """(n_students, n_slots) availability; no availability given means any slot."""
+    slots = np.zeros((len(entries), len(SLOTS)), dtype=bool)
+    for i, e in enumerate(entries):
+        indexes = [
+            SLOT_INDEX[(day, block)]
+            for day, blocks in (e.get("availability") or {}).items()
+            for block in blocks
+            if (day, block) in SLOT_INDEX
+        ]
+        if indexes:
+            slots[i, indexes] = True
+        else:
+            slots[i] = True
+    return slots
+
+
+def overlap_matrix(positives: list[dict], negatives: list[dict]) -> np.ndarray:
+    """Whether each (positive, negative) pair shares at least one slot."""
+    return _overlap(slot_matrix(positives), slot_matrix(negatives))
+
+
+def _overlap(pos_slots: np.ndarray, neg_slots: np.ndarray) -> np.ndarray:
+    return pos_slots.astype(np.float32) @ neg_slots.astype(np.float32).T > 0
+
+
+def common_slots(a: dict, b: dict) -> str:
+    """Slots both students gave, e.g. "Mon morning, Thu evening"; empty if either gave none."""
+    if not a.get("availability") or not b.get("availability"):
+        return ""
+    return _slot_names(slot_matrix([a])[0] & slot_matrix([b])[0])
+
+
+def _slot_names(shared: np.ndarray) -> str:
+    return ", ".join(f"{SLOTS[k][0].capitalize()} {SLOTS[k][1]}" for k in np.flatnonzero(shared))
+
+
+def claim_centroids(entries: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """Unit-length mean claim embedding per student, and which students have any."""
+    has = np.array([bool(e.get("claim_embeddings")) for e in entries], dtype=bool)
+    if not has.any():
+        return np.zeros((len(entries), 0), dtype=np.float32), has
+    embedded = [e["claim_embeddings"] for e in entries if e.get("claim_embeddings")]
+    dim = len(embedded[0][0])
+    counts = np.array([len(claims) for claims in embedded])
+    # One parse of every claim vector, not one array per student
+    claims = np.fromiter(
+        itertools.chain.from_iterable(itertools.chain.from_iterable(embedded)),
+        dtype=np.float32,
+        count=int(counts.sum()) * dim,
+    ).reshape(-1, dim)
+    claims /= np.maximum(np.linalg.norm(claims, axis=1, keepdims=True), 1e-12)
+
+    # The sum of unit vectors points the same way as their mean; one sparse
+    # (student x claim) product sums every student's claims
+    owners = sparse.csr_matrix(
+        (np.ones(len(claims), dtype=np.float32), np.arange(len(claims)), np.concatenate(([0], np.cumsum(counts)))),
+        shape=(len(embedded), len(claims)),
+    )
+    centroids = np.zeros((len(entries), dim), dtype=np.float32)
+    centroids[has] = owners @ claims
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids, has
+
+
+def neutral_score(pos_centroids: np.ndarray, neg_centroids: np.ndarray) -> float:
+    """Median centroid distance between the embedded students, from a sample of pairs in large cohorts."""
+    if len(pos_centroids) * len(neg_centroids) <= NEUTRAL_SAMPLE:
+        return float(np.median(np.clip(1.0 - pos_centroids @ neg_centroids.T, 0.0, 1.0)))
+    rng = np.random.default_rng(0)
+    i = rng.integers(len(pos_centroids), size=NEUTRAL_SAMPLE)
+    j = rng.integers(len(neg_centroids), size=NEUTRAL_SAMPLE)
+    return float(np.median(np.clip(1.0 - np.einsum("ij,ij->i", pos_centroids[i], neg_centroids[j]), 0.0, 1.0)))
+
+
+def cohort_scoring(positives: list[dict], negatives: list[dict]) -> dict:
+    """What every diversity score is computed from: centroids, who has them, the neutral score."""
+    pos_centroids, pos_has = claim_centroids(positives)
+    neg_centroids, neg_has = claim_centroids(negatives)
+    # Unless both sides have some embeddings, the cohort is scored by Jaccard distance
+    semantic = bool(pos_has.any() and neg_has.any())
+    neutral = 0.0
+    if semantic and not (pos_has.all() and neg_has.all()):
+        neutral = neutral_score(pos_centroids[pos_has], neg_centroids[neg_has])
+    return {
+        "positives": positives,
+        "negatives": negatives,
+        "semantic": semantic,
+        "pos_centroids": pos_centroids,
+        "neg_centroids": neg_centroids,
+        "pos_has": pos_has,
+        "neg_has": neg_has,
+        "neutral": neutral,
+    }
+
+
+def diversity_block(scoring: dict, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Diversity of positives ``rows`` against negatives ``cols``."""
+    if not scoring["semantic"]:
+        return jaccard_matrix([scoring["positives"][i] for i in rows], [scoring["negatives"][j] for j in cols])
+    distance = np.clip(1.0 - scoring["pos_centroids"][rows] @ scoring["neg_centroids"][cols].T, 0.0, 1.0)
+    distance = distance.astype(float)
+    # Unscored pairs are neutral: on the semantic scale, at its median
+    distance[~(scoring["pos_has"][rows][:, None] & scoring["neg_has"][cols][None, :])] = scoring["neutral"]
+    return distance
+
+
+def pair_diversity(scoring: dict, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Diversity of each (rows[k], cols[k]) pair; the matching diagonal of diversity_block."""
+    if not scoring["semantic"]:
+        return np.array([
+            compute_argument_diversity(scoring["positives"][i]["key_claims"], scoring["negatives"][j]["key_claims"])
+            for i, j in zip(rows, cols)
+        ])
+    dots = np.einsum("ij,ij->i", scoring["pos_centroids"][rows], scoring["neg_centroids"][cols])
+    distance = np.clip(1.0 - dots, 0.0, 1.0).astype(float)
+    distance[~(scoring["pos_has"][rows] & scoring["neg_has"][cols])] = scoring["neutral"]
+    return distance
+
+
+def diversity_matrix(positives: list[dict], negatives: list[dict]) -> np.ndarray:
+    """Argument diversity in [0, 1] for every (positive, negative) pair at once."""
+    return diversity_block(cohort_scoring(positives, negatives), np.arange(len(positives)), np.arange(len(negatives)))
+
+
+def jaccard_matrix(positives: list[dict], negatives: list[dict]) -> np.ndarray:
+    """compute_argument_diversity for every (positive, negative) pair at once."""
+    ids: dict[str, int] = {}
+    pos_sets = [{ids.setdefault(c.lower(), len(ids)) for c in p["key_claims"]} for p in positives]
+    neg_sets = [{ids.setdefault(c.lower(), len(ids)) for c in n["key_claims"]} for n in negatives]
+
+    # Intersections through an inverted index: identical claims are rare
+    holders: dict[int, list[int]] = {}
+    for j, claims in enumerate(neg_sets):
+        for c in claims:
+            holders.setdefault(c, []).append(j)
+    intersection = np.zeros((len(positives), len(negatives)))
+    for i, claims in enumerate(pos_sets):
+        for c in claims:
+            intersection[i, holders.get(c, [])] += 1
+
+    size_a = np.array([len(s) for s in pos_sets], dtype=float)[:, None]
+    size_b = np.array([len(s) for s in neg_sets], dtype=float)[None, :]
+    union = size_a + size_b - intersection
+    with np.errstate(invalid="ignore", divide="ignore"):
+        diversity = 1.0 - intersection / union
+    diversity[(size_a == 0) | (size_b == 0)] = 0.0
+    return diversity
+
+
+def assignment_blocks(shape: tuple[int, int], block_side: int = ASSIGNMENT_BLOCK_SIDE) -> int:
+    """How many blocks solve_assignment splits a cohort of this shape into."""
+    return max(1, -(-max(shape) // block_side))
+
+
+def _solve(objective, rows: np.ndarray, cols: np.ndarray) -> list[tuple[int, int]]:
+    scores = objective(rows, cols)
+    r, c = linear_sum_assignment(scores, maximize=True)
+    keep = scores[r, c] >= 0
+    return list(zip(rows[r[keep]].tolist(), cols[c[keep]].tolist()))
+
+
+def solve_blocks(shape: tuple[int, int], objective, block_side: int = ASSIGNMENT_BLOCK_SIDE) -> list[tuple[int, int]]:
+    """solve_assignment over ``objective(rows, cols)``, which scores one block at a time.
+
+    Only the blocks and the final pass are ever scored, not the whole cohort.
+    """
+    n, m = shape
+    blocks = assignment_blocks(shape, block_side)
+    rng = np.random.default_rng(0)
+    row_blocks = np.array_split(rng.permutation(n), blocks)
+    col_blocks = np.array_split(rng.permutation(m), blocks)
+    matches = []
+    for rows, cols in zip(row_blocks, col_blocks):
+        matches += _solve(objective, rows, cols)
+
+    if blocks > 1:
+        left_rows = np.setdiff1d(np.arange(n), [i for i, _ in matches])
+        left_cols = np.setdiff1d(np.arange(m), [j for _, j in matches])
+        if left_rows.size and left_cols.size:
+            matches += _solve(objective, left_rows, left_cols)
+    return sorted(matches)
+
+
+def solve_assignment(scores: np.ndarray, block_side: int = ASSIGNMENT_BLOCK_SIDE) -> list[tuple[int, int]]:
+    """(row, column) pairs maximizing the total score; negative scores mark forbidden pairs.
+
+    Forbidden pairs are left out of the result. Cohorts over ``block_side``
+    per side are solved in random blocks, then the rows and columns left
+    without a match are solved together; the result is then approximate.
+    """
+    return solve_blocks(scores.shape, lambda rows, cols: scores[np.ix_(rows, cols)], block_side)
+
+
+def solve_greedy(scores: np.ndarray, positives: list[dict]) -> list[tuple[int, int]]:
+    """Weakest positive first, each taking the most diverse unused negative it may be paired with."""
+    available = np.ones(scores.shape[1], dtype=bool)
+    pairs = []
+    for i in sorted(range(len(positives)), key=lambda i: positives[i]["stance_strength"]):
+        if not available.any():
+            break
+        j = int(np.argmax(np.where(available, scores[i], -np.inf)))
+        if scores[i, j] < 0:
+            continue
+        available[j] = False
+        pairs.append((i, j))
+    return pairs
+
+
+def pair_entries(
+    positives: list[dict], negatives: list[dict], solver: str = "assignment", use_availability: bool = True
+) -> dict:
+    """Pair positives with negatives; returns pairs, unpaired ids, the solver used and total diversity.
+
+    The solver is reported as ``assignment-blocked`` when a large cohort was
+    solved in blocks, and as ``greedy`` when it fell back to greedy.
+    """
+    # Weakest stance first, as the pairs were always listed
+    positives = sorted(positives, key=lambda x: x["stance_strength"])
+    negatives = sorted(negatives, key=lambda x: x["stance_strength"])
+    scoring = cohort_scoring(positives, negatives)
+    pos_slots, neg_slots = slot_matrix(positives), slot_matrix(negatives)
+    shape = (len(positives), len(negatives))
+    # Below any feasible pair, whatever the rest of the matching scores
+    infeasible = -1.0 - min(shape)
+
+    def objective(rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        scores = diversity_block(scoring, rows, cols)
+        if use_availability:
+            scores = np.where(_overlap(pos_slots[rows], neg_slots[cols]), scores, infeasible)
+        return scores
+
+    if solver == "assignment" and min(shape) > ASSIGNMENT_MAX_SIDE:
+        print(f"[pair] {min(shape)} students per side is over {ASSIGNMENT_MAX_SIDE}; using greedy")
+        solver = "greedy"
+    if solver == "assignment":
+        matches = solve_blocks(shape, objective, ASSIGNMENT_BLOCK_SIDE)
+        if assignment_blocks(shape, ASSIGNMENT_BLOCK_SIDE) > 1:
+            solver = BLOCKED_SOLVER
+    else:
+        matches = solve_greedy(objective(np.arange(shape[0]), np.arange(shape[1])), positives)
+
+    matches = sorted(matches)
+    rows = np.array([i for i, _ in matches], dtype=int)
+    cols = np.array([j for _, j in matches], dtype=int)
+    diversity = pair_diversity(scoring, rows, cols)
+    pairs = [
+        {
+            "student_a_id": positives[i]["student_id"],
+            "student_b_id": negatives[j]["student_id"],
+            "reason": f"Opposing positions, argument diversity: {d:.2f}",
+            # Only slots both students actually gave
+            "suggested_times": (
+                _slot_names(pos_slots[i] & neg_slots[j])
+                if positives[i].get("availability") and negatives[j].get("availability")
+                else ""
+            ),
+        }
+        for (i, j), d in zip(matches, diversity)
+    ]
+    paired_pos = set(rows.tolist())
+    paired_neg = set(cols.tolist())
+    unpaired = [n["student_id"] for j, n in enumerate(negatives) if j not in paired_neg]
+    unpaired += [p["student_id"] for i, p in enumerate(positives) if i not in paired_pos]
+    return {
+        "pairs": pairs,
+        "unpaired": unpaired,
+        "solver": solver,
+        "total_diversity": round(float(diversity.sum()), 4),
+    }
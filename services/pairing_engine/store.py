@@ -0,0 +1,67 @@
+"""Database access for the pairing engine: cohorts in, late pairings out."""
+from pairing import memo_entry
+
+COHORT_QUERY = """SELECT m.student_id, m.position_binary, m.analysis, m.claim_embeddings, e.availability
+    FROM memos m
+    LEFT JOIN LATERAL (
+        SELECT availability FROM assignment_enrollments
+        WHERE assignment_id = m.assignment_id AND student_id = m.student_id
+        ORDER BY enrolled_at DESC
+        LIMIT 1
+    ) e ON TRUE
+    WHERE m.assignment_id = %s
+    AND m.status = 'analyzed'
+    AND m.position_binary IN ('net_positive', 'net_negative')"""
+
+# Students in no pairing of the assignment: never paired, or freed when their pairing was deleted
+FREE_STUDENTS = """
+    AND NOT EXISTS (
+        SELECT 1 FROM pairings p
+        WHERE p.assignment_id = m.assignment_id
+        AND m.student_id IN (p.student_a_id, p.student_b_id)
+    )"""
+
+
+def load_cohort(cur, assignment_id: str, free_only: bool = False) -> tuple[list[dict], list[dict]]:
+    """(positives, negatives) entries for the assignment's analyzed memos."""
+    cur.execute(COHORT_QUERY + (FREE_STUDENTS if free_only else ""), (assignment_id,))
+    return cohort_entries(cur.fetchall())
+
+
+def cohort_entries(rows) -> tuple[list[dict], list[dict]]:
+    """Split COHORT_QUERY rows into (positives, negatives) entries."""
+    positives, negatives = [], []
+    for student_id, position, analysis, claim_embeddings, availability in rows:
+        entry = memo_entry(str(student_id), analysis, claim_embeddings, availability)
+        if position == "net_positive":
+            positives.append(entry)
+        else:
+            negatives.append(entry)
+    return positives, negatives
+
+
+def lock_assignment(cur, assignment_id: str):
+    """Serialize late pairing per assignment until the transaction ends."""
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"pairing:{assignment_id}",))
+
+
+def has_pairings(cur, assignment_id: str) -> bool:
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pairings WHERE assignment_id = %s)", (assignment_id,))
+    return cur.fetchone()[0]
+
+
+def insert_pairings(cur, assignment_id: str, pairs: list[dict]) -> list[str]:
+    """Insert new 'paired' rows; the debate room is created when the pair first joins."""
+    ids = []
+    for pair in pairs:
+        reason = pair["reason"]
+        if pair.get("suggested_times"):
+            reason += f" [Suggested times: {pair['suggested_times']}]"
+        cur.execute(
+            """INSERT INTO pairings (assignment_id, student_a_id, student_b_id, matchmaking_reason, status)
+            VALUES (%s, %s, %s, %s, 'paired')
+            RETURNING id""",
+            (assignment_id, pair["student_a_id"], pair["student_b_id"], reason),
+        )
+        ids.append(str(cur.fetchone()[0]))
+    return ids
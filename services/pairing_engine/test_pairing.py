@@ -0,0 +1,196 @@
+"""Tests for the pairing solvers."""
+
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "benchmarks"))
+
+import main
+from cohort import generate_cohort
+from pairing import compute_argument_diversity, diversity_matrix, overlap_matrix, pair_entries, solve_assignment
+from store import cohort_entries
+
+
+def _student(student_id, claims, strength=1, embeddings=None, availability=None):
+    return {
+        "student_id": student_id,
+        "stance_strength": strength,
+        "key_claims": claims,
+        "claim_embeddings": embeddings or [],
+        "availability": availability or {},
+    }
+
+
+def test_diversity_matrix_matches_pairwise_jaccard():
+    positives = [_student("p1", ["Prices fell", "Jobs grew"]), _student("p2", []), _student("p3", ["jobs grew"])]
+    negatives = [_student("n1", ["Jobs grew", "Wages fell"]), _student("n2", ["Towns emptied"])]
+    matrix = diversity_matrix(positives, negatives)
+    for i, p in enumerate(positives):
+        for j, n in enumerate(negatives):
+            assert matrix[i, j] == compute_argument_diversity(p["key_claims"], n["key_claims"])
+
+
+def test_differently_worded_claims_are_close_semantically():
+    positives = [_student("p1", ["Walmart lowers prices"], embeddings=[[1.0, 0.1, 0.0]])]
+    negatives = [
+        _student("n1", ["Big-box stores cut what shoppers pay"], embeddings=[[0.9, 0.2, 0.0]]),
+        _student("n2", ["Local shops close"], embeddings=[[0.0, 0.0, 1.0], [0.0, 0.3, 1.0]]),
+    ]
+    matrix = diversity_matrix(positives, negatives)
+    assert matrix[0, 0] < 0.05
+    assert matrix[0, 1] > 0.9
+
+
+def test_memos_without_embeddings_score_neutral_on_the_semantic_scale():
+    positives = [
+        _student("p1", ["a"], embeddings=[[1.0, 0.0]]),
+        _student("p2", ["b"], embeddings=[[0.0, 1.0]]),
+        _student("p3", ["only words"]),
+    ]
+    negatives = [_student("n1", ["c"], embeddings=[[1.0, 0.0]]), _student("n2", ["d"])]
+    matrix = diversity_matrix(positives, negatives)
+    assert np.allclose(matrix[:2, 0], [0.0, 1.0])
+    # Median of the scored pairs, not a Jaccard distance of 1.0 that would outrank them
+    assert np.allclose(matrix[2, :], 0.5) and np.allclose(matrix[:, 1], 0.5)
+
+
+def test_pairing_does_not_write_to_memos():
+    cohort = ([_student("p1", ["a"])], [_student("n1", ["b"], embeddings=[[0.0, 1.0]])])
+    with patch("main.get_db") as get_db, patch("main.load_cohort", return_value=cohort):
+        result = TestClient(main.app).post("/pair", json={"assignment_id": "a1"}).json()
+    assert len(result["pairs"]) == 1
+    get_db.return_value.cursor.return_value.execute.assert_not_called()
+    get_db.return_value.commit.assert_not_called()
+
+
+def test_assignment_solver_is_optimal_where_greedy_starves_later_students():
+    # p1 picks first and takes n1, leaving p2 only its own copy of its claims
+    positives = [_student("p1", ["a", "b"], strength=0), _student("p2", ["x", "a"], strength=2)]
+    negatives = [_student("n1", ["c"]), _student("n2", ["x", "a"])]
+    greedy = pair_entries(positives, negatives, "greedy")
+    optimal = pair_entries(positives, negatives, "assignment")
+    assert greedy["total_diversity"] == 1.0
+    assert optimal["total_diversity"] == 1.6667
+    assert {(p["student_a_id"], p["student_b_id"]) for p in optimal["pairs"]} == {("p1", "n2"), ("p2", "n1")}
+
+
+def test_solve_assignment_matches_brute_force_on_rectangular_scores():
+    rng = np.random.default_rng(7)
+    scores = rng.random((3, 5)).round(1)
+    best = max(
+        scores[0, a] + scores[1, b] + scores[2, c]
+        for a in range(5) for b in range(5) for c in range(5)
+        if len({a, b, c}) == 3
+    )
+    matches = solve_assignment(scores)
+    assert len(matches) == 3
+    assert np.isclose(sum(scores[i, j] for i, j in matches), best)
+    assert sorted(i for j, i in solve_assignment(scores.T)) == [0, 1, 2]
+
+
+def test_excess_students_are_unpaired():
+    positives = [_student(f"p{i}", [f"claim {i}"]) for i in range(3)]
+    negatives = [_student("n1", ["claim 0"])]
+    result = pair_entries(positives, negatives)
+    assert len(result["pairs"]) == 1
+    assert sorted(result["unpaired"] + [result["pairs"][0]["student_a_id"]]) == ["p0", "p1", "p2"]
+    assert result["pairs"][0]["student_a_id"] != "p0"
+
+
+def test_students_without_a_common_slot_are_not_paired():
+    positives = [
+        _student("p1", ["a"], availability={"mon": ["morning"]}),
+        _student("p2", ["b"], availability={"tue": ["evening"]}),
+    ]
+    negatives = [
+        _student("n1", ["c"], availability={"mon": ["morning", "evening"]}),
+        _student("n2", ["d"], availability={"fri": ["afternoon"]}),
+    ]
+    for solver in ("assignment", "greedy"):
+        result = pair_entries(positives, negatives, solver)
+        assert [(p["student_a_id"], p["student_b_id"]) for p in result["pairs"]] == [("p1", "n1")]
+        assert result["pairs"][0]["suggested_times"] == "Mon morning"
+        assert sorted(result["unpaired"]) == ["n2", "p2"]
+
+    assert len(pair_entries(positives, negatives, use_availability=False)["pairs"]) == 2
+
+
+def test_missing_availability_overlaps_everything():
+    positives = [_student("p1", ["a"]), _student("p2", ["a"], availability={"sun": ["evening"]})]
+    negatives = [_student("n1", ["b"], availability={"mon": ["morning"]})]
+    assert overlap_matrix(positives, negatives).tolist() == [[True], [False]]
+
+
+def test_blocked_solve_pairs_everyone_it_can():
+    rng = np.random.default_rng(3)
+    scores = rng.random((90, 100))
+    scores[rng.random(scores.shape) < 0.5] = -1.0
+    matches = solve_assignment(scores, block_side=25)
+    assert len({i for i, _ in matches}) == len({j for _, j in matches}) == len(matches) == 90
+    assert all(scores[i, j] >= 0 for i, j in matches)
+    full = sum(scores[i, j] for i, j in solve_assignment(scores))
+    assert sum(scores[i, j] for i, j in matches) > 0.9 * full
+
+
+def test_blocked_solves_are_reported_as_approximate():
+    rows = generate_cohort(60, embedding_dim=16, seed=2)
+    positives, negatives = cohort_entries(rows)
+    assert pair_entries(positives, negatives)["solver"] == "assignment"
+    with patch("pairing.ASSIGNMENT_BLOCK_SIDE", 10):
+        blocked = pair_entries(positives, negatives)
+    assert blocked["solver"] == "assignment-blocked"
+    assert 2 * len(blocked["pairs"]) + len(blocked["unpaired"]) == 60
+
+
+def test_large_cohorts_fall_back_to_greedy():
+    positives = [_student(f"p{i}", ["x"]) for i in range(3)]
+    negatives = [_student(f"n{i}", ["y"]) for i in range(3)]
+    with patch("pairing.ASSIGNMENT_MAX_SIDE", 2):
+        assert pair_entries(positives, negatives)["solver"] == "greedy"
+
+
+def test_synthetic_cohort_pairs_the_smaller_side_in_full():
+    rows = generate_cohort(120, positive_share=0.6, no_embeddings_share=0.2, embedding_dim=16, seed=5)
+    positives, negatives = cohort_entries(rows)
+    assert (len(positives), len(negatives)) == (72, 48)
+    assert any(not p["claim_embeddings"] for p in positives + negatives)
+
+    optimal = pair_entries(positives, negatives, use_availability=False)
+    greedy = pair_entries(positives, negatives, "greedy", use_availability=False)
+    assert len(optimal["pairs"]) == 48 and len(optimal["unpaired"]) == 24
+    assert optimal["total_diversity"] >= greedy["total_diversity"]
+
+
+def test_unknown_solver_is_rejected():
+    response = TestClient(main.app).post("/pair", json={"assignment_id": "a1", "solver": "random"})
+    assert response.status_code == 400
+
+
+def test_incremental_pairing_waits_for_the_first_full_pairing():
+    with patch("main.get_db") as get_db, patch("main.has_pairings", return_value=False), \
+            patch("main.insert_pairings") as insert:
+        response = TestClient(main.app).post("/pair/incremental", json={"assignment_id": "a1"})
+    assert response.json()["skipped"]
+    insert.assert_not_called()
+    get_db.return_value.commit.assert_not_called()
+
+
+def test_incremental_pairing_only_inserts_pairs_of_free_students():
+    free = ([_student("p9", ["a"])], [_student("n9", ["b"]), _student("n8", ["c"])])
+    with patch("main.get_db") as get_db, patch("main.has_pairings", return_value=True), \
+            patch("main.load_cohort", return_value=free) as load, \
+            patch("main.insert_pairings", return_value=["pair-1"]) as insert:
+        response = TestClient(main.app).post("/pair/incremental", json={"assignment_id": "a1"})
+
+    assert load.call_args.kwargs == {"free_only": True}
+    [pair] = response.json()["pairs"]
+    assert pair["pairing_id"] == "pair-1" and pair["student_a_id"] == "p9"
+    assert [p["student_b_id"] for p in insert.call_args.args[2]] == [pair["student_b_id"]]
+    assert len(response.json()["unpaired"]) == 1
+    get_db.return_value.commit.assert_called_once()
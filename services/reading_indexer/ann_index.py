@@ -0,0 +1,246 @@
+"""Approximate-nearest-neighbour index management for reading_chunks.
+
+The Drizzle schema declares one global HNSW index over every chunk. Queries
+always filter by assignment, so on a large table the global index returns
+ef_search candidates that are mostly from other assignments. Per-assignment
+partial indexes keep each search inside the assignment's own graph.
+"""
+import math
+import uuid
+
+from psycopg2 import sql
+
+TABLE = "reading_chunks"
+GLOBAL_INDEX = "reading_chunks_embedding_idx"
+METHODS = ("hnsw", "ivfflat")
+
+# Embedding storage mode (see chunk_store) -> (column, operator class)
+STORAGE_OPCLASSES = {
+    "full": ("embedding", "vector_cosine_ops"),
+    "half": ("embedding_half", "halfvec_cosine_ops"),
+    "binary": ("embedding_bits", "bit_hamming_ops"),
+}
+
+
+def index_name(method: str, assignment_id: str | None = None, storage: str = "full") -> str:
+    """Deterministic index name for a method, storage column and optional assignment scope."""
+    if method not in METHODS:
+        raise ValueError(f"Unsupported index method: {method}")
+    if storage not in STORAGE_OPCLASSES:
+        raise ValueError(f"Unsupported embedding storage: {storage}")
+    column = STORAGE_OPCLASSES[storage][0]
+    if assignment_id is None:
+        if method == "hnsw" and storage == "full":
+            return GLOBAL_INDEX
+        return f"reading_chunks_{column}_{method}_idx"
+    # Postgres truncates identifiers at 63 chars, so keep the prefix short
+    scope = uuid.UUID(assignment_id).hex
+    return f"rc_{method}_{scope}_idx" if storage == "full" else f"rc_{method}_{storage}_{scope}_idx"
+
+
+def default_lists(row_count: int) -> int:
+    """pgvector's recommended IVFFlat list count for a given number of rows."""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def _create_index_sql(
+    name: str,
+    method: str,
+    assignment_id: str | None,
+    m: int,
+    ef_construction: int,
+    lists: int | None,
+    storage: str = "full",
+) -> sql.Composed:
+    if method == "hnsw":
+        options = sql.SQL("WITH (m = {}, ef_construction = {})").format(
+            sql.Literal(m), sql.Literal(ef_construction)
+        )
+    else:
+        options = sql.SQL("WITH (lists = {})").format(sql.Literal(lists))
+
+    predicate = sql.SQL("")
+    if assignment_id is not None:
+        predicate = sql.SQL(" WHERE assignment_id = {}").format(
+            sql.Literal(str(uuid.UUID(assignment_id)))
+        )
+
+    column, opclass = STORAGE_OPCLASSES[storage]
+    return sql.SQL(
+        "CREATE INDEX CONCURRENTLY {} ON {} USING {} ({} {}) {}{}"
+    ).format(
+        sql.Identifier(name),
+        sql.Identifier(TABLE),
+        sql.SQL(method),
+        sql.Identifier(column),
+        sql.SQL(opclass),
+        options,
+        predicate,
+    )
+
+
+def _index_exists(cur, name: str) -> bool:
+    cur.execute("SELECT 1 FROM pg_class WHERE relname = %s AND relkind = 'i'", (name,))
+    return cur.fetchone() is not None
+
+
+def _count_rows(cur, assignment_id: str | None) -> int:
+    if assignment_id is None:
+        cur.execute("SELECT count(*) FROM reading_chunks")
+    else:
+        cur.execute("SELECT count(*) FROM reading_chunks WHERE assignment_id = %s", (assignment_id,))
+    return cur.fetchone()[0]
+
+
+def build_index(
+    conn,
+    method: str = "hnsw",
+    assignment_id: str | None = None,
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: int | None = None,
+    rebuild: bool = False,
+    storage: str = "full",
+) -> dict:
+    """Create (or rebuild) an ANN index without blocking live queries.
+
+    Builds run with CREATE INDEX CONCURRENTLY. A rebuild creates the new index
+    under a temporary name and swaps it in, so queries always have an index.
+    """
+    name = index_name(method, assignment_id, storage)
+    # CONCURRENTLY cannot run inside a transaction block
+    autocommit, conn.autocommit = conn.autocommit, True
+    cur = conn.cursor()
+    try:
+        exists = _index_exists(cur, name)
+        if exists and not rebuild:
+            return {"index": name, "method": method, "created": False}
+
+        rows = _count_rows(cur, assignment_id)
+        if method == "ivfflat" and lists is None:
+            lists = default_lists(rows)
+
+        target = f"{name}_new" if exists else name
+        # A failed concurrent build leaves an invalid index behind
+        cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(target)))
+        cur.execute(_create_index_sql(target, method, assignment_id, m, ef_construction, lists, storage))
+        if exists:
+            cur.execute(sql.SQL("DROP INDEX CONCURRENTLY {}").format(sql.Identifier(name)))
+            cur.execute(
+                sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(target), sql.Identifier(name))
+            )
+
+        params = {"m": m, "ef_construction": ef_construction} if method == "hnsw" else {"lists": lists}
+        return {
+            "index": name,
+            "method": method,
+            "storage": storage,
+            "created": True,
+            "rebuilt": exists,
+            "rows": rows,
+            "params": params,
+        }
+    finally:
+        cur.close()
+        conn.autocommit = autocommit
+
+
+def drop_index(conn, name: str) -> bool:
+    """Drop an ANN index on reading_chunks. Refuses to touch non-vector indexes."""
+    autocommit, conn.autocommit = conn.autocommit, True
+    try:
+        if name not in {idx["name"] for idx in index_status(conn)["indexes"]}:
+            return False
+        cur = conn.cursor()
+        try:
+            cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(name)))
+            return True
+        finally:
+            cur.close()
+    finally:
+        conn.autocommit = autocommit
+
+
+def index_status(conn) -> dict:
+    """Report ANN indexes on reading_chunks, their size, validity and usage."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT c.relname, am.amname, pg_relation_size(c.oid), i.indisvalid,
+                pg_get_expr(i.indpred, i.indrelid), pg_get_indexdef(c.oid),
+                coalesce(s.idx_scan, 0)
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_am am ON am.oid = c.relam
+            LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+            WHERE i.indrelid = 'reading_chunks'::regclass
+            AND am.amname IN ('hnsw', 'ivfflat')
+            ORDER BY c.relname"""
+        )
+        indexes = [
+            {
+                "name": row[0],
+                "method": row[1],
+                "size_bytes": row[2],
+                "valid": row[3],
+                "predicate": row[4],
+                "definition": row[5],
+                "scans": row[6],
+            }
+            for row in cur.fetchall()
+        ]
+
+        cur.execute(
+            """SELECT c.relname, p.phase, p.blocks_done, p.blocks_total,
+                p.tuples_done, p.tuples_total
+            FROM pg_stat_progress_create_index p
+            JOIN pg_class c ON c.oid = p.index_relid
+            WHERE p.relid = 'reading_chunks'::regclass"""
+        )
+        builds = [
+            {
+                "name": row[0],
+                "phase": row[1],
+                "blocks_done": row[2],
+                "blocks_total": row[3],
+                "tuples_done": row[4],
+                "tuples_total": row[5],
+            }
+            for row in cur.fetchall()
+        ]
+
+        cur.execute("SELECT count(*), pg_total_relation_size('reading_chunks') FROM reading_chunks")
+        rows, table_bytes = cur.fetchone()
+        return {"rows": rows, "table_bytes": table_bytes, "indexes": indexes, "builds_in_progress": builds}
+    finally:
+        cur.close()
+
+
+def apply_search_params(
+    cur,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    iterative_scan: str | None = None,
+    exact: bool = False,
+):
+    """Set transaction-local search parameters before a similarity query.
+
+    Must be called inside the transaction that runs the query. ``exact``
+    disables index scans, forcing a sequential scan with exact distances.
+    """
+    settings = []
+    if ef_search is not None:
+        settings.append(("hnsw.ef_search", str(ef_search)))
+    if probes is not None:
+        settings.append(("ivfflat.probes", str(probes)))
+    if iterative_scan is not None:
+        # pgvector >= 0.8: keep scanning the graph until LIMIT rows pass the filter
+        settings.append(("hnsw.iterative_scan", iterative_scan))
+        if iterative_scan != "strict_order":
+            settings.append(("ivfflat.iterative_scan", iterative_scan))
+    if exact:
+        settings.append(("enable_indexscan", "off"))
+    for name, value in settings:
+        cur.execute("SELECT set_config(%s, %s, true)", (name, value))
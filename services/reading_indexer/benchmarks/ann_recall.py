@@ -0,0 +1,102 @@
+"""Recall@k and latency of ANN indexes against exact search.
+
+Loads synthetic embeddings for several assignments (the other assignments
+stand in for other courses sharing the table), computes exact top-k for one
+target assignment with index scans disabled, then measures each index and
+search parameter against it.
+
+Run from services/reading_indexer:
+    python benchmarks/ann_recall.py --rows 20000 --assignments 4
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from ann_index import apply_search_params, build_index, drop_index, index_name
+from bench_db import Timer, bench_assignments, connection, get_db, insert_embeddings, percentile_ms, synthetic_embeddings
+
+SEARCH_SQL = """SELECT id FROM reading_chunks
+WHERE assignment_id = %s
+ORDER BY embedding <=> %s::vector
+LIMIT %s"""
+
+
+def run_queries(conn, assignment_id, queries, k, **search_params) -> tuple[list[list[str]], list[float]]:
+    results, latencies = [], []
+    cur = conn.cursor()
+    for q in queries:
+        with Timer() as t:
+            apply_search_params(cur, **search_params)
+            cur.execute(SEARCH_SQL, (assignment_id, str(q.tolist()), k))
+            ids = [row[0] for row in cur.fetchall()]
+            conn.rollback()
+        results.append(ids)
+        latencies.append(t.elapsed)
+    cur.close()
+    return results, latencies
+
+
+def recall_at_k(truth: list[list[str]], found: list[list[str]], k: int) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / (k * len(truth))
+
+
+def report(label, truth, found, latencies, k):
+    short = sum(1 for f in found if len(f) < k)
+    print(
+        f"{label:<36} recall@{k}={recall_at_k(truth, found, k):.3f}  "
+        f"p50={percentile_ms(latencies, 50):7.2f}ms  p99={percentile_ms(latencies, 99):7.2f}ms  "
+        f"short_results={short}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="chunks per assignment")
+    parser.add_argument("--assignments", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--methods", default="hnsw,ivfflat")
+    parser.add_argument("--scopes", default="global,partial")
+    parser.add_argument("--ef-search", default="10,40,100,200")
+    parser.add_argument("--probes", default="1,5,10,20")
+    args = parser.parse_args()
+
+    conn = get_db()
+    with bench_assignments(conn, args.assignments) as assignment_ids:
+        target = assignment_ids[0]
+        print(f"Loading {args.rows} x {args.assignments} synthetic chunks...")
+        for i, aid in enumerate(assignment_ids):
+            insert_embeddings(conn, aid, synthetic_embeddings(args.rows, seed=i))
+        cur = conn.cursor()
+        cur.execute("ANALYZE reading_chunks")
+        conn.commit()
+        cur.close()
+
+        queries = synthetic_embeddings(args.queries, seed=10_000, topic_seed=0)
+        truth, exact_latencies = run_queries(conn, target, queries, args.k, exact=True)
+        report("exact (seq scan)", truth, truth, exact_latencies, args.k)
+
+        for method in args.methods.split(","):
+            for scope in args.scopes.split(","):
+                scoped_id = target if scope == "partial" else None
+                name = index_name(method, scoped_id)
+                with Timer() as build_time, connection() as ddl_conn:
+                    built = build_index(ddl_conn, method=method, assignment_id=scoped_id)
+                print(f"\n{name} ({'built in %.1fs' % build_time.elapsed if built['created'] else 'pre-existing'})")
+
+                sweep = args.ef_search if method == "hnsw" else args.probes
+                for value in (int(v) for v in sweep.split(",")):
+                    param = {"ef_search": value} if method == "hnsw" else {"probes": value}
+                    found, latencies = run_queries(conn, target, queries, args.k, **param)
+                    report(f"  {method}/{scope} {next(iter(param))}={value}", truth, found, latencies, args.k)
+
+                if built["created"]:
+                    with connection() as ddl_conn:
+                        drop_index(ddl_conn, name)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Bulk indexing throughput against the number of embedding worker processes.
+
+Indexes the same synthetic course readings once per worker count, each run
+under its own assignment and its own embedding cache key so nothing is
+served from the cache. Reports end-to-end chunks/s (chunking, embedding and
+writing) and the speedup over one worker.
+
+Run from services/reading_indexer:
+    python benchmarks/bulk_index.py --readings 24 --words 20000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_db import Timer, bench_assignments, connection, get_db
+from bulk import embedding_pool, new_bulk_progress, run_bulk_index, threads_per_worker
+from chunking import chunk_document
+from corpus import TOPICS, synthetic_reading
+from embeddings import Embedder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=24)
+    parser.add_argument("--words", type=int, default=20000, help="words per reading")
+    parser.add_argument("--workers", default=",".join(str(2**i) for i in range(4)))
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    args = parser.parse_args()
+
+    topics = list(TOPICS)
+    readings = [
+        {"source_title": f"Reading {i}", "text": synthetic_reading(args.words, topics[i % len(topics)], seed=i)}
+        for i in range(args.readings)
+    ]
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    # The writer process tokenizes for the chunker, so it needs a model too
+    embedder = Embedder(backend=args.backend)
+    embedder.load()
+    chunk = lambda text: chunk_document(text, embedder.count_tokens, embedder.max_tokens)  # noqa: E731
+
+    print(f"{'workers':>7} {'threads':>7} {'chunks':>7} {'seconds':>8} {'chunks/s':>9} {'speedup':>8}")
+    conn = get_db()
+    baseline = None
+    try:
+        with bench_assignments(conn, len(worker_counts)) as assignment_ids:
+            for workers, assignment_id in zip(worker_counts, assignment_ids):
+                model_name = f"bench-bulk-{workers}:{embedder.cache_key}"
+                progress = new_bulk_progress(assignment_id, len(readings), workers)
+                # Pool start-up (spawning and loading one model per worker) is part of the cost
+                with Timer() as t, embedding_pool(workers, args.backend) as pool:
+                    run_bulk_index(conn, assignment_id, readings, progress, chunk, model_name, None, pool)
+                rate = progress["chunks"] / t.elapsed
+                baseline = baseline or rate
+                print(
+                    f"{workers:>7} {threads_per_worker(workers):>7} {progress['chunks']:>7} "
+                    f"{t.elapsed:8.1f} {rate:9.1f} {rate / baseline:7.2f}x"
+                )
+    finally:
+        with connection() as cleanup:
+            cur = cleanup.cursor()
+            cur.execute("DELETE FROM chunk_embeddings WHERE model LIKE 'bench-bulk-%%'")
+            cleanup.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
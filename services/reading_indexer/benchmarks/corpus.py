@@ -0,0 +1,118 @@
+"""Offline text corpora for reading indexer benchmarks.
+
+``build_corpus`` mixes three kinds of passage, each short enough to be one
+chunk: public-domain excerpts (Smith, Ricardo) with paraphrased claims,
+synthetic passages each containing one citable finding (authors, year,
+statistic) with claims that cite it, and unlabeled synthetic filler that
+makes the corpus as large as requested.
+"""
+import json
+import os
+
+import numpy as np
+
+CORPORA_DIR = os.path.join(os.path.dirname(__file__), "corpora")
+
+TOPICS = {
+    "trade": "tariff import export comparative advantage manufacturing employment wages china shock offshoring supply chain",
+    "labor": "minimum wage employment elasticity teenage workers hours earnings monopsony restaurant county border",
+    "retail": "walmart entry local retailers prices consumers productivity logistics rural towns small business",
+    "housing": "zoning supply rents construction permits density homeownership mortgage affordability migration",
+    "climate": "carbon tax emissions abatement energy prices coal renewable subsidies innovation leakage",
+}
+FILLER = (
+    "the of and in to a that is for on as with by this was are from evidence study "
+    "effect results we find suggests estimate data sample period increase decrease"
+).split()
+
+
+def synthetic_reading(n_words: int, topic: str, seed: int = 0) -> str:
+    """Pseudo-prose on one topic: topical terms mixed with function words."""
+    rng = np.random.default_rng(seed)
+    topical = TOPICS[topic].split()
+    words = []
+    while len(words) < n_words:
+        sentence = rng.choice(FILLER, rng.integers(6, 12)).tolist()
+        for pos in rng.integers(0, len(sentence), 3):
+            sentence[pos] = rng.choice(topical)
+        sentence[0] = sentence[0].capitalize()
+        words.extend(sentence)
+        words[-1] += "."
+    return " ".join(words[:n_words])
+
+
+def synthetic_queries(n: int, seed: int = 0) -> list[tuple[str, str]]:
+    """(topic, query) pairs phrased like student claims."""
+    rng = np.random.default_rng(seed)
+    names = list(TOPICS)
+    queries = []
+    for _ in range(n):
+        topic = names[rng.integers(0, len(names))]
+        terms = rng.choice(TOPICS[topic].split(), 4, replace=False)
+        queries.append((topic, f"The reading shows that {terms[0]} and {terms[1]} affect {terms[2]} {terms[3]}"))
+    return queries
+
+
+SURNAMES = (
+    "Autor Dorn Hanson Card Krueger Neumark Basker Jia Glaeser Gyourko Acemoglu Restrepo "
+    "Pierce Schott Feenstra Hsieh Moretti Saiz Metcalf Weisbach Greenstone Dube Cengiz Harasztosi"
+).split()
+FINDINGS = {
+    "trade": ("manufacturing employment", "import competition"),
+    "labor": ("teen employment", "a minimum wage increase"),
+    "retail": ("local retail prices", "big-box store entry"),
+    "housing": ("rents", "zoning restrictions"),
+    "climate": ("industrial emissions", "a carbon price"),
+}
+
+
+def load_public_domain() -> tuple[list[dict], list[dict]]:
+    """Public-domain passages and their hand-labeled claims."""
+    with open(os.path.join(CORPORA_DIR, "public_domain.json")) as f:
+        data = json.load(f)
+    passages = [
+        {"id": p["id"], "source_title": data["sources"][p["source"]], "text": p["text"]}
+        for p in data["passages"]
+    ]
+    claims = [{"claim": c["claim"], "passage": c["passage"], "kind": "paraphrase"} for c in data["claims"]]
+    return passages, claims
+
+
+def labeled_synthetic(n: int, seed: int = 0) -> tuple[list[dict], list[dict]]:
+    """Passages that each report one finding, with claims citing it by name and number."""
+    rng = np.random.default_rng(seed)
+    topics = list(FINDINGS)
+    passages, claims = [], []
+    for i in range(n):
+        topic = topics[i % len(topics)]
+        outcome, cause = FINDINGS[topic]
+        a, b, c = rng.choice(SURNAMES, 3, replace=False)
+        year = int(rng.integers(1990, 2024))
+        stat = f"{rng.integers(1, 99) / 100:.2f}"
+        finding = (
+            f"{a}, {b} and {c} ({year}) estimate an elasticity of {stat} "
+            f"for {outcome} in response to {cause}."
+        )
+        before = synthetic_reading(80, topic, seed=seed * 100_003 + i)
+        after = synthetic_reading(60, topic, seed=seed * 100_003 + i + 50_000)
+        passage_id = f"finding-{i}"
+        passages.append({"id": passage_id, "source_title": f"{a} et al. ({year})", "text": f"{before} {finding} {after}"})
+        claims.append({"claim": f"the {year} {a}, {b} and {c} paper", "passage": passage_id, "kind": "citation"})
+        claims.append({"claim": f"{a} found a {stat} elasticity of {outcome}", "passage": passage_id, "kind": "statistic"})
+    return passages, claims
+
+
+def build_corpus(size: int, seed: int = 0) -> tuple[list[dict], list[dict]]:
+    """``size`` single-chunk passages plus labeled claims pointing at some of them."""
+    passages, claims = load_public_domain()
+    found_passages, found_claims = labeled_synthetic(max(10, size // 100), seed)
+    passages += found_passages
+    claims += found_claims
+    topics = list(TOPICS)
+    for i in range(max(0, size - len(passages))):
+        passages.append({
+            "id": f"filler-{i}",
+            "source_title": "Synthetic filler",
+            "text": synthetic_reading(150, topics[i % len(topics)], seed=seed * 7_919 + i + 1_000_000),
+        })
+    return passages, claims
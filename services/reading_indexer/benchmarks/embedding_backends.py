@@ -0,0 +1,128 @@
+"""Compare embedding backends: load time, RSS, throughput, latency, agreement.
+
+Each backend runs in a fresh process so RSS and load time are not polluted by
+a previously loaded model. Retrieval agreement is measured against the torch
+backend: overlap of each query's top-k chunks and the cosine between the two
+backends' vectors for the same text. Needs no database.
+
+Run from services/reading_indexer:
+    python benchmarks/embedding_backends.py --backends torch,onnx,onnx-int8
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from corpus import TOPICS, synthetic_queries, synthetic_reading
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(backend: str, chunks: list[str], queries: list[str], threads: int | None, out):
+    from embeddings import Embedder
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    embedder = Embedder(backend=backend, threads=threads)
+    embedder.load()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    embedder.encode(chunks[:8])  # first-call graph/kernel setup
+    start = time.perf_counter()
+    chunk_vectors = embedder.encode(chunks)
+    encode_seconds = time.perf_counter() - start
+
+    latencies = []
+    query_vectors = []
+    for q in queries:
+        t = time.perf_counter()
+        query_vectors.append(embedder.encode(q))
+        latencies.append(time.perf_counter() - t)
+
+    out.put({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_loaded_mb": rss_loaded - rss_before,
+        "rss_peak_mb": rss_mb(),
+        "chunks_per_second": len(chunks) / encode_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "query_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "chunk_vectors": np.asarray(chunk_vectors, dtype=np.float32),
+        "query_vectors": np.asarray(query_vectors, dtype=np.float32),
+    })
+
+
+def normalize(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def top_k(query_vectors, chunk_vectors, k):
+    scores = normalize(query_vectors) @ normalize(chunk_vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--chunk-words", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    topics = list(TOPICS)
+    chunks = [
+        synthetic_reading(args.chunk_words, topics[i % len(topics)], seed=i)
+        for i in range(args.chunks)
+    ]
+    queries = [q for _, q in synthetic_queries(args.queries)]
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in args.backends.split(","):
+        out = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, chunks, queries, args.threads, out))
+        proc.start()
+        results[backend] = out.get()
+        proc.join()
+
+    baseline = results.get("torch")
+    print(
+        f"{'backend':<10} {'load_s':>7} {'rss_mb':>7} {'chunks/s':>9} "
+        f"{'q_p50_ms':>9} {'q_p99_ms':>9} {'cos_vs_torch':>12} {'top%d_agree' % args.k:>10}"
+    )
+    for backend, r in results.items():
+        cosine = agreement = float("nan")
+        if baseline is not None:
+            cosine = float(np.mean(np.sum(
+                normalize(r["chunk_vectors"]) * normalize(baseline["chunk_vectors"]), axis=1
+            )))
+            mine = top_k(r["query_vectors"], r["chunk_vectors"], args.k)
+            ref = top_k(baseline["query_vectors"], baseline["chunk_vectors"], args.k)
+            agreement = float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(mine, ref)]))
+        print(
+            f"{backend:<10} {r['load_seconds']:7.2f} {r['rss_loaded_mb']:7.0f} {r['chunks_per_second']:9.1f} "
+            f"{r['query_p50_ms']:9.2f} {r['query_p99_ms']:9.2f} {cosine:12.4f} {agreement:10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Storage size, latency and recall of full vs half vs binary embeddings.
+
+The same synthetic vectors are loaded once per storage mode, each under its
+own assignment with a partial HNSW index. Recall@k is measured against exact
+full-precision search, for several rerank candidate counts (``candidates=k``
+is the first pass alone, since reranking k candidates cannot change the set).
+
+Run from services/reading_indexer:
+    python benchmarks/quantized_storage.py --rows 50000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from ann_index import apply_search_params, build_index, drop_index
+from bench_db import (
+    BENCH_MODEL,
+    Timer,
+    bench_assignments,
+    connection,
+    get_db,
+    insert_embeddings,
+    percentile_ms,
+    synthetic_embeddings,
+)
+from chunk_store import STORAGE_COLUMNS
+from retrieval import vector_search
+
+MODES = list(STORAGE_COLUMNS)
+
+
+def search_all(conn, assignment_id, queries, k, storage, candidates=None, exact=False):
+    found, latencies = [], []
+    cur = conn.cursor()
+    for q in queries:
+        with Timer() as t:
+            apply_search_params(cur, ef_search=max(40, candidates or k), exact=exact)
+            rows = vector_search(
+                cur, assignment_id, q.tolist(), k, storage=storage, model=BENCH_MODEL, candidates=candidates
+            )
+            conn.rollback()
+        found.append({r["chunk_text"] for r in rows})
+        latencies.append(t.elapsed)
+    cur.close()
+    return found, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", default="1,2,4,10", help="rerank candidates as multiples of k")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows, seed=0)
+    queries = synthetic_embeddings(args.queries, seed=10_000, topic_seed=0)
+
+    conn = get_db()
+    with bench_assignments(conn, len(MODES)) as assignment_ids:
+        by_mode = dict(zip(MODES, assignment_ids))
+        print(f"Loading {args.rows} synthetic chunks per storage mode...")
+        for storage, aid in by_mode.items():
+            insert_embeddings(conn, aid, vectors, storage=storage)
+
+        truth, _ = search_all(conn, by_mode["full"], queries, args.k, "full", exact=True)
+
+        built_indexes = []
+        try:
+            report(conn, args, by_mode, queries, truth, built_indexes)
+        finally:
+            # Partial indexes outlive their (deleted) benchmark assignments
+            with connection() as ddl_conn:
+                for name in built_indexes:
+                    drop_index(ddl_conn, name)
+    conn.close()
+
+
+def report(conn, args, by_mode, queries, truth, built_indexes):
+    """Print storage sizes, then recall and latency per storage mode."""
+    print(f"\n{'storage':<8} {'column_MB':>10} {'index_MB':>9} {'build_s':>8}")
+    cur = conn.cursor()
+    for storage, aid in by_mode.items():
+        column, _ = STORAGE_COLUMNS[storage]
+        with Timer() as build_time, connection() as ddl_conn:
+            built = build_index(ddl_conn, method="hnsw", assignment_id=aid, storage=storage)
+        built_indexes.append(built["index"])
+        cur.execute(
+            f"SELECT sum(pg_column_size({column})) FROM reading_chunks WHERE assignment_id = %s", (aid,)
+        )
+        column_bytes = cur.fetchone()[0]
+        cur.execute("SELECT pg_relation_size(%s::regclass)", (built["index"],))
+        index_bytes = cur.fetchone()[0]
+        conn.rollback()
+        print(
+            f"{storage:<8} {column_bytes / 2**20:10.1f} {index_bytes / 2**20:9.1f} {build_time.elapsed:8.1f}"
+        )
+    cur.close()
+
+    print(f"\n{'storage':<8} {'candidates':>10} {'recall@%d' % args.k:>9} {'p50_ms':>8} {'p99_ms':>8}")
+    for storage, aid in by_mode.items():
+        multiples = [1] if storage == "full" else [int(m) for m in args.candidates.split(",")]
+        for multiple in multiples:
+            candidates = None if storage == "full" else multiple * args.k
+            found, latencies = search_all(conn, aid, queries, args.k, storage, candidates=candidates)
+            recall = sum(len(t & f) for t, f in zip(truth, found)) / (args.k * len(truth))
+            print(
+                f"{storage:<8} {candidates or args.k:>10} {recall:9.3f} "
+                f"{percentile_ms(latencies, 50):8.2f} {percentile_ms(latencies, 99):8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
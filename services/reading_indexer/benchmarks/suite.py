@@ -0,0 +1,156 @@
+"""Retrieval benchmark suite for the reading indexer.
+
+For each embedding backend and corpus size this indexes a fresh corpus
+through the production write path (chunking, ChunkSync, the embedding
+cache), then runs every labeled claim through each search mode and storage
+mode. Reports indexing throughput, search latency p50/p99, recall@k and
+MRR@k, broken down by claim kind.
+
+Runs offline against the local docker-compose Postgres once the embedding
+model is in the Hugging Face cache (set HF_HUB_OFFLINE=1 to be sure).
+
+Run from services/reading_indexer:
+    python benchmarks/suite.py --sizes 1000,10000 --modes vector,hybrid,lexical
+    python benchmarks/suite.py --backends torch,onnx-int8 --storage full,binary --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from ann_index import build_index, drop_index
+from bench_db import Timer, bench_assignments, connection, get_db, percentile_ms
+from chunk_store import ChunkSync
+from chunking import chunk_document
+from corpus import build_corpus
+from embeddings import Embedder
+from retrieval import hybrid_search, lexical_search, vector_search
+
+INDEX_BATCH = 64
+
+
+def index_corpus(conn, assignment_id, passages, embedder, storage) -> dict:
+    """Index passages through ChunkSync; returns throughput figures."""
+    embed = lambda texts: embedder.encode(texts).tolist()  # noqa: E731
+    chunks = [
+        chunk
+        for p in passages
+        for chunk in chunk_document(p["text"], embedder.count_tokens, embedder.max_tokens)
+    ]
+    with Timer() as t:
+        sync = ChunkSync(conn, assignment_id, "benchmark", embedder.cache_key, embed, commit_batches=True, storage=storage)
+        for i in range(0, len(chunks), INDEX_BATCH):
+            sync.add(chunks[i:i + INDEX_BATCH])
+        stats = sync.finish()
+    return {"chunks": stats["indexed_chunks"], "index_seconds": t.elapsed, "chunks_per_second": stats["indexed_chunks"] / t.elapsed}
+
+
+def search(cur, mode, assignment_id, claim, vector, k, storage, model):
+    if mode == "lexical":
+        return lexical_search(cur, assignment_id, claim, k)
+    if mode == "hybrid":
+        return hybrid_search(cur, assignment_id, vector, claim, k, storage=storage, model=model)
+    return vector_search(cur, assignment_id, vector, k, storage=storage, model=model)
+
+
+def evaluate(conn, assignment_id, claims, labels, vectors, mode, k, storage, model) -> dict:
+    """Recall@k, MRR@k and latency over all claims, overall and per claim kind."""
+    reciprocal_ranks = defaultdict(list)
+    latencies = []
+    cur = conn.cursor()
+    for claim, vector in zip(claims, vectors):
+        with Timer() as t:
+            rows = search(cur, mode, assignment_id, claim["claim"], vector, k, storage, model)
+            conn.rollback()
+        latencies.append(t.elapsed)
+        # A passage longer than the token budget is split, so any piece of it counts
+        target = labels[claim["passage"]]
+        hits = [rank for rank, r in enumerate(rows, start=1) if r["chunk_text"] in target]
+        rr = 1.0 / hits[0] if hits else 0.0
+        reciprocal_ranks["all"].append(rr)
+        reciprocal_ranks[claim["kind"]].append(rr)
+    cur.close()
+
+    result = {
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+    for kind, rrs in reciprocal_ranks.items():
+        result[f"recall@{k}:{kind}"] = float(np.mean([rr > 0 for rr in rrs]))
+        result[f"mrr@{k}:{kind}"] = float(np.mean(rrs))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="passages (chunks) per corpus")
+    parser.add_argument("--backends", default="torch", help="embedding backends to compare")
+    parser.add_argument("--modes", default="vector,hybrid,lexical")
+    parser.add_argument("--storage", default="full", help="embedding storage modes to compare")
+    parser.add_argument("--ann", choices=("none", "hnsw", "ivfflat"), default="hnsw",
+                        help="partial ANN index to build per corpus")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    conn = get_db()
+    for backend in args.backends.split(","):
+        embedder = Embedder(backend=backend)
+        embedder.load()
+        for size in (int(s) for s in args.sizes.split(",")):
+            passages, claims = build_corpus(size)
+            labels = {p["id"]: " ".join(p["text"].split()) for p in passages}
+            with Timer() as embed_time:
+                vectors = [embedder.encode(c["claim"]).tolist() for c in claims]
+            claim_embed_ms = embed_time.elapsed * 1000 / len(claims)
+
+            for storage in args.storage.split(","):
+                with bench_assignments(conn, 1) as (assignment_id,):
+                    indexed = index_corpus(conn, assignment_id, passages, embedder, storage)
+                    built = None
+                    if args.ann != "none":
+                        with connection() as ddl_conn:
+                            built = build_index(ddl_conn, method=args.ann, assignment_id=assignment_id, storage=storage)
+                    try:
+                        for mode in args.modes.split(","):
+                            row = {
+                                "backend": backend,
+                                "size": size,
+                                "storage": storage,
+                                "mode": mode,
+                                "claims": len(claims),
+                                "claim_embed_ms": claim_embed_ms,
+                                **indexed,
+                                **evaluate(conn, assignment_id, claims, labels, vectors, mode, args.k, storage, embedder.cache_key),
+                            }
+                            results.append(row)
+                            print(
+                                f"{backend:<9} n={size:<7} {storage:<6} {mode:<7} "
+                                f"index={row['chunks_per_second']:7.1f} chunks/s  "
+                                f"p50={row['p50_ms']:6.2f}ms p99={row['p99_ms']:6.2f}ms  "
+                                f"recall@{args.k}={row[f'recall@{args.k}:all']:.3f} "
+                                f"mrr@{args.k}={row[f'mrr@{args.k}:all']:.3f}  "
+                                + " ".join(
+                                    f"{key.split(':')[1]}={value:.2f}"
+                                    for key, value in row.items()
+                                    if key.startswith("recall@") and not key.endswith(":all")
+                                )
+                            )
+                    finally:
+                        if built and built["created"]:
+                            with connection() as ddl_conn:
+                                drop_index(ddl_conn, built["index"])
+    conn.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Bulk indexing of many readings across a pool of embedding processes.
+
+A single uvicorn worker embeds on one process, so indexing a new course's
+readings is bound by one model instance. ``run_bulk_index`` chunks every
+reading up front, skips text already in the ``chunk_embeddings`` cache and
+fans the rest out in batches to worker processes. Each worker loads its own
+model with a pinned thread count (cores / workers) so the pool does not
+oversubscribe the machine.
+
+The calling thread is the only database writer: it caches each batch of
+vectors as it comes back, then syncs every reading through ChunkSync, which
+finds all of its vectors in the cache and just bulk-inserts the rows.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable
+
+from chunk_store import DEFAULT_STORAGE, ChunkSync, EmbedFn, content_hash, store_embeddings, uncached_hashes
+from embeddings import Embedder
+
+BULK_BATCH_SIZE = 64
+DEFAULT_WORKERS = int(os.getenv("BULK_WORKERS", "0")) or os.cpu_count() or 1
+# Each worker process loads its own copy of the model
+MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", "0")) or max(DEFAULT_WORKERS, os.cpu_count() or 1)
+
+# Set in each worker process by _init_worker
+_worker_embedder: Embedder | None = None
+
+
+def threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_worker(backend: str, threads: int):
+    global _worker_embedder
+    # Pin BLAS/OpenMP pools as well as the model's own intra-op threads
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    _worker_embedder = Embedder(backend=backend, threads=threads)
+    _worker_embedder.load()
+
+
+def _embed_batch(hashes: list[str], texts: list[str]) -> tuple[list[str], list[list[float]]]:
+    return hashes, _worker_embedder.encode(texts).tolist()
+
+
+def embedding_pool(workers: int, backend: str) -> ProcessPoolExecutor:
+    # spawn, not fork: the parent is a threaded server that may hold a loaded model
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(backend, threads_per_worker(workers)),
+    )
+
+
+def new_bulk_progress(assignment_id: str, readings: int, workers: int) -> dict:
+    now = time.time()
+    return {
+        "assignment_id": assignment_id,
+        "format": "bulk",
+        "status": "queued",
+        "workers": workers,
+        "readings": readings,
+        "readings_done": 0,
+        "chunks": 0,
+        "to_embed": 0,
+        "embedded": 0,
+        "chunks_per_second": None,
+        "started_at": now,
+        "updated_at": now,
+    }
+
+
+def run_bulk_index(
+    conn,
+    assignment_id: str,
+    readings: list[dict],
+    progress: dict,
+    chunk: Callable[[str], list[dict]],
+    model_name: str,
+    embed: EmbedFn,
+    pool: Executor,
+    batch_size: int = BULK_BATCH_SIZE,
+    storage: str = DEFAULT_STORAGE,
+    version_id: str | None = None,
+) -> dict:
+    """Index ``readings`` ({source_title, text}) embedding uncached chunks in ``pool``.
+
+    ``chunk`` splits a reading's text into chunker dicts (see chunking).
+    ``embed`` is only a fallback for a vector that disappears from the cache
+    between the embedding and writing phases. Returns per-reading sync stats
+    and leaves ``progress`` at ``indexed``.
+    """
+    progress.update(status="chunking", updated_at=time.time())
+    chunked = [(r["source_title"], chunk(r["text"])) for r in readings]
+    texts: dict[str, str] = {}
+    for _, chunks in chunked:
+        for c in chunks:
+            texts.setdefault(content_hash(c["text"]), c["text"])
+
+    futures = []
+    cur = conn.cursor()
+    try:
+        missing = uncached_hashes(cur, list(texts), model_name)
+        conn.commit()
+        progress.update(
+            status="embedding",
+            chunks=sum(len(chunks) for _, chunks in chunked),
+            to_embed=len(missing),
+            updated_at=time.time(),
+        )
+
+        start = time.perf_counter()
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            futures.append(pool.submit(_embed_batch, batch, [texts[h] for h in batch]))
+        for future in as_completed(futures):
+            hashes, vectors = future.result()
+            store_embeddings(cur, {h: str(v) for h, v in zip(hashes, vectors)}, model_name)
+            conn.commit()
+            progress["embedded"] += len(hashes)
+            progress.update(
+                chunks_per_second=progress["embedded"] / (time.perf_counter() - start),
+                updated_at=time.time(),
+            )
+    except Exception:
+        conn.rollback()
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        cur.close()
+
+    progress.update(status="writing", updated_at=time.time())
+    results = {}
+    for source_title, chunks in chunked:
+        sync = ChunkSync(conn, assignment_id, source_title, model_name, embed, storage=storage, version_id=version_id)
+        for i in range(0, len(chunks), batch_size):
+            sync.add(chunks[i:i + batch_size])
+        results[source_title] = sync.finish()
+        progress["readings_done"] += 1
+        progress["updated_at"] = time.time()
+
+    # The caller marks the job done once the chunks are searchable (see versions)
+    progress.update(status="indexed", updated_at=time.time())
+    return results
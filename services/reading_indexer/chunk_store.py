@@ -0,0 +1,302 @@
+"""Content-addressed storage for reading chunks.
+
+Chunks are keyed by a SHA-256 of their text. Embeddings live in a shared
+``chunk_embeddings`` cache keyed by (content_hash, model), so the same reading
+used by several assignments, sections or semesters is embedded once. Each
+``reading_chunks`` row keeps a copy of its vector so the per-assignment ANN
+indexes and the ``/query`` SQL stay unchanged. Rows also carry the chunk's
+extractive synopsis and key facts (see synopsis).
+
+EMBEDDING_STORAGE picks the precision stored on ``reading_chunks`` rows:
+``full`` (vector), ``half`` (halfvec) or ``binary`` (bit, via
+binary_quantize). Compressed rows leave ``embedding`` NULL; searches rerank
+their candidates with the full-precision vector from ``chunk_embeddings``.
+"""
+import hashlib
+import json
+import os
+from typing import Callable
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from synopsis import summarize
+
+EmbedFn = Callable[[list[str]], list[list[float]]]
+
+# storage mode -> (reading_chunks column, SQL to cast a vector literal into it)
+STORAGE_COLUMNS = {
+    "full": ("embedding", "%s::vector"),
+    "half": ("embedding_half", "%s::halfvec"),
+    "binary": ("embedding_bits", "binary_quantize(%s::vector)"),
+}
+DEFAULT_STORAGE = os.getenv("EMBEDDING_STORAGE", "full")
+
+
+# Where a chunk came from in its reading (see chunking.SentenceChunker)
+POSITION_COLUMNS = ("page_start", "page_end", "char_start", "char_end", "token_count")
+
+
+def _positions(chunk: dict) -> tuple:
+    return tuple(chunk.get(col) for col in POSITION_COLUMNS)
+
+
+def content_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def cached_embeddings(cur, hashes: list[str], model_name: str) -> dict[str, str]:
+    """Return {content_hash: vector literal} for hashes already embedded."""
+    if not hashes:
+        return {}
+    cur.execute(
+        """SELECT content_hash, embedding::text FROM chunk_embeddings
+        WHERE model = %s AND content_hash = ANY(%s)""",
+        (model_name, hashes),
+    )
+    return dict(cur.fetchall())
+
+
+def uncached_hashes(cur, hashes: list[str], model_name: str) -> list[str]:
+    """Return the hashes with no cached embedding, in their original order."""
+    if not hashes:
+        return []
+    cur.execute(
+        """SELECT content_hash FROM chunk_embeddings
+        WHERE model = %s AND content_hash = ANY(%s)""",
+        (model_name, hashes),
+    )
+    cached = {row[0] for row in cur.fetchall()}
+    return [h for h in hashes if h not in cached]
+
+
+def store_embeddings(cur, vectors: dict[str, str], model_name: str):
+    """Add {content_hash: vector literal} to the shared embedding cache."""
+    execute_values(
+        cur,
+        """INSERT INTO chunk_embeddings (content_hash, model, embedding)
+        VALUES %s ON CONFLICT DO NOTHING""",
+        [(h, model_name, v) for h, v in vectors.items()],
+        template="(%s, %s, %s::vector)",
+    )
+
+
+def embed_missing(cur, chunks: dict[str, str], model_name: str, embed: EmbedFn) -> tuple[dict[str, str], int]:
+    """Look up embeddings for {hash: text}, embedding and caching only misses.
+
+    Returns ({content_hash: vector literal}, number of chunks embedded).
+    """
+    vectors = cached_embeddings(cur, list(chunks), model_name)
+    missing = [h for h in chunks if h not in vectors]
+    if missing:
+        for h, embedding in zip(missing, embed([chunks[h] for h in missing])):
+            vectors[h] = str(list(embedding))
+        store_embeddings(cur, {h: vectors[h] for h in missing}, model_name)
+    return vectors, len(missing)
+
+
+class ChunkSync:
+    """Sync one reading's stored chunks with a new set of chunks, batch by batch.
+
+    Unchanged chunks are left alone, only new chunks are embedded (unless
+    another assignment already embedded the same text) and chunks that were
+    not seen by ``finish`` are deleted. Only rows of ``version_id`` (see
+    versions) are compared and written. With ``commit_batches`` each ``add``
+    commits, which keeps a long reading's transactions short; use it only on
+    a building version, which searches do not see. Otherwise the whole sync
+    is one transaction.
+    """
+
+    def __init__(
+        self,
+        conn,
+        assignment_id: str,
+        source_title: str,
+        model_name: str,
+        embed: EmbedFn,
+        commit_batches: bool = False,
+        storage: str = DEFAULT_STORAGE,
+        version_id: str | None = None,
+    ):
+        if storage not in STORAGE_COLUMNS:
+            raise ValueError(f"Unsupported embedding storage: {storage}")
+        self.conn = conn
+        self.assignment_id = assignment_id
+        self.source_title = source_title
+        self.model_name = model_name
+        self.embed = embed
+        self.commit_batches = commit_batches
+        self.storage = storage
+        self.version_id = version_id
+        self.stats = {
+            "indexed_chunks": 0,
+            "added": 0,
+            "removed": 0,
+            "unchanged": 0,
+            "embedded": 0,
+            "duplicates_skipped": 0,
+        }
+        self._seen: set[str] = set()
+
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                """SELECT id, content_hash FROM reading_chunks
+                WHERE assignment_id = %s AND source_title = %s AND version_id IS NOT DISTINCT FROM %s""",
+                (assignment_id, source_title, version_id),
+            )
+            # Rows indexed before content hashing (NULL hash) are always replaced
+            self._existing: dict[str | None, list] = {}
+            for row_id, h in cur.fetchall():
+                self._existing.setdefault(h, []).append(row_id)
+        finally:
+            cur.close()
+
+    def add(self, chunks: list[str | dict]):
+        """Add chunks: plain strings, or chunker dicts carrying position metadata."""
+        new: dict[str, dict] = {}
+        moved: list[tuple] = []
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = {"text": chunk}
+            h = content_hash(chunk["text"])
+            if h in self._seen:
+                self.stats["duplicates_skipped"] += 1
+                continue
+            self._seen.add(h)
+            if h in self._existing:
+                self.stats["unchanged"] += 1
+                # Same text, but edits earlier in the reading may have shifted it
+                moved.extend((row_id, *_positions(chunk)) for row_id in self._existing[h])
+            else:
+                new[h] = chunk
+        self.stats["indexed_chunks"] = len(self._seen)
+        if not new and not moved:
+            return
+
+        cur = self.conn.cursor()
+        try:
+            if moved:
+                execute_values(
+                    cur,
+                    f"""UPDATE reading_chunks c SET {", ".join(f"{col} = v.{col}" for col in POSITION_COLUMNS)}
+                    FROM (VALUES %s) AS v(id, {", ".join(POSITION_COLUMNS)})
+                    WHERE c.id = v.id::uuid
+                    AND ({", ".join(f"c.{col}" for col in POSITION_COLUMNS)})
+                        IS DISTINCT FROM ({", ".join(f"v.{col}" for col in POSITION_COLUMNS)})""",
+                    moved,
+                    template="(%s, %s::int, %s::int, %s::int, %s::int, %s::int)",
+                )
+            if new:
+                vectors, embedded = embed_missing(
+                    cur, {h: chunk["text"] for h, chunk in new.items()}, self.model_name, self.embed
+                )
+                column, cast = STORAGE_COLUMNS[self.storage]
+                rows = []
+                for h, chunk in new.items():
+                    synopsis, key_facts = summarize(chunk["text"])
+                    rows.append((
+                        self.assignment_id, self.version_id, self.source_title, chunk["text"], h,
+                        synopsis, json.dumps(key_facts), *_positions(chunk), vectors[h],
+                    ))
+                execute_values(
+                    cur,
+                    f"""INSERT INTO reading_chunks
+                    (assignment_id, version_id, source_title, chunk_text, content_hash, synopsis, key_facts,
+                    {", ".join(POSITION_COLUMNS)}, {column})
+                    VALUES %s ON CONFLICT DO NOTHING""",
+                    rows,
+                    template=f"(%s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s, %s, %s, %s, {cast})",
+                )
+            if self.commit_batches:
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        self.stats["added"] += len(new)
+        if new:
+            self.stats["embedded"] += embedded
+
+    def finish(self) -> dict:
+        stale_ids = [row_id for h, ids in self._existing.items() if h not in self._seen for row_id in ids]
+        cur = self.conn.cursor()
+        try:
+            if stale_ids:
+                cur.execute("DELETE FROM reading_chunks WHERE id = ANY(%s::uuid[])", (stale_ids,))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        self.stats["removed"] = len(stale_ids)
+        return dict(self.stats)
+
+
+def sync_chunks(
+    conn,
+    assignment_id: str,
+    source_title: str,
+    chunks: list[str | dict],
+    model_name: str,
+    embed: EmbedFn,
+    storage: str = DEFAULT_STORAGE,
+    version_id: str | None = None,
+) -> dict:
+    """Make the stored chunks for one reading match ``chunks`` in one transaction."""
+    sync = ChunkSync(conn, assignment_id, source_title, model_name, embed, storage=storage, version_id=version_id)
+    sync.add(chunks)
+    return sync.finish()
+
+
+def convert_storage(conn, assignment_id: str, storage: str, model_name: str) -> int:
+    """Rewrite an assignment's chunk vectors into another storage precision.
+
+    Vectors are re-derived from the full-precision cache, which is first
+    backfilled from any full rows. Rows indexed before content hashing cannot
+    be reranked and are left as they are. Returns the number of rows rewritten.
+    """
+    if storage not in STORAGE_COLUMNS:
+        raise ValueError(f"Unsupported embedding storage: {storage}")
+    column, _ = STORAGE_COLUMNS[storage]
+    source = {
+        "full": "e.embedding",
+        "half": "e.embedding::halfvec",
+        "binary": "binary_quantize(e.embedding)",
+    }[storage]
+    assignments = [
+        sql.SQL("{} = {}").format(
+            sql.Identifier(other), sql.SQL(source) if other == column else sql.SQL("NULL")
+        )
+        for other, _ in STORAGE_COLUMNS.values()
+    ]
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """INSERT INTO chunk_embeddings (content_hash, model, embedding)
+            SELECT DISTINCT ON (content_hash) content_hash, %s, embedding
+            FROM reading_chunks
+            WHERE assignment_id = %s AND content_hash IS NOT NULL AND embedding IS NOT NULL
+            ON CONFLICT DO NOTHING""",
+            (model_name, assignment_id),
+        )
+        cur.execute(
+            sql.SQL(
+                """UPDATE reading_chunks c SET {}
+                FROM chunk_embeddings e
+                WHERE e.content_hash = c.content_hash AND e.model = %s
+                AND c.assignment_id = %s"""
+            ).format(sql.SQL(", ").join(assignments)),
+            (model_name, assignment_id),
+        )
+        converted = cur.rowcount
+        conn.commit()
+        return converted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
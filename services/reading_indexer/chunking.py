@@ -0,0 +1,225 @@
+"""Splitting reading text into chunks.
+
+``SentenceChunker`` packs whole sentences into chunks sized by the embedding
+model's tokenizer, so no chunk is longer than the model can embed (the tail
+of an over-long chunk would be silently truncated). A paragraph break starts
+a new chunk once the current one is at least half full, consecutive chunks
+within a paragraph share a sentence or two of overlap, and every chunk
+records the page range and character offsets it came from.
+
+``chunk_text`` is the original fixed word-window chunker.
+"""
+import bisect
+import math
+import re
+from typing import Callable, Iterator
+
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 64
+
+# all-MiniLM-L6-v2 embeds 256 word pieces, two of which are [CLS] and [SEP]
+MAX_TOKENS = 254
+OVERLAP_TOKENS = 32
+# A paragraph break ends the current chunk once it holds this share of MAX_TOKENS
+PARAGRAPH_FILL = 0.5
+# Text without any sentence boundary is cut here rather than buffered forever
+MAX_BUFFER_CHARS = 20_000
+
+CountTokens = Callable[[list[str]], list[int]]
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """Split text into overlapping chunks by word count."""
+    words = text.split()
+    step = chunk_size - overlap
+    return [" ".join(words[start:start + chunk_size]) for start in range(0, len(words), step)]
+
+
+def estimate_tokens(texts: list[str]) -> list[int]:
+    """Word-piece count estimate for when the tokenizer is not loaded (~1.3 per English word)."""
+    return [math.ceil(len(text.split()) * 1.3) for text in texts]
+
+
+# A sentence ends at . ! or ? (plus any closing quote or bracket) followed by
+# whitespace and something that can start a sentence.
+_SENTENCE_BOUNDARY = re.compile(r"[.!?][\"'”’)\]]*(\s+)(?=[\"'“‘(\[]?[A-Z0-9])")
+_ABBREVIATIONS = frozenset(
+    ["e.g.", "i.e.", "al.", "cf.", "vs.", "mr.", "mrs.", "ms.", "dr.", "prof.", "fig.", "no.", "p.", "pp.", "vol.", "u.s."]
+)
+_INITIAL = re.compile(r"[A-Z]\.")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+_WORD = re.compile(r"\S+")
+
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """(start, end) offsets of each sentence, keeping abbreviations and initials intact."""
+    spans = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(text):
+        end = match.start(1)
+        words = text[start:end].split()
+        if words and (words[-1].lower() in _ABBREVIATIONS or _INITIAL.fullmatch(words[-1])):
+            continue
+        if words:
+            spans.append(_strip_span(text, start, end))
+        start = match.end()
+    if text[start:].strip():
+        spans.append(_strip_span(text, start, len(text)))
+    return spans
+
+
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    segment = text[start:end]
+    return start + len(segment) - len(segment.lstrip()), end - len(segment) + len(segment.rstrip())
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split prose into sentences with whitespace normalized."""
+    return [" ".join(text[s:e].split()) for s, e in sentence_spans(text)]
+
+
+def _paragraph_sentence_spans(text: str) -> Iterator[tuple[int, int]]:
+    start = 0
+    for match in [*_PARAGRAPH_BREAK.finditer(text), None]:
+        end = match.start() if match else len(text)
+        for s, e in sentence_spans(text[start:end]):
+            yield start + s, start + e
+        if match:
+            start = match.end()
+
+
+class SentenceChunker:
+    """Token-budgeted chunker fed text incrementally (a page, or any slice of a stream).
+
+    Fed text is concatenated as-is; character offsets refer to that
+    concatenation. Pass ``page`` with each page's text to record page ranges.
+    Chunks are dicts with text, page_start, page_end, char_start, char_end
+    and token_count.
+    """
+
+    def __init__(
+        self,
+        count_tokens: CountTokens = estimate_tokens,
+        max_tokens: int = MAX_TOKENS,
+        overlap_tokens: int = OVERLAP_TOKENS,
+    ):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._buffer = ""
+        self._buffer_start = 0
+        self._fed = 0
+        self._page_offsets: list[int] = []
+        self._pages: list[int] = []
+        self._pending: list[dict] = []
+
+    def feed(self, text: str, page: int | None = None) -> Iterator[dict]:
+        if page is not None and (not self._pages or self._pages[-1] != page):
+            self._page_offsets.append(self._fed)
+            self._pages.append(page)
+        self._buffer += text
+        self._fed += len(text)
+        yield from self._drain(final=False)
+
+    def finish(self) -> Iterator[dict]:
+        yield from self._drain(final=True)
+        if self._pending:
+            yield self._emit()
+
+    def _page_at(self, offset: int) -> int | None:
+        i = bisect.bisect_right(self._page_offsets, offset) - 1
+        return self._pages[i] if i >= 0 else None
+
+    def _drain(self, final: bool) -> Iterator[dict]:
+        spans = list(_paragraph_sentence_spans(self._buffer))
+        # The last sentence may continue in the next piece of text
+        if spans and not final and len(self._buffer) - spans[-1][0] < MAX_BUFFER_CHARS:
+            spans.pop()
+        if not spans:
+            return
+
+        texts = [" ".join(self._buffer[s:e].split()) for s, e in spans]
+        cursor = 0
+        units = []
+        for (s, e), text, tokens in zip(spans, texts, self.count_tokens(texts)):
+            units.append({
+                "text": text,
+                "start": self._buffer_start + s,
+                "end": self._buffer_start + e,
+                "tokens": tokens,
+                # Buffer starts at the previous sentence's end, so the gap is all here
+                "paragraph_start": bool(_PARAGRAPH_BREAK.search(self._buffer[cursor:s])),
+            })
+            cursor = e
+        self._buffer = self._buffer[cursor:]
+        self._buffer_start += cursor
+
+        for unit in units:
+            for piece in self._split_oversized(unit):
+                yield from self._add(piece)
+
+    def _split_oversized(self, unit: dict) -> list[dict]:
+        """Cut a sentence longer than the budget (tables, run-on PDF text) at word boundaries."""
+        if unit["tokens"] <= self.max_tokens:
+            return [unit]
+        words = list(_WORD.finditer(unit["text"]))
+        word_tokens = self.count_tokens([w.group() for w in words])
+        # Offsets within the normalized text only approximate the source offsets
+        scale = (unit["end"] - unit["start"]) / max(len(unit["text"]), 1)
+        pieces, first, tokens = [], 0, 0
+        for i, count in enumerate([*word_tokens, None]):
+            if count is None or (tokens + count > self.max_tokens and i > first):
+                start, end = words[first].start(), words[i - 1].end()
+                pieces.append({
+                    "text": unit["text"][start:end],
+                    "start": unit["start"] + round(start * scale),
+                    "end": unit["start"] + round(end * scale),
+                    "tokens": tokens,
+                    "paragraph_start": unit["paragraph_start"] and not pieces,
+                })
+                first, tokens = i, 0
+            if count is not None:
+                tokens += count
+        return pieces
+
+    def _add(self, unit: dict) -> Iterator[dict]:
+        pending_tokens = sum(u["tokens"] for u in self._pending)
+        full = pending_tokens + unit["tokens"] > self.max_tokens
+        paragraph_end = unit["paragraph_start"] and pending_tokens >= self.max_tokens * PARAGRAPH_FILL
+        if self._pending and (full or paragraph_end):
+            emitted = self._pending
+            yield self._emit()
+            if not unit["paragraph_start"]:
+                self._pending = self._overlap(emitted)
+                if sum(u["tokens"] for u in self._pending) + unit["tokens"] > self.max_tokens:
+                    self._pending = []
+        self._pending.append(unit)
+
+    def _overlap(self, units: list[dict]) -> list[dict]:
+        """Trailing sentences of a chunk, within the overlap budget, to repeat in the next."""
+        tail, tokens = [], 0
+        for unit in reversed(units[1:]):
+            tokens += unit["tokens"]
+            if tokens > self.overlap_tokens:
+                break
+            tail.insert(0, unit)
+        return tail
+
+    def _emit(self) -> dict:
+        units, self._pending = self._pending, []
+        return {
+            "text": " ".join(u["text"] for u in units),
+            "page_start": self._page_at(units[0]["start"]),
+            "page_end": self._page_at(units[-1]["end"] - 1),
+            "char_start": units[0]["start"],
+            "char_end": units[-1]["end"],
+            "token_count": sum(u["tokens"] for u in units),
+        }
+
+
+def chunk_document(
+    text: str, count_tokens: CountTokens = estimate_tokens, max_tokens: int = MAX_TOKENS
+) -> list[dict]:
+    """Chunk a whole document held in memory."""
+    chunker = SentenceChunker(count_tokens, max_tokens)
+    return [*chunker.feed(text), *chunker.finish()]
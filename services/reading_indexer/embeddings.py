@@ -0,0 +1,109 @@
+"""Pluggable embedding backends for the reading indexer.
+
+EMBEDDING_BACKEND selects how all-MiniLM-L6-v2 runs:
+  torch      - PyTorch fp32 (original behaviour)
+  onnx       - ONNX Runtime export of the same weights, fp32
+  onnx-int8  - ONNX Runtime, dynamically int8-quantized weights
+
+The model is not loaded at import. With EMBEDDING_WARMUP=background (the
+default) main.py loads it on a daemon thread once the server starts; with
+EMBEDDING_WARMUP=lazy it loads on the first request. Either way ``encode``
+waits for a load that is still in progress.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# Quantized exports published in the sentence-transformers model repo
+ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_qint8_avx512.onnx"),
+}
+BACKENDS = ("torch", *ONNX_FILES)
+
+
+def _load_model(backend: str, model_name: str, threads: int | None):
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name, device="cpu")
+
+    model_kwargs = {"file_name": ONNX_FILES[backend]}
+    if threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = options
+    return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+class Embedder:
+    def __init__(self, backend: str | None = None, model_name: str = EMBEDDING_MODEL, threads: int | None = None):
+        self.backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"EMBEDDING_BACKEND must be one of {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.threads = threads or (int(os.getenv("EMBEDDING_THREADS", "0")) or None)
+        self.load_seconds: float | None = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self) -> str:
+        """Model identifier for the shared embedding cache.
+
+        fp32 ONNX reproduces the PyTorch vectors, so they share a key; int8
+        vectors differ slightly and are cached separately.
+        """
+        return self.model_name if self.backend != "onnx-int8" else f"{self.model_name}:qint8"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self):
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                start = time.perf_counter()
+                self._model = _load_model(self.backend, self.model_name, self.threads)
+                self.load_seconds = time.perf_counter() - start
+                print(f"[embeddings] Loaded {self.model_name} ({self.backend}) in {self.load_seconds:.1f}s")
+        return self._model
+
+    def warm_in_background(self) -> threading.Thread:
+        t = threading.Thread(target=self.load, daemon=True)
+        t.start()
+        return t
+
+    def encode(self, texts: str | list[str], batch_size: int = 32) -> np.ndarray:
+        return self.load().encode(texts, batch_size=batch_size)
+
+    @property
+    def max_tokens(self) -> int:
+        """Longest input, in word pieces, the model embeds without truncation."""
+        # max_seq_length counts the [CLS] and [SEP] tokens the model adds
+        return self.load().max_seq_length - 2
+
+    def count_tokens(self, texts: list[str]) -> list[int]:
+        tokenizer = self.load().tokenizer
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+        }
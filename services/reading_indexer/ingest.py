@@ -0,0 +1,127 @@
+"""Streaming ingestion of uploaded readings.
+
+Plain text is chunked as bytes arrive. PDF and DOCX need random access, so
+the upload is spooled to a temp file on disk and then read one page (or
+paragraph) at a time. Either way chunks are embedded and committed in fixed
+size batches, so memory stays flat and early pages are searchable before the
+rest of the document has been processed. PDF chunks record their page range.
+"""
+import codecs
+import time
+from typing import AsyncIterator, Iterator
+
+from chunk_store import ChunkSync
+from chunking import SentenceChunker
+
+FORMATS = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "text",
+}
+BATCH_SIZE = 64
+
+
+def format_from_content_type(content_type: str) -> str | None:
+    return FORMATS.get(content_type.split(";")[0].strip().lower())
+
+
+def iter_pdf_pages(path: str) -> Iterator[str]:
+    import pymupdf
+
+    with pymupdf.open(path) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[str]:
+    from docx import Document
+
+    for paragraph in Document(path).paragraphs:
+        if paragraph.text.strip():
+            yield paragraph.text
+
+
+def new_progress(assignment_id: str, source_title: str, fmt: str) -> dict:
+    now = time.time()
+    return {
+        "assignment_id": assignment_id,
+        "source_title": source_title,
+        "format": fmt,
+        "status": "receiving",
+        "bytes_received": 0,
+        "pages": 0,
+        "chunks": 0,
+        "started_at": now,
+        "updated_at": now,
+    }
+
+
+class BatchIngest:
+    """Feeds text through a SentenceChunker into a ChunkSync in batches.
+
+    ``finish`` sets the progress to ``final_status``; a caller with more to
+    do after the sync (e.g. activating a version) passes its own.
+    """
+
+    def __init__(
+        self,
+        sync: ChunkSync,
+        progress: dict,
+        batch_size: int = BATCH_SIZE,
+        chunker: SentenceChunker | None = None,
+        final_status: str = "done",
+    ):
+        self.sync = sync
+        self.progress = progress
+        self.batch_size = batch_size
+        self.chunker = chunker or SentenceChunker()
+        self.final_status = final_status
+        self._pending: list[dict] = []
+
+    def feed(self, text: str, page: int | None = None):
+        for chunk in self.chunker.feed(text, page):
+            self._pending.append(chunk)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.progress["chunks"] += len(self._pending)
+            self.sync.add(self._pending)
+            self._pending = []
+        self.progress.update(self.sync.stats, updated_at=time.time())
+
+    def finish(self) -> dict:
+        self._pending.extend(self.chunker.finish())
+        self.flush()
+        stats = self.sync.finish()
+        self.progress.update(stats, status=self.final_status, updated_at=time.time())
+        return stats
+
+
+def ingest_document(path: str, fmt: str, ingest: BatchIngest) -> dict:
+    """Chunk and index a spooled PDF/DOCX page by page."""
+    ingest.progress["status"] = "indexing"
+    if fmt == "pdf":
+        for page_number, page_text in enumerate(iter_pdf_pages(path), start=1):
+            ingest.progress["pages"] += 1
+            # Sentences run on across pages; only a blank line is a paragraph break
+            ingest.feed(page_text + "\n", page=page_number)
+    else:
+        for paragraph in iter_docx_paragraphs(path):
+            ingest.progress["pages"] += 1
+            ingest.feed(paragraph + "\n\n")
+    return ingest.finish()
+
+
+async def iter_stream_text(stream: AsyncIterator[bytes], progress: dict) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream, never splitting a multi-byte character."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for piece in stream:
+        progress["bytes_received"] += len(piece)
+        text = decoder.decode(piece)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
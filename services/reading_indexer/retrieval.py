@@ -0,0 +1,192 @@
+"""Similarity search over reading_chunks.
+
+``vector`` ranks by cosine distance. ``lexical`` ranks by Postgres full-text
+match on the generated ``chunk_tsv`` column, which catches author names,
+years and statistics that MiniLM embeds poorly. ``hybrid`` runs both in one
+statement (the vector index plus one GIN lookup), which returns each
+ranking's candidates, and fuses the two rankings with reciprocal rank
+fusion (``fuse_rankings``); a chunk found by both appears once.
+
+Vector candidates come from whichever column the storage mode populates
+(see chunk_store). For ``half`` and ``binary`` the first pass over-fetches
+and ``rerank`` orders the candidates by their full-precision similarity,
+using the vectors from ``chunk_embeddings``. Hybrid search reranks its
+vector candidates the same way, in SQL, before they are fused.
+
+Every search sees only the assignment's active index version (see versions).
+"""
+from versions import ACTIVE_VERSION_FILTER
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+SCORE_COLUMNS = ("similarity", "lexical_score", "score")
+
+# storage mode -> first-pass distance expression over reading_chunks
+FIRST_PASS_DISTANCE = {
+    "full": "embedding <=> %(embedding)s::vector",
+    "half": "embedding_half <=> %(embedding)s::halfvec",
+    "binary": "embedding_bits <~> binary_quantize(%(embedding)s::vector)",
+}
+# First-pass candidates per result before the full-precision rerank
+RERANK_MULTIPLIER = {"full": 1, "half": 2, "binary": 10}
+
+# Full-precision vector for any row: its own column, else the shared cache
+_FULL_VECTOR_JOIN = """LEFT JOIN chunk_embeddings e
+    ON e.content_hash = c.content_hash AND e.model = %(model)s"""
+_FULL_DISTANCE = "coalesce(c.embedding, e.embedding) <=> %(embedding)s::vector"
+
+# Reciprocal rank fusion constant from Cormack et al.; dampens top-rank dominance
+RRF_K = 60
+# Candidates taken from each ranking before fusion, as a multiple of top_k
+CANDIDATE_MULTIPLIER = 4
+
+# OR the query terms together: student claims rarely contain every word of a passage
+_TSQUERY = "replace(plainto_tsquery('english', %(query)s)::text, '&', '|')::tsquery"
+
+
+def _rows(cur) -> list[dict]:
+    columns = [d[0] for d in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def _first_pass_sql(storage: str, limit: str = "candidates") -> str:
+    distance = FIRST_PASS_DISTANCE[storage]
+    return f"""SELECT id, {distance} AS distance
+        FROM reading_chunks
+        WHERE assignment_id = %(assignment_id)s AND {ACTIVE_VERSION_FILTER}
+        ORDER BY {distance}
+        LIMIT %({limit})s"""
+
+
+def vector_search(
+    cur,
+    assignment_id: str,
+    embedding: list[float],
+    top_k: int,
+    storage: str = "full",
+    model: str | None = None,
+    candidates: int | None = None,
+) -> list[dict]:
+    if storage == "full":
+        cur.execute(
+            f"""SELECT source_title, chunk_text, synopsis, key_facts,
+                1 - (embedding <=> %(embedding)s::vector) as similarity
+            FROM reading_chunks
+            WHERE assignment_id = %(assignment_id)s AND {ACTIVE_VERSION_FILTER}
+            ORDER BY embedding <=> %(embedding)s::vector
+            LIMIT %(top_k)s""",
+            {"embedding": str(embedding), "assignment_id": assignment_id, "top_k": top_k},
+        )
+        return _rows(cur)
+
+    cur.execute(
+        f"""SELECT c.source_title, c.chunk_text, c.synopsis, c.key_facts,
+            1 - ({_FULL_DISTANCE}) as similarity
+        FROM ({_first_pass_sql(storage)}) candidates
+        JOIN reading_chunks c ON c.id = candidates.id
+        {_FULL_VECTOR_JOIN}""",
+        {
+            "embedding": str(embedding),
+            "assignment_id": assignment_id,
+            "model": model,
+            "candidates": candidates or top_k * RERANK_MULTIPLIER[storage],
+        },
+    )
+    return rerank(_rows(cur), top_k)
+
+
+def rerank(rows: list[dict], top_k: int) -> list[dict]:
+    """The ``top_k`` first-pass candidates with the highest full-precision similarity."""
+    # Rows with no full-precision vector (legacy, unhashed) sort last
+    return sorted(rows, key=lambda r: (r["similarity"] is None, -(r["similarity"] or 0)))[:top_k]
+
+
+def lexical_search(cur, assignment_id: str, query: str, top_k: int) -> list[dict]:
+    cur.execute(
+        f"""SELECT source_title, chunk_text, synopsis, key_facts,
+            ts_rank_cd(chunk_tsv, q.tsq) as lexical_score
+        FROM reading_chunks, (SELECT {_TSQUERY} AS tsq) q
+        WHERE assignment_id = %(assignment_id)s AND {ACTIVE_VERSION_FILTER} AND chunk_tsv @@ q.tsq
+        ORDER BY lexical_score DESC
+        LIMIT %(top_k)s""",
+        {"query": query, "assignment_id": assignment_id, "top_k": top_k},
+    )
+    return _rows(cur)
+
+
+def fuse_rankings(rows: list[dict], top_k: int) -> list[dict]:
+    """Reciprocal rank fusion of candidate rows tagged with their ``ranking`` and ``rank``.
+
+    A chunk in both rankings is returned once, scored with the sum of its
+    reciprocal ranks. Ties go to the chunk with the better single rank.
+    """
+    fused: dict = {}
+    for row in rows:
+        entry = fused.get(row["id"])
+        if entry is None:
+            entry = fused[row["id"]] = {
+                **{k: v for k, v in row.items() if k not in ("id", "ranking", "rank", "lexical_score")},
+                "lexical_score": None,
+                "score": 0.0,
+                "_best_rank": row["rank"],
+            }
+        entry["score"] += 1.0 / (RRF_K + row["rank"])
+        entry["_best_rank"] = min(entry["_best_rank"], row["rank"])
+        if row["ranking"] == "lexical":
+            entry["lexical_score"] = row["lexical_score"]
+    ranked = sorted(fused.values(), key=lambda r: (-r["score"], r["_best_rank"]))[:top_k]
+    for entry in ranked:
+        del entry["_best_rank"]
+    return ranked
+
+
+def hybrid_search(
+    cur,
+    assignment_id: str,
+    embedding: list[float],
+    query: str,
+    top_k: int,
+    storage: str = "full",
+    model: str | None = None,
+    first_pass_candidates: int | None = None,
+) -> list[dict]:
+    candidates = top_k * CANDIDATE_MULTIPLIER
+    cur.execute(
+        f"""WITH vec AS (
+            -- Ranked by full precision, as vector_search reranks, not by the first-pass distance
+            SELECT v.id, row_number() OVER (ORDER BY {_FULL_DISTANCE} NULLS LAST, v.distance) AS rank
+            FROM ({_first_pass_sql(storage, "first_pass_candidates")}) v
+            JOIN reading_chunks c ON c.id = v.id
+            {_FULL_VECTOR_JOIN}
+            ORDER BY rank
+            LIMIT %(candidates)s
+        ),
+        lex AS (
+            SELECT id, lexical_score, row_number() OVER (ORDER BY lexical_score DESC) AS rank
+            FROM (
+                SELECT id, ts_rank_cd(chunk_tsv, q.tsq) AS lexical_score
+                FROM reading_chunks, (SELECT {_TSQUERY} AS tsq) q
+                WHERE assignment_id = %(assignment_id)s AND {ACTIVE_VERSION_FILTER} AND chunk_tsv @@ q.tsq
+                ORDER BY lexical_score DESC
+                LIMIT %(candidates)s
+            ) l
+        ),
+        ranked AS (
+            SELECT id, 'vector' AS ranking, rank, NULL::real AS lexical_score FROM vec
+            UNION ALL
+            SELECT id, 'lexical', rank, lexical_score FROM lex
+        )
+        SELECT ranked.id, ranked.ranking, ranked.rank, ranked.lexical_score,
+            c.source_title, c.chunk_text, c.synopsis, c.key_facts,
+            1 - ({_FULL_DISTANCE}) as similarity
+        FROM ranked JOIN reading_chunks c ON c.id = ranked.id
+        {_FULL_VECTOR_JOIN}""",
+        {
+            "embedding": str(embedding),
+            "query": query,
+            "assignment_id": assignment_id,
+            "model": model,
+            "candidates": candidates,
+            "first_pass_candidates": first_pass_candidates or candidates * RERANK_MULTIPLIER[storage],
+        },
+    )
+    return fuse_rankings(_rows(cur), top_k)
@@ -0,0 +1,100 @@
+"""Extractive synopses of reading chunks for compact moderation prompts.
+
+A chunk is hundreds of words, but a live moderation call only needs what the
+passage argues and the specifics a student might misquote. At index time each
+chunk gets a synopsis (its most central sentences, scored Luhn-style by how
+many of the chunk's frequent content words they contain) and a short list of
+key facts (sentences carrying numbers, years, percentages or quotations).
+Both are extracted verbatim, so indexing needs no model calls and the
+moderator can still quote a reading exactly.
+"""
+import re
+from collections import Counter
+
+from chunking import split_sentences
+
+SYNOPSIS_SENTENCES = 2
+MAX_KEY_FACTS = 2
+# Sentences longer than this are clipped in synopses, facts and matches
+MAX_SENTENCE_WORDS = 40
+VIEWS = ("chunk", "synopsis")
+
+STOPWORDS = frozenset(
+    """a about above after again against all also am an and any are as at be because been before being
+    between both but by can could did do does doing down during each few for from further had has have
+    having he her here hers him his how however i if in into is it its itself just may me might more most
+    must my no nor not of off on once only or other our ours out over own same she should so some such
+    than that the their theirs them then there these they this those through thus to too under until up
+    upon very was we were what when where which while who whom why will with would yet you your""".split()
+)
+_WORD = re.compile(r"[a-z][a-z'-]+|\d[\d.,]*%?")
+# Numbers, percentages and quotations are what students misquote
+_FACT = re.compile(r"\d|%|[\"“”]")
+
+
+def content_words(text: str) -> list[str]:
+    """Lowercased non-stopwords with a crude plural strip ("tariffs" -> "tariff")."""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _clip(sentence: str) -> str:
+    words = sentence.split()
+    return sentence if len(words) <= MAX_SENTENCE_WORDS else " ".join(words[:MAX_SENTENCE_WORDS]) + " ..."
+
+
+def summarize(chunk: str) -> tuple[str, list[str]]:
+    """Return (synopsis, key facts) for one chunk."""
+    sentences = split_sentences(chunk)
+    if not sentences:
+        return "", []
+    frequency = Counter(content_words(chunk))
+
+    def centrality(i: int) -> float:
+        words = set(content_words(sentences[i]))
+        # sqrt damps the advantage of long sentences without favouring fragments
+        return sum(frequency[w] for w in words) / len(words) ** 0.5 if words else 0.0
+
+    ranked = sorted(range(len(sentences)), key=centrality, reverse=True)
+    chosen = sorted(ranked[:SYNOPSIS_SENTENCES])
+    facts = sorted(i for i in ranked if i not in chosen and _FACT.search(sentences[i]))[:MAX_KEY_FACTS]
+    return " ".join(_clip(sentences[i]) for i in chosen), [_clip(sentences[i]) for i in facts]
+
+
+def matching_sentences(chunk: str, query: str, limit: int, exclude: tuple[str, ...] = ()) -> list[str]:
+    """The ``limit`` sentences sharing the most content words with ``query``, in reading order."""
+    query_words = set(content_words(query))
+    if limit <= 0 or not query_words:
+        return []
+    scored = []
+    for i, sentence in enumerate(split_sentences(chunk)):
+        overlap = len(query_words & set(content_words(sentence)))
+        clipped = _clip(sentence)
+        if overlap and not any(clipped in text for text in exclude):
+            scored.append((overlap, i, clipped))
+    best = sorted(scored, key=lambda s: (-s[0], s[1]))[:limit]
+    return [sentence for _, _, sentence in sorted(best, key=lambda s: s[1])]
+
+
+def synopsis_view(row: dict, query: str, matching: int = 0) -> dict:
+    """Replace a search result's chunk text with its synopsis and key facts.
+
+    Rows indexed before synopses existed are summarized on the fly. With
+    ``matching`` the result also carries the sentences that best match the
+    query, skipping any already quoted in the synopsis or facts.
+    """
+    row = dict(row)
+    chunk = row.pop("chunk_text")
+    if row.get("synopsis") is None:
+        row["synopsis"], row["key_facts"] = summarize(chunk)
+    if matching:
+        row["matching_sentences"] = matching_sentences(
+            chunk, query, matching, exclude=(row["synopsis"], *row["key_facts"])
+        )
+    return row
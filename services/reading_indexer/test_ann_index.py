@@ -0,0 +1,151 @@
+"""Tests for ANN index naming, builds and search parameter handling."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2 import sql
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from ann_index import GLOBAL_INDEX, apply_search_params, build_index, default_lists, drop_index, index_name
+
+ASSIGNMENT_ID = "0b7c6f1e-3a44-4b8e-9d0c-2f1e5a6b7c8d"
+
+
+def _text(statement) -> str:
+    """Render a psycopg2 sql object without a live connection."""
+    if isinstance(statement, sql.Composed):
+        return "".join(_text(part) for part in statement.seq)
+    if isinstance(statement, sql.SQL):
+        return statement.string
+    if isinstance(statement, sql.Identifier):
+        return ".".join(f'"{s}"' for s in statement.strings)
+    if isinstance(statement, sql.Literal):
+        return repr(statement.wrapped)
+    return statement
+
+
+def _conn(fetched: list):
+    """A connection whose cursor records each statement with the autocommit mode it ran under."""
+    conn = MagicMock()
+    conn.autocommit = False
+    executed = []
+    cur = conn.cursor.return_value
+    cur.execute.side_effect = lambda statement, *args: executed.append((_text(statement), conn.autocommit))
+    cur.fetchone.side_effect = fetched
+    return conn, executed
+
+
+def test_index_name_global_matches_schema():
+    assert index_name("hnsw") == GLOBAL_INDEX
+    assert index_name("ivfflat") == "reading_chunks_embedding_ivfflat_idx"
+
+
+def test_index_name_partial_fits_identifier_limit():
+    name = index_name("ivfflat", "0b7c6f1e-3a44-4b8e-9d0c-2f1e5a6b7c8d")
+    assert name == "rc_ivfflat_0b7c6f1e3a444b8e9d0c2f1e5a6b7c8d_idx"
+    assert len(f"{name}_new") <= 63
+
+
+def test_index_name_rejects_bad_input():
+    with pytest.raises(ValueError):
+        index_name("btree")
+    with pytest.raises(ValueError):
+        index_name("hnsw", "not-a-uuid")
+
+
+def test_default_lists():
+    assert default_lists(0) == 1
+    assert default_lists(50_000) == 50
+    assert default_lists(4_000_000) == 2000
+
+
+def test_apply_search_params_sets_transaction_local_values():
+    cur = MagicMock()
+    apply_search_params(cur, ef_search=100, probes=10, exact=True)
+    calls = [c.args[1] for c in cur.execute.call_args_list]
+    assert calls == [
+        ("hnsw.ef_search", "100"),
+        ("ivfflat.probes", "10"),
+        ("enable_indexscan", "off"),
+    ]
+
+
+def test_apply_search_params_noop_by_default():
+    cur = MagicMock()
+    apply_search_params(cur)
+    cur.execute.assert_not_called()
+
+
+def test_index_name_for_compressed_storage():
+    assert index_name("hnsw", storage="half") == "reading_chunks_embedding_half_hnsw_idx"
+    name = index_name("ivfflat", "0b7c6f1e-3a44-4b8e-9d0c-2f1e5a6b7c8d", storage="binary")
+    assert name == "rc_ivfflat_binary_0b7c6f1e3a444b8e9d0c2f1e5a6b7c8d_idx"
+    assert len(f"{name}_new") <= 63
+    with pytest.raises(ValueError):
+        index_name("hnsw", storage="int4")
+
+
+def test_build_index_runs_concurrently_outside_a_transaction():
+    conn, executed = _conn([None, (5000,)])
+    result = build_index(conn, "ivfflat", ASSIGNMENT_ID)
+
+    name = index_name("ivfflat", ASSIGNMENT_ID)
+    assert result["created"] is True and result["rebuilt"] is False
+    assert result["params"] == {"lists": 5}
+    creates = [(text, autocommit) for text, autocommit in executed if text.startswith("CREATE INDEX")]
+    assert creates == [(
+        f'CREATE INDEX CONCURRENTLY "{name}" ON "reading_chunks" USING ivfflat '
+        f"(\"embedding\" vector_cosine_ops) WITH (lists = 5) WHERE assignment_id = '{ASSIGNMENT_ID}'",
+        True,
+    )]
+    assert all(autocommit for _, autocommit in executed)
+    # The caller's transaction mode is restored
+    assert conn.autocommit is False
+    conn.cursor.return_value.close.assert_called_once()
+
+
+def test_build_index_leaves_an_existing_index_alone():
+    conn, executed = _conn([(1,)])
+    assert build_index(conn, "hnsw")["created"] is False
+    assert [text for text, _ in executed if not text.startswith("SELECT")] == []
+    assert conn.autocommit is False
+
+
+def test_rebuild_swaps_in_a_new_index_under_the_old_name():
+    conn, executed = _conn([(1,), (5000,)])
+    result = build_index(conn, "hnsw", ASSIGNMENT_ID, rebuild=True)
+
+    name = index_name("hnsw", ASSIGNMENT_ID)
+    assert result["rebuilt"] is True
+    statements = [text for text, _ in executed if not text.startswith("SELECT")]
+    assert statements[0] == f'DROP INDEX CONCURRENTLY IF EXISTS "{name}_new"'
+    assert statements[1].startswith(f'CREATE INDEX CONCURRENTLY "{name}_new" ')
+    assert statements[2:] == [
+        f'DROP INDEX CONCURRENTLY "{name}"',
+        f'ALTER INDEX "{name}_new" RENAME TO "{name}"',
+    ]
+    assert all(autocommit for _, autocommit in executed)
+    assert conn.autocommit is False
+
+
+def test_failed_build_restores_autocommit():
+    conn, _ = _conn([None, (5000,)])
+    conn.cursor.return_value.execute.side_effect = [None, None, None, RuntimeError("out of memory")]
+    with pytest.raises(RuntimeError):
+        build_index(conn, "hnsw")
+    assert conn.autocommit is False
+
+
+def test_drop_index_runs_concurrently_and_only_for_ann_indexes():
+    conn, executed = _conn([])
+    status = {"indexes": [{"name": GLOBAL_INDEX}]}
+    with patch("ann_index.index_status", return_value=status):
+        assert drop_index(conn, "reading_chunks_pkey") is False
+        assert executed == []
+        assert drop_index(conn, GLOBAL_INDEX) is True
+
+    assert executed == [(f'DROP INDEX CONCURRENTLY IF EXISTS "{GLOBAL_INDEX}"', True)]
+    assert conn.autocommit is False
@@ -0,0 +1,76 @@
+"""Tests for pooled bulk indexing."""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+from bulk import new_bulk_progress, run_bulk_index, threads_per_worker
+from chunking import chunk_document
+from chunk_store import content_hash
+
+
+def test_only_uncached_chunks_go_to_the_pool_and_each_once():
+    readings = [
+        {"source_title": "Autor 2013", "text": "shared passage"},
+        {"source_title": "Autor 2013 (copy)", "text": "shared passage"},
+        {"source_title": "Dorn", "text": "already cached"},
+    ]
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    # uncached lookup, then each ChunkSync: existing rows, cached vectors
+    cur.fetchall.side_effect = [
+        [(content_hash("already cached"),)],
+        [], [(content_hash("shared passage"), "[1.0]")],
+        [], [(content_hash("shared passage"), "[1.0]")],
+        [], [(content_hash("already cached"), "[2.0]")],
+    ]
+    worker = MagicMock()
+    worker.encode.side_effect = lambda texts: np.ones((len(texts), 1))
+    embed = MagicMock()
+    progress = new_bulk_progress("a1", len(readings), workers=2)
+
+    with patch("bulk._worker_embedder", worker), patch("chunk_store.execute_values") as ev, \
+            ThreadPoolExecutor(2) as pool:
+        results = run_bulk_index(conn, "a1", readings, progress, chunk_document, "m", embed, pool)
+
+    worker.encode.assert_called_once_with(["shared passage"])
+    embed.assert_not_called()
+    cached = ev.call_args_list[0].args[2]
+    assert cached == [(content_hash("shared passage"), "m", "[1.0]")]
+    assert set(results) == {"Autor 2013", "Autor 2013 (copy)", "Dorn"}
+    assert progress["status"] == "indexed"
+    assert progress["to_embed"] == progress["embedded"] == 1
+    assert progress["readings_done"] == 3
+
+
+def test_threads_are_split_across_workers():
+    with patch("bulk.os.cpu_count", return_value=8):
+        assert threads_per_worker(4) == 2
+        assert threads_per_worker(16) == 1
+
+
+def test_bulk_request_with_duplicate_titles_is_rejected():
+    readings = [{"source_title": t, "text": "x"} for t in ("Autor", "Dorn", "Autor")]
+    with patch("main.run_bulk_job") as run:
+        response = TestClient(main.app).post("/index/bulk", json={"assignment_id": "a1", "readings": readings})
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Duplicate source_title: Autor"
+    run.assert_not_called()
+
+
+def test_bulk_workers_are_capped():
+    readings = [{"source_title": "Autor", "text": "x"}]
+    with patch("main.run_bulk_job") as run, patch("main.MAX_WORKERS", 4):
+        response = TestClient(main.app).post(
+            "/index/bulk", json={"assignment_id": "a1", "readings": readings, "workers": 500}
+        )
+    assert response.status_code == 202
+    assert response.json()["workers"] == 4
+    assert run.call_args.args[2] == 4
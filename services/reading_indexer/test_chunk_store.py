@@ -0,0 +1,139 @@
+"""Tests for content-addressed chunk sync."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2 import sql
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from chunk_store import content_hash, convert_storage, sync_chunks
+
+
+def _conn(existing_rows, cached_rows=()):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchall.side_effect = [list(existing_rows), list(cached_rows)]
+    return conn, cur
+
+
+def test_reindex_embeds_only_changed_chunks():
+    conn, cur = _conn([("row-1", content_hash("kept")), ("row-2", content_hash("old"))])
+    embed = MagicMock(return_value=[[0.1, 0.2]])
+
+    with patch("chunk_store.execute_values") as ev:
+        result = sync_chunks(conn, "a1", "Reading", ["kept", "new"], "m", embed)
+
+    embed.assert_called_once_with(["new"])
+    assert result["added"] == 1
+    assert result["removed"] == 1
+    assert result["unchanged"] == 1
+    assert result["embedded"] == 1
+    cur.execute.assert_any_call("DELETE FROM reading_chunks WHERE id = ANY(%s::uuid[])", (["row-2"],))
+    inserted = ev.call_args_list[-1].args[2]
+    assert inserted == [("a1", None, "Reading", "new", content_hash("new"), "new", "[]", *[None] * 5, "[0.1, 0.2]")]
+    conn.commit.assert_called_once()
+
+
+def test_cached_embedding_is_shared_across_assignments():
+    conn, _ = _conn([], [(content_hash("shared"), "[0.5, 0.5]")])
+    embed = MagicMock()
+
+    with patch("chunk_store.execute_values"):
+        result = sync_chunks(conn, "a2", "Reading", ["shared"], "m", embed)
+
+    embed.assert_not_called()
+    assert result["added"] == 1
+    assert result["embedded"] == 0
+
+
+def test_duplicate_chunks_in_one_reading_are_stored_once():
+    conn, _ = _conn([])
+    embed = MagicMock(return_value=[[0.0]])
+
+    with patch("chunk_store.execute_values"):
+        result = sync_chunks(conn, "a1", "Reading", ["same", "same"], "m", embed)
+
+    assert result["indexed_chunks"] == 1
+    assert result["duplicates_skipped"] == 1
+
+
+def test_unhashed_legacy_rows_are_replaced():
+    conn, cur = _conn([("legacy", None)])
+
+    with patch("chunk_store.execute_values"):
+        result = sync_chunks(conn, "a1", "Reading", ["text"], "m", MagicMock(return_value=[[0.0]]))
+
+    assert result["removed"] == 1
+
+
+def test_chunk_positions_are_stored_and_refreshed_when_text_moves():
+    conn, _ = _conn([("row-1", content_hash("kept"))])
+    embed = MagicMock(return_value=[[0.3]])
+    chunks = [
+        {"text": "new", "page_start": 1, "page_end": 1, "char_start": 0, "char_end": 3, "token_count": 1},
+        {"text": "kept", "page_start": 1, "page_end": 2, "char_start": 4, "char_end": 8, "token_count": 1},
+    ]
+
+    with patch("chunk_store.execute_values") as ev:
+        sync_chunks(conn, "a1", "Reading", chunks, "m", embed)
+
+    moved, inserted = ev.call_args_list[0].args[2], ev.call_args_list[-1].args[2]
+    assert moved == [("row-1", 1, 2, 4, 8, 1)]
+    assert inserted[0][7:12] == (1, 1, 0, 3, 1)
+
+
+@pytest.mark.parametrize("storage, column, cast", [
+    ("full", "embedding", "%s::vector"),
+    ("half", "embedding_half", "%s::halfvec"),
+    ("binary", "embedding_bits", "binary_quantize(%s::vector)"),
+])
+def test_each_storage_mode_writes_its_own_column(storage, column, cast):
+    conn, _ = _conn([])
+    embed = MagicMock(return_value=[[0.25, -0.5]])
+
+    with patch("chunk_store.execute_values") as ev:
+        sync_chunks(conn, "a1", "Reading", ["text"], "m", embed, storage=storage)
+
+    cached, inserted = ev.call_args_list
+    # The full-precision vector always goes to the shared cache for reranking
+    assert cached.args[2] == [(content_hash("text"), "m", "[0.25, -0.5]")]
+    insert_sql, rows = inserted.args[1], inserted.args[2]
+    assert f"token_count, {column})" in insert_sql
+    assert inserted.kwargs["template"].endswith(f"{cast})")
+    assert rows[0][-1] == "[0.25, -0.5]"
+
+
+def _render(query) -> str:
+    if isinstance(query, sql.Composed):
+        return "".join(_render(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return ".".join(query.strings)
+    return query.string
+
+
+@pytest.mark.parametrize("storage, assignments", [
+    ("full", "embedding = e.embedding, embedding_half = NULL, embedding_bits = NULL"),
+    ("half", "embedding = NULL, embedding_half = e.embedding::halfvec, embedding_bits = NULL"),
+    ("binary", "embedding = NULL, embedding_half = NULL, embedding_bits = binary_quantize(e.embedding)"),
+])
+def test_convert_storage_backfills_the_cache_then_rewrites_every_column(storage, assignments):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.rowcount = 12
+
+    assert convert_storage(conn, "a1", storage, "m") == 12
+
+    backfill, rewrite = cur.execute.call_args_list
+    assert backfill.args[0].startswith("INSERT INTO chunk_embeddings")
+    assert backfill.args[1] == ("m", "a1")
+    assert f"SET {assignments}" in _render(rewrite.args[0])
+    assert rewrite.args[1] == ("m", "a1")
+    conn.commit.assert_called_once()
+
+
+def test_convert_storage_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        convert_storage(MagicMock(), "a1", "int8", "m")
@@ -0,0 +1,61 @@
+"""Tests for sentence-aware, token-budgeted chunking."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from chunking import SentenceChunker, chunk_document, split_sentences
+
+
+def _paragraph(p: int, sentences: int) -> str:
+    return " ".join(f"Paragraph {p} sentence {s} makes one more claim." for s in range(sentences))
+
+
+def test_sentences_keep_abbreviations_and_initials():
+    text = "See e.g. Table 2 in J. Smith (1776). It found 48,000 pins a day! Was it true? Yes."
+    assert split_sentences(text) == [
+        "See e.g. Table 2 in J. Smith (1776).",
+        "It found 48,000 pins a day!",
+        "Was it true?",
+        "Yes.",
+    ]
+
+
+def test_chunks_stay_within_budget_and_end_on_sentences():
+    text = _paragraph(0, 200)
+    chunks = chunk_document(text, max_tokens=100)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["token_count"] <= 100
+        assert chunk["text"].endswith("claim.")
+        assert text[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
+    # Consecutive chunks within a paragraph overlap by a sentence
+    assert chunks[1]["char_start"] < chunks[0]["char_end"]
+
+
+def test_paragraph_break_starts_a_chunk_once_half_full():
+    text = _paragraph(0, 6) + "\n\n" + _paragraph(1, 6)
+    chunks = chunk_document(text, max_tokens=120)
+
+    assert [c["text"].split()[1] for c in chunks] == ["0", "1"]
+    assert chunks[1]["char_start"] == text.index("Paragraph 1")
+
+
+def test_overlong_sentence_is_split_at_words():
+    chunks = chunk_document("word " * 500, max_tokens=100)
+    assert all(c["token_count"] <= 100 for c in chunks)
+    assert sum(len(c["text"].split()) for c in chunks) == 500
+
+
+def test_pages_are_recorded():
+    chunker = SentenceChunker(max_tokens=60)
+    chunks = []
+    for page in (1, 2, 3):
+        chunks.extend(chunker.feed(_paragraph(page, 5) + "\n", page=page))
+    chunks.extend(chunker.finish())
+
+    assert chunks[0]["page_start"] == 1
+    assert chunks[-1]["page_end"] == 3
+    assert any(c["page_start"] != c["page_end"] for c in chunks)
@@ -0,0 +1,53 @@
+"""Tests for streaming ingestion."""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from chunking import chunk_document
+from ingest import BatchIngest, format_from_content_type, iter_stream_text, new_progress
+
+
+async def _pieces(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.mark.asyncio
+async def test_stream_text_never_splits_characters():
+    text = "Autor, Dorn and Hanson — élasticité 0.6. " * 50
+    progress = new_progress("a1", "Reading", "text")
+
+    pieces = [piece async for piece in iter_stream_text(_pieces(text.encode(), 7), progress)]
+
+    assert "".join(pieces) == text
+    assert progress["bytes_received"] == len(text.encode())
+
+
+def test_batched_ingest_matches_chunking_the_whole_text():
+    text = "\n\n".join(
+        " ".join(f"Sentence {p}.{s} has several words in it." for s in range(30)) for p in range(20)
+    )
+    sync = MagicMock(stats={})
+    sync.finish.return_value = {"indexed_chunks": 0}
+    progress = new_progress("a1", "Reading", "text")
+    ingest = BatchIngest(sync, progress, batch_size=2)
+
+    for i in range(0, len(text), 100):
+        ingest.feed(text[i:i + 100])
+    ingest.finish()
+
+    batches = [c.args[0] for c in sync.add.call_args_list]
+    assert all(len(b) <= 2 for b in batches)
+    assert [c for b in batches for c in b] == chunk_document(text)
+    assert progress["status"] == "done"
+
+
+def test_format_from_content_type():
+    assert format_from_content_type("application/pdf") == "pdf"
+    assert format_from_content_type("text/plain; charset=utf-8") == "text"
+    assert format_from_content_type("image/png") is None
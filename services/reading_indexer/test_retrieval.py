@@ -0,0 +1,134 @@
+"""Tests for search SQL and hybrid rank fusion."""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from retrieval import (
+    CANDIDATE_MULTIPLIER,
+    FIRST_PASS_DISTANCE,
+    RERANK_MULTIPLIER,
+    RRF_K,
+    fuse_rankings,
+    hybrid_search,
+    lexical_search,
+    vector_search,
+)
+
+COLUMNS = ("id", "ranking", "rank", "lexical_score", "source_title", "chunk_text", "synopsis", "key_facts", "similarity")
+
+
+def _candidate(chunk_id, ranking, rank, lexical_score=None, similarity=0.5):
+    return (chunk_id, ranking, rank, lexical_score, "Reading", f"text {chunk_id}", "", [], similarity)
+
+
+def _cursor(rows):
+    cur = MagicMock(description=[(c,) for c in COLUMNS])
+    cur.fetchall.return_value = rows
+    return cur
+
+
+def test_hybrid_fuses_both_rankings_by_reciprocal_rank():
+    cur = _cursor([
+        _candidate("a", "vector", 1),
+        _candidate("b", "vector", 2),
+        _candidate("c", "vector", 3),
+        _candidate("c", "lexical", 1, lexical_score=0.9),
+        _candidate("d", "lexical", 2, lexical_score=0.4),
+    ])
+    results = hybrid_search(cur, "a1", [0.1], "tariffs", 3)
+
+    # c is in both rankings, so it beats the top of either one alone
+    assert [r["chunk_text"] for r in results] == ["text c", "text a", "text b"]
+    assert results[0]["score"] == 1 / (RRF_K + 3) + 1 / (RRF_K + 1)
+    assert results[1]["score"] == 1 / (RRF_K + 1)
+
+
+def test_chunks_found_by_both_searches_are_returned_once():
+    rows = [dict(zip(COLUMNS, r)) for r in (
+        _candidate("a", "vector", 1),
+        _candidate("a", "lexical", 2, lexical_score=0.7),
+        _candidate("b", "lexical", 1, lexical_score=0.8),
+    )]
+    results = fuse_rankings(rows, 10)
+    assert [r["chunk_text"] for r in results] == ["text a", "text b"]
+    assert results[0]["lexical_score"] == 0.7
+    assert "id" not in results[0] and "rank" not in results[0]
+
+
+def test_fusion_ties_go_to_the_better_single_rank():
+    rows = [dict(zip(COLUMNS, r)) for r in (
+        _candidate("x", "vector", 2),
+        _candidate("y", "lexical", 2, lexical_score=0.5),
+        _candidate("z", "lexical", 1, lexical_score=0.6),
+    )]
+    results = fuse_rankings(rows, 2)
+    assert [r["chunk_text"] for r in results] == ["text z", "text x"]
+    assert results[1]["lexical_score"] is None
+
+
+@pytest.mark.parametrize("storage, first_pass", [
+    ("half", "embedding_half <=> %(embedding)s::halfvec"),
+    ("binary", "embedding_bits <~> binary_quantize(%(embedding)s::vector)"),
+])
+def test_compressed_search_over_fetches_on_its_own_column(storage, first_pass):
+    cur = MagicMock(description=[("similarity",)])
+    cur.fetchall.return_value = []
+    vector_search(cur, "a1", [0.1, 0.2], 5, storage=storage, model="m")
+    vector_search(cur, "a1", [0.1, 0.2], 5, storage=storage, model="m", candidates=80)
+
+    (default_sql, default_params), (_, override_params) = [c.args for c in cur.execute.call_args_list]
+    assert f"ORDER BY {first_pass}" in default_sql
+    # Reranked with the full-precision vector: the row's own, else the shared cache
+    assert "coalesce(c.embedding, e.embedding) <=> %(embedding)s::vector" in default_sql
+    assert "e.model = %(model)s" in default_sql
+    assert default_params["candidates"] == 5 * RERANK_MULTIPLIER[storage]
+    assert default_params["model"] == "m" and default_params["embedding"] == "[0.1, 0.2]"
+    assert override_params["candidates"] == 80
+
+
+@pytest.mark.parametrize("storage", ["full", "half", "binary"])
+def test_hybrid_ranks_vector_candidates_by_full_precision(storage):
+    cur = _cursor([])
+    hybrid_search(cur, "a1", [0.1], "tariffs", 5, storage=storage, model="m")
+    hybrid_search(cur, "a1", [0.1], "tariffs", 5, storage=storage, model="m", first_pass_candidates=80)
+
+    (sql, params), (_, override_params) = [c.args for c in cur.execute.call_args_list]
+    vec = sql[:sql.index("lex AS")]
+    assert f"ORDER BY {FIRST_PASS_DISTANCE[storage]}" in vec
+    assert "row_number() OVER (ORDER BY coalesce(c.embedding, e.embedding) <=> %(embedding)s::vector" in vec
+    assert "LIMIT %(first_pass_candidates)s" in vec and "LIMIT %(candidates)s" in vec
+    assert params["candidates"] == 5 * CANDIDATE_MULTIPLIER
+    assert params["first_pass_candidates"] == 5 * CANDIDATE_MULTIPLIER * RERANK_MULTIPLIER[storage]
+    assert override_params["first_pass_candidates"] == 80
+
+
+def test_binary_candidates_are_reranked_by_full_precision_similarity():
+    # First-pass (Hamming) order: a, b, c, d; full precision disagrees
+    cur = MagicMock(description=[("chunk_text",), ("similarity",)])
+    cur.fetchall.return_value = [("a", 0.41), ("b", 0.93), ("c", None), ("d", 0.67)]
+    results = vector_search(cur, "a1", [0.1], 3, storage="binary", model="m")
+    assert [(r["chunk_text"], r["similarity"]) for r in results] == [("b", 0.93), ("d", 0.67), ("a", 0.41)]
+
+
+def test_full_storage_searches_the_vector_column_directly():
+    cur = MagicMock(description=[])
+    cur.fetchall.return_value = []
+    vector_search(cur, "a1", [0.1], 4)
+    sql, params = cur.execute.call_args.args
+    assert "ORDER BY embedding <=> %(embedding)s::vector" in sql and "chunk_embeddings" not in sql
+    assert params["top_k"] == 4
+
+
+def test_lexical_query_terms_are_ored_together():
+    cur = _cursor([])
+    lexical_search(cur, "a1", "Autor Dorn Hanson 2013", 5)
+    hybrid_search(cur, "a1", [0.1], "Autor Dorn Hanson 2013", 5)
+    for call in cur.execute.call_args_list:
+        sql, params = call.args
+        assert "replace(plainto_tsquery('english', %(query)s)::text, '&', '|')::tsquery" in sql
+        assert params["query"] == "Autor Dorn Hanson 2013"
@@ -0,0 +1,45 @@
+"""Tests for extractive chunk synopses."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from chunking import split_sentences
+from synopsis import matching_sentences, summarize, synopsis_view
+
+PASSAGE = (
+    "Trade with China reshaped American manufacturing. "
+    "Autor, Dorn and Hanson (2013) estimate that rising import competition explains 21% of the decline in manufacturing employment. "
+    "Local labor markets exposed to imports saw lower wages. "
+    "The weather in Boston was pleasant that spring. "
+    "Import competition from China also raised unemployment and disability claims in exposed local labor markets."
+)
+
+
+
+
+def test_synopsis_picks_central_sentences_and_numeric_facts():
+    synopsis, facts = summarize(PASSAGE)
+
+    assert "weather" not in synopsis
+    assert len(split_sentences(synopsis)) == 2
+    assert all(fact not in synopsis for fact in facts)
+    assert any("21%" in s for s in [synopsis, *facts])
+
+
+def test_matching_sentences_follow_the_query_in_reading_order():
+    matches = matching_sentences(PASSAGE, "What did the weather in Boston look like?", 1)
+    assert matches == ["The weather in Boston was pleasant that spring."]
+    assert matching_sentences(PASSAGE, "the and of", 2) == []
+
+
+def test_synopsis_view_summarizes_legacy_rows_and_drops_chunk_text():
+    row = {"source_title": "ADH", "chunk_text": PASSAGE, "synopsis": None, "key_facts": None, "similarity": 0.8}
+
+    result = synopsis_view(row, "weather in Boston", matching=2)
+
+    assert "chunk_text" not in result
+    assert result["synopsis"]
+    assert "The weather in Boston was pleasant that spring." in result["matching_sentences"]
+    assert all(s not in result["synopsis"] for s in result["matching_sentences"])
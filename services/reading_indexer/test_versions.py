@@ -0,0 +1,165 @@
+"""Tests for versioned reading indexes."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import main
+from retrieval import hybrid_search, lexical_search, vector_search
+from versions import ACTIVE_VERSION_FILTER, activate_version, stage_version, validate_version
+
+BUILDING = {"id": "v2", "assignment_id": "a1", "version": 2, "status": "building"}
+
+
+def _conn(*fetchone):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.side_effect = list(fetchone)
+    return conn
+
+
+@pytest.mark.parametrize("counts, error", [((0, 0, 0), "no chunks"), ((10, 2, 3), "3 chunks have no embedding")])
+def test_unfit_versions_are_not_activated(counts, error):
+    conn = _conn(counts, (8, 2))
+    with patch("versions.get_version", return_value=BUILDING), pytest.raises(ValueError, match=error):
+        activate_version(conn, "v2")
+    conn.commit.assert_not_called()
+
+
+def test_validation_reports_active_version_for_comparison():
+    conn = _conn((12, 3, 0), (10, 2))
+    with patch("versions.get_version", return_value=BUILDING):
+        report = validate_version(conn, "v2")
+    assert report == {"chunks": 12, "sources": 3, "active_chunks": 10, "active_sources": 2}
+
+
+def test_activation_swaps_in_one_transaction():
+    conn = _conn((12, 3, 0), (10, 2))
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = [("v1",)]
+    cur.rowcount = 1
+
+    with patch("versions.get_version", return_value=BUILDING):
+        result = activate_version(conn, "v2")
+
+    assert result["retired"] == ["v1"]
+    conn.commit.assert_called_once()
+    conn.rollback.assert_called_once()  # only the read-only validation transaction
+
+
+def test_activation_fails_if_another_version_went_live_meanwhile():
+    conn = _conn((12, 3, 0), (10, 2))
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = [("v3",)]
+    cur.rowcount = 1
+
+    with patch("versions.get_version", return_value=BUILDING), pytest.raises(ValueError, match="Another version"):
+        activate_version(conn, "v2", replaces="v1")
+    conn.commit.assert_not_called()
+
+
+def test_staged_version_copies_the_active_chunks():
+    conn = _conn(("v1",))
+    cur = conn.cursor.return_value
+
+    with patch("versions.create_version", return_value={"id": "v2", "assignment_id": "a1"}):
+        version = stage_version(conn, "a1")
+
+    assert version["replaces"] == "v1"
+    sql, params = cur.execute.call_args.args
+    assert sql.startswith("INSERT INTO reading_chunks (version_id, assignment_id")
+    assert "version_id IS NOT DISTINCT FROM %(replaces)s" in sql
+    assert params == {"version_id": "v2", "assignment_id": "a1", "replaces": "v1"}
+    conn.commit.assert_called_once()
+
+
+def _stream(activate):
+    sync = MagicMock(stats={})
+    sync.finish.return_value = {"added": 2, "removed": 1}
+    with patch("main.get_db") as get_db, patch("main.embedder"), patch("main.active_version", return_value="v1"), \
+            patch("main.stage_version", return_value={"id": "v2", "replaces": "v1"}), \
+            patch("main.ChunkSync", return_value=sync) as chunk_sync, \
+            patch("main.activate_version", side_effect=activate) as activation, \
+            patch("main.discard_version") as discard, patch("main.run_garbage_collection") as collect:
+        response = TestClient(main.app).post(
+            "/index/stream?assignment_id=a1&source_title=Autor&job_id=j1",
+            content=b"Trade with China cost jobs.",
+            headers={"content-type": "text/plain"},
+        )
+    assert chunk_sync.call_args.kwargs["version_id"] == "v2"
+    activation.assert_called_once_with(get_db.return_value, "v2", "v1")
+    return response, discard, collect
+
+
+def test_streamed_reading_replaces_the_live_one_only_on_activation():
+    response, discard, collect = _stream(lambda conn, version_id, replaces: {"retired": ["v1"]})
+    assert response.status_code == 200
+    assert response.json()["activation"] == {"retired": ["v1"]}
+    assert main.ingest_jobs["j1"]["status"] == "done"
+    discard.assert_not_called()
+    collect.assert_called_once_with("a1")
+
+
+def test_failed_stream_leaves_the_live_version_untouched():
+    def fail(conn, version_id, replaces):
+        raise ValueError("Another version was activated while this one was building")
+
+    response, discard, collect = _stream(fail)
+    assert response.status_code == 500
+    assert main.ingest_jobs["j1"]["status"] == "error"
+    assert discard.call_args.args[1] == "v2"
+    collect.assert_not_called()
+
+
+def test_every_search_is_restricted_to_the_active_version():
+    cur = MagicMock(description=[])
+    cur.fetchall.return_value = []
+    vector_search(cur, "a1", [0.1], 3)
+    vector_search(cur, "a1", [0.1], 3, storage="binary", model="m")
+    lexical_search(cur, "a1", "tariffs", 3)
+    hybrid_search(cur, "a1", [0.1], "tariffs", 3)
+    for call in cur.execute.call_args_list:
+        assert ACTIVE_VERSION_FILTER in call.args[0]
+
+
+def _run_bulk_job(activate):
+    request = main.BulkIndexRequest(assignment_id="a1", readings=[{"source_title": "R", "text": "t"}], new_version=True)
+    progress = main.new_bulk_progress("a1", 1, workers=1)
+    statuses = []
+
+    def index(*args, **kwargs):
+        progress["status"] = "indexed"
+        return {}
+
+    def activation(conn, version_id):
+        statuses.append(progress["status"])
+        return activate(version_id)
+
+    with patch("main.get_db"), patch("main.embedding_pool"), patch("main.run_bulk_index", side_effect=index), \
+            patch("main.create_version", return_value={"id": "v2"}), \
+            patch("main.activate_version", side_effect=activation), \
+            patch("main.discard_version") as discard, patch("main.run_garbage_collection"):
+        main.run_bulk_job(request, progress, 1, "full")
+    return progress, statuses, discard
+
+
+def test_bulk_job_is_done_only_once_the_new_version_is_active():
+    progress, statuses, discard = _run_bulk_job(lambda version_id: {"retired": ["v1"]})
+    assert statuses == ["activating"]
+    assert progress["status"] == "done"
+    assert progress["activation"] == {"retired": ["v1"]}
+    discard.assert_not_called()
+
+
+def test_bulk_job_reports_a_failed_activation():
+    def fail(version_id):
+        raise ValueError("3 chunks have no embedding")
+
+    progress, _, discard = _run_bulk_job(fail)
+    assert progress["status"] == "error"
+    assert progress["error"] == "Activation of the new index version failed: 3 chunks have no embedding"
+    discard.assert_called_once()
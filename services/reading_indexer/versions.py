@@ -0,0 +1,284 @@
+"""Versioned reading indexes for zero-downtime re-indexing.
+
+Every reading_chunks row belongs to an index version of its assignment
+(``version_id``; NULL for rows indexed before versions existed). Searches
+only see the assignment's ``active`` version, resolved inside the same SQL
+statement, so each query reads one consistent set of chunks.
+
+A rebuild indexes into a new ``building`` version alongside the active one.
+Unchanged text is not re-embedded (vectors come from the shared cache).
+A single reading is replaced the same way: ``stage_version`` copies the
+active version's chunks into a new building version, the reading is
+synced into the copy, and the copy is activated (only if the version it
+copied is still the active one).
+Activation validates the new version, then flips the two status rows in one
+short transaction; searches never wait on the rebuild's inserts. Superseded
+versions are ``retired`` and their chunks deleted in small batches by
+``collect_garbage``.
+"""
+VERSION_STATUSES = ("building", "active", "retired", "failed")
+GC_BATCH_SIZE = 5000
+# Columns stage_version copies (id and version_id are new; chunk_tsv is generated)
+CHUNK_COLUMNS = (
+    "assignment_id", "source_title", "chunk_text", "content_hash", "embedding", "embedding_half", "embedding_bits",
+    "synopsis", "key_facts", "page_start", "page_end", "char_start", "char_end", "token_count", "created_at",
+)
+# activate_version's default: replace whichever version is active
+ANY_VERSION = object()
+
+# Restricts a reading_chunks query to the assignment's active version
+# (legacy NULL-version rows while the assignment has none)
+ACTIVE_VERSION_FILTER = """version_id IS NOT DISTINCT FROM (
+    SELECT id FROM reading_index_versions
+    WHERE assignment_id = %(assignment_id)s AND status = 'active'
+)"""
+
+
+def _row(cur) -> dict | None:
+    row = cur.fetchone()
+    return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+
+def active_version(conn, assignment_id: str) -> str | None:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id FROM reading_index_versions WHERE assignment_id = %s AND status = 'active'",
+            (assignment_id,),
+        )
+        row = cur.fetchone()
+        return str(row[0]) if row else None
+    finally:
+        cur.close()
+
+
+def create_version(conn, assignment_id: str) -> dict:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """INSERT INTO reading_index_versions (assignment_id, version, status)
+            SELECT %(assignment_id)s, coalesce(max(version), 0) + 1, 'building'
+            FROM reading_index_versions WHERE assignment_id = %(assignment_id)s
+            RETURNING id::text, assignment_id::text, version, status""",
+            {"assignment_id": assignment_id},
+        )
+        version = _row(cur)
+        conn.commit()
+        return version
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def stage_version(conn, assignment_id: str) -> dict:
+    """Create a building version holding a copy of the active version's chunks.
+
+    Returns the new version, with the id of the version it copied as
+    ``replaces`` (None for an assignment without versions).
+    """
+    version = create_version(conn, assignment_id)
+    columns = ", ".join(CHUNK_COLUMNS)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT id::text FROM reading_index_versions WHERE assignment_id = %s AND status = 'active' FOR SHARE",
+            (assignment_id,),
+        )
+        row = cur.fetchone()
+        version["replaces"] = row[0] if row else None
+        cur.execute(
+            f"""INSERT INTO reading_chunks (version_id, {columns})
+            SELECT %(version_id)s, {columns} FROM reading_chunks
+            WHERE assignment_id = %(assignment_id)s AND version_id IS NOT DISTINCT FROM %(replaces)s""",
+            {"version_id": version["id"], "assignment_id": assignment_id, "replaces": version["replaces"]},
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        discard_version(conn, version["id"])
+        raise
+    finally:
+        cur.close()
+    return version
+
+
+def get_version(conn, version_id: str) -> dict | None:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT id::text, assignment_id::text, version, status, created_at, activated_at
+            FROM reading_index_versions WHERE id = %s""",
+            (version_id,),
+        )
+        return _row(cur)
+    finally:
+        cur.close()
+
+
+def list_versions(conn, assignment_id: str) -> list[dict]:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT v.id::text, v.version, v.status, v.created_at, v.activated_at,
+                count(c.id) AS chunks, count(DISTINCT c.source_title) AS sources
+            FROM reading_index_versions v
+            LEFT JOIN reading_chunks c ON c.version_id = v.id
+            WHERE v.assignment_id = %s
+            GROUP BY v.id
+            ORDER BY v.version""",
+            (assignment_id,),
+        )
+        columns = [d[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def validate_version(conn, version_id: str) -> dict:
+    """Check a building version is fit to serve; raises ValueError if not.
+
+    Returns its chunk and source counts alongside the active version's, so a
+    rebuild that silently lost readings is visible to the caller.
+    """
+    version = get_version(conn, version_id)
+    if version is None:
+        raise ValueError("Version not found")
+    if version["status"] != "building":
+        raise ValueError(f"Version is {version['status']}, not building")
+
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """SELECT count(*), count(DISTINCT source_title),
+                count(*) FILTER (WHERE embedding IS NULL AND embedding_half IS NULL AND embedding_bits IS NULL)
+            FROM reading_chunks WHERE version_id = %s""",
+            (version_id,),
+        )
+        chunks, sources, missing_vectors = cur.fetchone()
+        cur.execute(
+            f"""SELECT count(*), count(DISTINCT source_title) FROM reading_chunks
+            WHERE assignment_id = %(assignment_id)s AND {ACTIVE_VERSION_FILTER}""",
+            {"assignment_id": version["assignment_id"]},
+        )
+        active_chunks, active_sources = cur.fetchone()
+        conn.rollback()
+    finally:
+        cur.close()
+
+    if chunks == 0:
+        raise ValueError("Version has no chunks")
+    if missing_vectors:
+        raise ValueError(f"{missing_vectors} chunks have no embedding")
+    return {
+        "chunks": chunks,
+        "sources": sources,
+        "active_chunks": active_chunks,
+        "active_sources": active_sources,
+    }
+
+
+def activate_version(conn, version_id: str, replaces=ANY_VERSION) -> dict:
+    """Validate, then atomically make ``version_id`` its assignment's active version.
+
+    With ``replaces`` (a version id, or None for none), fails instead if a
+    different version became active meanwhile.
+    """
+    report = validate_version(conn, version_id)
+    cur = conn.cursor()
+    try:
+        # Lock the assignment's version rows so concurrent activations serialize
+        cur.execute(
+            """SELECT id FROM reading_index_versions
+            WHERE assignment_id = (SELECT assignment_id FROM reading_index_versions WHERE id = %s)
+            FOR UPDATE""",
+            (version_id,),
+        )
+        cur.execute(
+            """UPDATE reading_index_versions SET status = 'retired'
+            WHERE status = 'active'
+            AND assignment_id = (SELECT assignment_id FROM reading_index_versions WHERE id = %s)
+            RETURNING id::text""",
+            (version_id,),
+        )
+        retired = [row[0] for row in cur.fetchall()]
+        if replaces is not ANY_VERSION and retired != ([replaces] if replaces else []):
+            raise ValueError("Another version was activated while this one was building")
+        cur.execute(
+            """UPDATE reading_index_versions SET status = 'active', activated_at = NOW()
+            WHERE id = %s AND status = 'building'""",
+            (version_id,),
+        )
+        if cur.rowcount != 1:
+            raise ValueError("Version is no longer building")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return {"version_id": version_id, "retired": retired, **report}
+
+
+def discard_version(conn, version_id: str):
+    """Mark a building version failed so garbage collection removes it."""
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE reading_index_versions SET status = 'failed' WHERE id = %s AND status = 'building'",
+            (version_id,),
+        )
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def collect_garbage(conn, assignment_id: str | None = None, batch_size: int = GC_BATCH_SIZE) -> int:
+    """Delete chunks of retired and failed versions, batch by batch.
+
+    Also removes legacy unversioned chunks of assignments that now have an
+    active version. Each batch commits on its own so row locks stay short.
+    Returns the number of chunks deleted.
+    """
+    garbage = """(
+        version_id IN (
+            SELECT id FROM reading_index_versions
+            WHERE status IN ('retired', 'failed')
+            AND (%(assignment_id)s::uuid IS NULL OR assignment_id = %(assignment_id)s::uuid)
+        )
+        OR (version_id IS NULL AND assignment_id IN (
+            SELECT assignment_id FROM reading_index_versions
+            WHERE status = 'active'
+            AND (%(assignment_id)s::uuid IS NULL OR assignment_id = %(assignment_id)s::uuid)
+        ))
+    )"""
+    params = {"assignment_id": assignment_id, "batch_size": batch_size}
+    deleted = 0
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(
+                f"""DELETE FROM reading_chunks WHERE id IN (
+                    SELECT id FROM reading_chunks WHERE {garbage} LIMIT %(batch_size)s
+                )""",
+                params,
+            )
+            conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < batch_size:
+                break
+        cur.execute(
+            """DELETE FROM reading_index_versions v
+            WHERE status IN ('retired', 'failed')
+            AND (%(assignment_id)s::uuid IS NULL OR assignment_id = %(assignment_id)s::uuid)
+            AND NOT EXISTS (SELECT 1 FROM reading_chunks c WHERE c.version_id = v.id)""",
+            params,
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return deleted
@@ -14,6 +14,11 @@ PRICING = {
     "deepgram": {"per_second": 0.0043},
     "deepgram-nova-3": {"per_second": 0.0043},
 }
+# Message Batches API calls are billed at half the token price
+BATCH_DISCOUNT = 0.5
+# Prompt cache writes and reads, as multiples of the input token price
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
 
 
 def _estimate_cost(
@@ -22,6 +27,8 @@ def _estimate_cost(
     input_tokens: int | None,
     output_tokens: int | None,
     duration_seconds: float | None,
+    cache_read_tokens: int | None = None,
+    cache_creation_tokens: int | None = None,
 ) -> float:
     if service == "deepgram" and duration_seconds:
         rate = PRICING.get(model or "deepgram", PRICING.get("deepgram", {})).get("per_second", 0.0043)
@@ -34,6 +41,10 @@ def _estimate_cost(
             cost += (input_tokens / 1_000_000) * pricing.get("input", 0)
         if output_tokens:
             cost += (output_tokens / 1_000_000) * pricing.get("output", 0)
+        if cache_creation_tokens:
+            cost += (cache_creation_tokens / 1_000_000) * pricing.get("input", 0) * CACHE_WRITE_MULTIPLIER
+        if cache_read_tokens:
+            cost += (cache_read_tokens / 1_000_000) * pricing.get("input", 0) * CACHE_READ_MULTIPLIER
         return cost
 
     return 0.0
@@ -49,22 +60,32 @@ def _do_log(
     assignment_id: str | None,
     pairing_id: str | None,
     memo_id: str | None,
+    batch: bool = False,
+    cache_read_tokens: int | None = None,
+    cache_creation_tokens: int | None = None,
 ):
     try:
-        cost = _estimate_cost(service, model, input_tokens, output_tokens, duration_seconds)
+        cost = _estimate_cost(
+            service, model, input_tokens, output_tokens, duration_seconds, cache_read_tokens, cache_creation_tokens
+        )
+        if batch:
+            cost *= BATCH_DISCOUNT
         conn = psycopg2.connect(DATABASE_URL)
         cur = conn.cursor()
         cur.execute(
             """INSERT INTO ai_usage
             (service, model, call_type, input_tokens, output_tokens,
+             cache_read_tokens, cache_creation_tokens,
              duration_seconds, estimated_cost, assignment_id, pairing_id, memo_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
             (
                 service,
                 model,
                 call_type,
                 input_tokens,
                 output_tokens,
+                cache_read_tokens,
+                cache_creation_tokens,
                 duration_seconds,
                 cost,
                 assignment_id,
@@ -89,12 +110,16 @@ def log_usage(
     assignment_id: str | None = None,
     pairing_id: str | None = None,
     memo_id: str | None = None,
+    batch: bool = False,
+    cache_read_tokens: int | None = None,
+    cache_creation_tokens: int | None = None,
 ):
     """Fire-and-forget usage logging via daemon thread."""
     t = threading.Thread(
         target=_do_log,
         args=(service, model, call_type, input_tokens, output_tokens,
-              duration_seconds, assignment_id, pairing_id, memo_id),
+              duration_seconds, assignment_id, pairing_id, memo_id, batch,
+              cache_read_tokens, cache_creation_tokens),
         daemon=True,
     )
     t.start()